@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""
+Suggest TOC page and section groupings from git co-change history.
+
+Files that keep changing in the same commits usually belong on the same
+wiki page. This script streams ``git log --name-only`` once, builds a
+sparse co-change matrix over the currently tracked files and clusters it
+by label propagation. Each cluster is a candidate page, with candidate
+sections from a stricter second pass, and ``source_files`` patterns that
+cover its files.
+
+- Commits touching more than --max-files-per-commit files (mass renames,
+  reformatting) are skipped
+- Each commit counts 0.5 ** (age / COCHANGE_HALF_LIFE_DAYS), with ages
+  taken from the newest commit, so recent coupling outweighs old coupling
+- Two files are linked when they changed together at least --min-support
+  (decayed) times and in at least --min-confidence of the commits of the
+  less frequently changed one
+
+Usage:
+    python cochange_groups.py --repo-path /path/to/repo --output groups.json
+
+Options:
+    --repo-path PATH              Repository path (required)
+    --since WHEN                  History window, as for git log --since (default: 2 years ago)
+    --max-commits INT             Most recent commits to read (default: 100000)
+    --max-files-per-commit INT    Skip larger commits (default: 30)
+    --min-support FLOAT           Decayed co-changes needed to link two files (default: 2.0)
+    --min-confidence FLOAT        Page-level link threshold (default: 0.4)
+    --section-confidence FLOAT    Section-level link threshold (default: 0.7)
+    --max-groups INT              Groups to report (default: 40)
+    --output PATH                 Output file path (default: stdout)
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from generated_files import classify_path
+from git_churn import iter_log_records
+from git_files import find_git_root, list_git_files
+
+DEFAULT_SINCE = "2 years ago"
+DEFAULT_MAX_COMMITS = 100000
+DEFAULT_MAX_FILES_PER_COMMIT = 30
+DEFAULT_MIN_SUPPORT = 2.0
+DEFAULT_MIN_CONFIDENCE = 0.4
+DEFAULT_SECTION_CONFIDENCE = 0.7
+DEFAULT_MAX_GROUPS = 40
+
+# Age at which a commit counts half
+COCHANGE_HALF_LIFE_DAYS = 180
+# Pairs kept in memory; beyond this the weaker half is dropped
+MAX_PAIRS = 2_000_000
+# Label propagation rounds; it usually settles in a handful
+MAX_PROPAGATION_ROUNDS = 30
+# source_files patterns listed per group
+MAX_PATTERNS_PER_GROUP = 20
+
+_COMMIT_MARKER = "\x01"
+
+Adjacency = Dict[int, Dict[int, float]]
+
+
+class CoChangeMatrix:
+    """Decayed change weights per file and per pair of files that changed together."""
+
+    def __init__(self, paths: List[str]):
+        self.paths = paths
+        self.index = {path: i for i, path in enumerate(paths)}
+        self.file_weights = [0.0] * len(paths)
+        self.pairs: Dict[Tuple[int, int], float] = defaultdict(float)
+        self.stats = {
+            "commits": 0,
+            "commits_used": 0,
+            "large_commits_skipped": 0,
+            "pairs_pruned": 0,
+        }
+
+    def add_commit(self, ids: List[int], weight: float) -> None:
+        for i in ids:
+            self.file_weights[i] += weight
+        ids.sort()
+        pairs = self.pairs
+        for a, i in enumerate(ids):
+            for j in ids[a + 1:]:
+                pairs[(i, j)] += weight
+        if len(pairs) > MAX_PAIRS:
+            self.prune()
+
+    def prune(self) -> None:
+        """Drop the weaker half of the pairs to bound memory."""
+        weights = sorted(self.pairs.values())
+        floor = weights[len(weights) // 2]
+        before = len(self.pairs)
+        self.pairs = defaultdict(float, {pair: w for pair, w in self.pairs.items() if w > floor})
+        self.stats["pairs_pruned"] += before - len(self.pairs)
+
+    def adjacency(self, min_support: float, min_confidence: float) -> Adjacency:
+        """Links between files, weighted by cosine similarity of their change history."""
+        graph: Adjacency = defaultdict(dict)
+        file_weights = self.file_weights
+        for (i, j), weight in self.pairs.items():
+            if weight < min_support:
+                continue
+            if weight < min_confidence * min(file_weights[i], file_weights[j]):
+                continue
+            similarity = weight / math.sqrt(file_weights[i] * file_weights[j])
+            graph[i][j] = similarity
+            graph[j][i] = similarity
+        return graph
+
+
+def tracked_files(repo_path: str) -> List[str]:
+    """Tracked, non-generated files of a repository ("/"-separated)."""
+    listing = list_git_files(repo_path)
+    if listing is None:
+        raise RuntimeError(f"Not a git work tree: {repo_path}")
+    files = [path.replace(os.sep, "/") for path in listing[0]]
+    return sorted(path for path in files if classify_path(path) is None)
+
+
+def build_cochange_matrix(
+    repo_path: str,
+    paths: List[str],
+    since: str = DEFAULT_SINCE,
+    max_commits: int = DEFAULT_MAX_COMMITS,
+    max_files_per_commit: int = DEFAULT_MAX_FILES_PER_COMMIT,
+    now: Optional[float] = None
+) -> CoChangeMatrix:
+    """Stream the history of ``paths`` into a co-change matrix.
+
+    Ages are measured from ``now`` (default: the newest commit read), so
+    a dormant repository clusters like an active one. Merge commits and
+    renames are not followed; paths that no longer exist are ignored.
+    """
+    matrix = CoChangeMatrix(paths)
+    index = matrix.index
+    decay = math.log(2) / (COCHANGE_HALF_LIFE_DAYS * 86400)
+
+    ids: List[int] = []
+    weight = 0.0
+
+    def flush_commit() -> None:
+        if len(ids) > max_files_per_commit:
+            matrix.stats["large_commits_skipped"] += 1
+        elif ids:
+            matrix.stats["commits_used"] += 1
+            matrix.add_commit(ids, weight)
+
+    args = [
+        "--name-only", "-z", "--no-renames", "--no-merges",
+        f"--format={_COMMIT_MARKER}%ct", f"--since={since}", f"--max-count={max_commits}",
+    ]
+    for record in iter_log_records(repo_path, args):
+        if record.startswith(_COMMIT_MARKER):
+            flush_commit()
+            ids = []
+            matrix.stats["commits"] += 1
+            try:
+                timestamp = int(record[1:])
+            except ValueError:
+                timestamp = 0
+            if now is None:
+                now = timestamp
+            weight = math.exp(-decay * max(0.0, now - timestamp))
+            continue
+        i = index.get(record.lstrip("\n"))
+        if i is not None:
+            ids.append(i)
+    flush_commit()
+    return matrix
+
+
+def label_propagation(nodes: List[int], graph: Adjacency, max_rounds: int = MAX_PROPAGATION_ROUNDS) -> Dict[int, int]:
+    """Cluster a weighted graph: each node repeatedly takes its neighbours' heaviest label.
+
+    Nodes are visited in a fixed order (most strongly linked first) and ties
+    keep the current label or take the smallest one, so results are
+    reproducible.
+    """
+    labels = {node: node for node in nodes}
+    order = sorted(nodes, key=lambda node: (-sum(graph[node].values()), node))
+    for _ in range(max_rounds):
+        changed = False
+        for node in order:
+            scores: Dict[int, float] = defaultdict(float)
+            for neighbour, weight in graph[node].items():
+                scores[labels[neighbour]] += weight
+            if not scores:
+                continue
+            best = max(scores.values())
+            current = labels[node]
+            if scores.get(current, 0.0) >= best:
+                continue
+            labels[node] = min(label for label, score in scores.items() if score == best)
+            changed = True
+        if not changed:
+            break
+    return labels
+
+
+def _clusters(nodes: List[int], graph: Adjacency) -> List[List[int]]:
+    """Clusters of two or more nodes, largest first."""
+    members: Dict[int, List[int]] = defaultdict(list)
+    for node, label in label_propagation(nodes, graph).items():
+        members[label].append(node)
+    return sorted((group for group in members.values() if len(group) > 1), key=lambda group: (-len(group), min(group)))
+
+
+class _DirectoryTree:
+    """File counts per directory subtree, for turning file sets into patterns."""
+
+    def __init__(self, paths: List[str]):
+        self.files: Dict[str, List[str]] = defaultdict(list)
+        self.subdirs: Dict[str, Set[str]] = defaultdict(set)
+        self.totals: Dict[str, int] = defaultdict(int)
+        for path in paths:
+            directory = path.rpartition("/")[0]
+            self.files[directory].append(path)
+            self.totals[directory] += 1
+            while directory:
+                parent = directory.rpartition("/")[0]
+                self.subdirs[parent].add(directory)
+                self.totals[parent] += 1
+                directory = parent
+
+    def patterns(self, group: List[str]) -> List[str]:
+        """source_files patterns matching exactly the files of ``group``.
+
+        Directories whose every tracked file is in the group become globs;
+        other files are listed by path.
+        """
+        counts: Dict[str, int] = defaultdict(int)
+        for path in group:
+            directory = path.rpartition("/")[0]
+            counts[directory] += 1
+            while directory:
+                directory = directory.rpartition("/")[0]
+                counts[directory] += 1
+        members = set(group)
+        patterns: List[str] = []
+
+        def emit(directory: str) -> None:
+            if directory and counts[directory] == self.totals[directory]:
+                patterns.append(self._glob(directory))
+                return
+            patterns.extend(path for path in sorted(self.files.get(directory, ())) if path in members)
+            for subdir in sorted(self.subdirs.get(directory, ())):
+                if counts.get(subdir):
+                    emit(subdir)
+
+        emit("")
+        return patterns
+
+    def _glob(self, directory: str) -> str:
+        stack = [directory]
+        extensions: Set[str] = set()
+        while stack:
+            current = stack.pop()
+            extensions.update(os.path.splitext(path)[1] for path in self.files.get(current, ()))
+            stack.extend(self.subdirs.get(current, ()))
+        suffix = f"*{extensions.pop()}" if len(extensions) == 1 and "" not in extensions else "*"
+        return f"{directory}/**/{suffix}" if self.subdirs.get(directory) else f"{directory}/{suffix}"
+
+
+def _label(paths: List[str]) -> str:
+    """Common directory of paths, or the directory holding most of them."""
+    common = os.path.commonpath(paths) if len(paths) > 1 else paths[0].rpartition("/")[0]
+    if common in paths:
+        common = common.rpartition("/")[0]
+    if common:
+        return common
+    directories: Dict[str, int] = defaultdict(int)
+    for path in paths:
+        directories[path.rpartition("/")[0] or "."] += 1
+    return max(directories.items(), key=lambda item: (item[1], item[0]))[0]
+
+
+def suggest_groupings(
+    repo_path: str,
+    since: str = DEFAULT_SINCE,
+    max_commits: int = DEFAULT_MAX_COMMITS,
+    max_files_per_commit: int = DEFAULT_MAX_FILES_PER_COMMIT,
+    min_support: float = DEFAULT_MIN_SUPPORT,
+    min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+    section_confidence: float = DEFAULT_SECTION_CONFIDENCE,
+    max_groups: int = DEFAULT_MAX_GROUPS
+) -> Dict[str, Any]:
+    """Cluster co-changing files into candidate pages and sections.
+
+    Returns:
+        {"groups": [...], "stats": {...}} where each group has a "label",
+        "files" count, decayed change "weight", "source_files" patterns and
+        "sections" (same fields) from a pass at ``section_confidence``.
+    """
+    timings: Dict[str, float] = {}
+    stage_start = time.perf_counter()
+    repo_path = find_git_root(repo_path)
+    paths = tracked_files(repo_path)
+    matrix = build_cochange_matrix(repo_path, paths, since, max_commits, max_files_per_commit)
+    timings["history"] = time.perf_counter() - stage_start
+
+    stage_start = time.perf_counter()
+    graph = matrix.adjacency(min_support, min_confidence)
+    section_graph = matrix.adjacency(min_support, section_confidence)
+    tree = _DirectoryTree(paths)
+
+    def describe(group: List[int]) -> Dict[str, Any]:
+        group_paths = sorted(matrix.paths[i] for i in group)
+        patterns = tree.patterns(group_paths)
+        return {
+            "label": _label(group_paths),
+            "files": len(group_paths),
+            "weight": round(sum(matrix.file_weights[i] for i in group), 2),
+            "source_files": patterns[:MAX_PATTERNS_PER_GROUP],
+            "truncated": len(patterns) > MAX_PATTERNS_PER_GROUP,
+        }
+
+    groups = []
+    for group in _clusters(list(graph), graph):
+        members = set(group)
+        subgraph: Adjacency = {
+            node: {other: w for other, w in section_graph.get(node, {}).items() if other in members}
+            for node in group
+        }
+        sections = _clusters([node for node in group if subgraph[node]], subgraph)
+        page = describe(group)
+        page["sections"] = [describe(section) for section in sections] if len(sections) > 1 else []
+        groups.append(page)
+    groups.sort(key=lambda page: (-page["weight"], page["label"]))
+    timings["cluster"] = time.perf_counter() - stage_start
+
+    return {
+        "repo_path": repo_path,
+        "since": since,
+        "groups": groups[:max_groups],
+        "stats": dict(
+            matrix.stats,
+            tracked_files=len(paths),
+            linked_files=len(graph),
+            links=sum(len(neighbours) for neighbours in graph.values()) // 2,
+            groups=len(groups),
+            timings={stage: round(seconds, 3) for stage, seconds in timings.items()},
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Suggest TOC page and section groupings from git co-change history"
+    )
+    parser.add_argument(
+        "--repo-path",
+        required=True,
+        help="Repository path"
+    )
+    parser.add_argument(
+        "--since",
+        default=DEFAULT_SINCE,
+        help=f"History window, as for git log --since (default: {DEFAULT_SINCE})"
+    )
+    parser.add_argument(
+        "--max-commits",
+        type=int,
+        default=DEFAULT_MAX_COMMITS,
+        help=f"Most recent commits to read (default: {DEFAULT_MAX_COMMITS})"
+    )
+    parser.add_argument(
+        "--max-files-per-commit",
+        type=int,
+        default=DEFAULT_MAX_FILES_PER_COMMIT,
+        help=f"Skip commits touching more files (default: {DEFAULT_MAX_FILES_PER_COMMIT})"
+    )
+    parser.add_argument(
+        "--min-support",
+        type=float,
+        default=DEFAULT_MIN_SUPPORT,
+        help=f"Decayed co-changes needed to link two files (default: {DEFAULT_MIN_SUPPORT})"
+    )
+    parser.add_argument(
+        "--min-confidence",
+        type=float,
+        default=DEFAULT_MIN_CONFIDENCE,
+        help=f"Page-level link threshold (default: {DEFAULT_MIN_CONFIDENCE})"
+    )
+    parser.add_argument(
+        "--section-confidence",
+        type=float,
+        default=DEFAULT_SECTION_CONFIDENCE,
+        help=f"Section-level link threshold (default: {DEFAULT_SECTION_CONFIDENCE})"
+    )
+    parser.add_argument(
+        "--max-groups",
+        type=int,
+        default=DEFAULT_MAX_GROUPS,
+        help=f"Groups to report (default: {DEFAULT_MAX_GROUPS})"
+    )
+    parser.add_argument(
+        "--output",
+        help="Output file path (default: stdout)"
+    )
+
+    args = parser.parse_args()
+    if args.max_commits < 1:
+        parser.error("--max-commits must be at least 1")
+    if args.max_files_per_commit < 2:
+        parser.error("--max-files-per-commit must be at least 2")
+
+    try:
+        result = suggest_groupings(
+            repo_path=args.repo_path,
+            since=args.since,
+            max_commits=args.max_commits,
+            max_files_per_commit=args.max_files_per_commit,
+            min_support=args.min_support,
+            min_confidence=args.min_confidence,
+            section_confidence=args.section_confidence,
+            max_groups=args.max_groups
+        )
+
+        output = json.dumps(result, ensure_ascii=False, indent=2)
+
+        if args.output:
+            output_path = Path(args.output)
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            output_path.write_text(output, encoding='utf-8')
+            print(f"Groupings saved to: {args.output}", file=sys.stderr)
+        else:
+            print(output)
+
+        return 0
+
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,8 +2,8 @@
 """
 Collect project context for wiki generation.
 
-This script scans a repository and collects project structure and README
-for use in wiki documentation generation.
+This script scans a repository and collects project structure, README and
+a digest of the other documentation for use in wiki documentation generation.
 
 Usage:
     python collect_context.py --repo-path /path/to/repo [options]
@@ -12,119 +12,130 @@ Options:
     --repo-path PATH       Repository path (required)
     --max-depth INT        Maximum scan depth (default: 10)
     --include PATTERN      Include patterns (repeatable)
-    --exclude PATTERN      Exclude patterns (repeatable)
+    --exclude PATTERN      Exclude patterns, added to the default excludes (repeatable)
+    --no-default-excludes  Only apply --exclude patterns
     --output PATH          Output file path (default: stdout)
+    --cache-file PATH      Scan cache path (default: scan_cache.json next to --output)
+    --no-cache             Disable the persistent scan cache
+    --backend NAME         File enumeration: auto, git or walk (default: auto)
+    --no-gitignore         Don't apply .gitignore files when walking the file system
+    --workers INT          Threads for directory listing and file classification (default: 8)
+    --processes INT        Processes for scanning monorepo workspaces (default: min(8, CPUs))
+    --no-workspaces        Scan the repository as a single shard
+    --workspace-packs      Also write one context pack per workspace next to --output
+    --tree-mode MODE       Over-budget tree: priority (summarize low-value dirs) or depth (default: priority)
+    --max-tokens INT       Context pack budget in estimated tokens (default: 150000)
+    --max-bytes INT        Context pack budget in bytes, instead of tokens
+    --no-symbols           Don't build the symbol index (symbol_index.json next to --output)
+    --no-imports           Don't build the import graph (import_index.json next to --output)
+    --no-dedupe            Don't collapse files with identical content
+    --churn-since WHEN     Git history window for churn ranking (default: 1 year ago)
+    --no-churn             Don't mine git history for churn ranking
 """
 
 import argparse
 import json
 import os
 import sys
-import fnmatch
+import time
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 from collections import defaultdict
-
-
-# max_bytes ≈ max_tokens*3, Claude 200k context: keep a buffer for system/prompt/response
-# adjust via env if needed.
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from dedupe import DuplicateGroup, duplicates_summary, find_duplicates
+from doc_digest import (
+    DocFile, Heading, cut_at_heading, doc_format, extract_headings, find_doc_files, format_outline
+)
+from exclude_profiles import build_exclude_profile
+from file_index import run_threaded
+from file_sniffer import SAMPLE_SIZE, is_binary_sample, sniff_file
+from file_table import FileRecord, FileTable
+from generated_files import DUPLICATE, classify_noise, classify_path, classify_sample
+from git_attributes import GitAttributes, linguist_language
+from gitignore_rules import GITIGNORE_FILENAME, IgnoreRules
+from language_detector import detect_language, needs_sample
+from path_matcher import PathMatcher, compile_patterns
+from project_tree import format_size, generate_tree_structure, summarize_tree_structure
+from scan_cache import CACHE_FILENAME, ScanCache
+from symbol_index import SYMBOL_INDEX_FILENAME, build_symbol_index, symbol_summary
+from git_files import find_git_root, list_git_files
+from git_churn import DEFAULT_CHURN_SINCE, GitChurn, churn_summary, collect_churn
+from import_graph import (
+    IMPORT_INDEX_FILENAME, Edges, build_import_index, import_graph_summary, relocate_edges, resolve_import_edges
+)
+from pack_budget import JsonSizeTracker, PackBudget, calculate_json_size, json_size, json_string_size
+from token_estimator import TOKEN_CACHE_FILENAME, TokenEstimator
+from workspaces import (
+    WORKSPACE_PACK_DIR, Workspace, detect_workspaces, workspace_pack_name, write_workspace_packs
+)
+
+
+# Context pack budget. Claude 200k context: keep a buffer for
+# system/prompt/response; adjust via env if needed. Packs are budgeted in
+# tokens unless a byte budget is requested (or DOC_GEN_DEFAULT_MAX_BYTES is set).
+DEFAULT_MAX_TOKENS = int(os.getenv("DOC_GEN_DEFAULT_MAX_TOKENS", "150000"))
 DEFAULT_MAX_BYTES = int(os.getenv("DOC_GEN_DEFAULT_MAX_BYTES", "600000"))
+BUDGET_UNITS = ("tokens", "bytes")
+# Characters of the tree a token rate is measured on, and how often a
+# summarized tree is re-rendered when its estimate still exceeds the budget
+TOKEN_RATE_SAMPLE_CHARS = 65536
+TOKEN_BUDGET_PASSES = 3
 
 # Budget allocation (approximate percentages)
 STRUCTURE_BUDGET_PCT = 0.80
 README_BUDGET_PCT = 0.20
-
-# Default patterns to exclude
-DEFAULT_EXCLUDE_PATTERNS = [
-    '.git',
-    '.svn',
-    '.hg',
-    'node_modules',
-    '__pycache__',
-    '*.pyc',
-    '.venv',
-    'venv',
-    'env',
-    '.env',
-    'dist',
-    'build',
-    'target',
-    '*.egg-info',
-    '.idea',
-    '.vscode',
-    '.DS_Store',
-    '*.log',
-    '.pytest_cache',
-    '.mypy_cache',
-    '.tox',
-    'coverage',
-    '.coverage',
-]
-
-# Language detection by extension
-EXTENSION_LANGUAGE_MAP = {
-    '.py': 'Python',
-    '.js': 'JavaScript',
-    '.ts': 'TypeScript',
-    '.jsx': 'JavaScript React',
-    '.tsx': 'TypeScript React',
-    '.java': 'Java',
-    '.c': 'C',
-    '.cpp': 'C++',
-    '.cc': 'C++',
-    '.cxx': 'C++',
-    '.h': 'C/C++ Header',
-    '.hpp': 'C++ Header',
-    '.go': 'Go',
-    '.rs': 'Rust',
-    '.rb': 'Ruby',
-    '.php': 'PHP',
-    '.swift': 'Swift',
-    '.kt': 'Kotlin',
-    '.scala': 'Scala',
-    '.sh': 'Shell',
-    '.bash': 'Bash',
-    '.zsh': 'Zsh',
-    '.fish': 'Fish',
-    '.ps1': 'PowerShell',
-    '.r': 'R',
-    '.R': 'R',
-    '.m': 'MATLAB/Objective-C',
-    '.sql': 'SQL',
-    '.md': 'Markdown',
-    '.rst': 'reStructuredText',
-    '.tex': 'LaTeX',
-    '.html': 'HTML',
-    '.htm': 'HTML',
-    '.css': 'CSS',
-    '.scss': 'SCSS',
-    '.sass': 'Sass',
-    '.less': 'Less',
-    '.json': 'JSON',
-    '.xml': 'XML',
-    '.yaml': 'YAML',
-    '.yml': 'YAML',
-    '.toml': 'TOML',
-    '.ini': 'INI',
-    '.cfg': 'Config',
-    '.conf': 'Config',
-    '.vue': 'Vue',
-    '.svelte': 'Svelte',
-    '.dart': 'Dart',
-    '.lua': 'Lua',
-    '.vim': 'VimScript',
-    '.el': 'Emacs Lisp',
-    '.clj': 'Clojure',
-    '.ex': 'Elixir',
-    '.exs': 'Elixir',
-    '.erl': 'Erlang',
-    '.hrl': 'Erlang',
-    '.hs': 'Haskell',
-    '.ml': 'OCaml',
-    '.dockerfile': 'Dockerfile',
-    '.proto': 'Protocol Buffers',
-}
+# Shares of the README budget: the root README itself (when other docs
+# exist), heading outlines of the other docs out of what is left after it,
+# and the largest excerpt of a single doc (excerpts fill the rest)
+README_CONTENT_SHARE = 0.5
+DOC_OUTLINE_SHARE = 0.5
+DOC_EXCERPT_SHARE = 0.1
+# Excerpts are not taken once less than this share of the largest one is left
+DOC_EXCERPT_MIN_SHARE = 0.25
+# Documentation files read for the digest, highest priority first
+DOC_DIGEST_MAX_FILES = int(os.getenv("DOC_GEN_DOC_DIGEST_MAX_FILES", "200"))
+DOC_MAX_FILE_SIZE = 1024 * 1024
+# Share of the budget the per-directory stats table may take out of the structure budget
+DIRECTORY_STATS_BUDGET_PCT = 0.10
+# Share of the budget the symbol summary may take out of the structure budget
+SYMBOLS_BUDGET_PCT = 0.15
+# Share of the budget the directory import graph may take out of the structure budget
+IMPORT_GRAPH_BUDGET_PCT = 0.05
+# Share of the budget the git churn ranking may take out of the structure budget
+CHURN_BUDGET_PCT = 0.05
+# Share of the budget the duplicate file groups may take out of the structure budget
+DUPLICATES_BUDGET_PCT = 0.03
+
+# File attribute tiers for scan_project(). "stat" fields come from os.stat()
+# and the file name; "content" fields require opening the file. "text" loads
+# the content fields only for the files the pack counts (see wants_content()).
+ATTRIBUTE_TIERS = ("stat", "text", "content")
+CONTENT_ATTRIBUTES = ("is_binary", "encoding", "line_count", "content_noise")
+
+# Threads used by scan_project() to list directories and classify files.
+DEFAULT_SCAN_WORKERS = int(os.getenv("DOC_GEN_SCAN_WORKERS", "8"))
+
+# Processes used by scan_project_sharded() to scan workspaces in parallel.
+DEFAULT_SCAN_PROCESSES = int(os.getenv("DOC_GEN_SCAN_PROCESSES", str(min(8, os.cpu_count() or 1))))
+
+# Directory under the wiki output directory holding the context pack
+CONTEXT_DIR_NAME = "_context"
+
+# File enumeration backends for scan_project(). "auto" uses "git" inside a
+# git repository and falls back to "walk" when git is unavailable.
+SCAN_BACKENDS = ("auto", "git", "walk")
+
+# Tree rendering when the full tree exceeds the structure budget: "priority"
+# expands the highest-scoring directories and summarizes the rest, "depth"
+# lowers max_depth for the whole tree.
+TREE_MODES = ("priority", "depth")
 
 
 class FileReadError(Exception):
@@ -158,6 +169,37 @@ class FileInfo:
     error: Optional[str] = None
 
 
+@dataclass
+class DirectoryStats:
+    """Aggregate statistics of a directory's whole subtree."""
+    file_count: int = 0
+    total_size: int = 0
+    # Lines of text files whose content tier was computed
+    line_count: int = 0
+    languages: Dict[str, int] = field(default_factory=dict)
+
+    def add_file(self, size: int, line_count: int, language: Optional[str]) -> None:
+        """Count one scanned file directly inside this directory.
+
+        ``line_count`` is negative when unknown; ``language`` is None for
+        noise files, which are left out of the language counts.
+        """
+        self.file_count += 1
+        self.total_size += size
+        if line_count > 0:
+            self.line_count += line_count
+        if language:
+            self.languages[language] = self.languages.get(language, 0) + 1
+
+    def merge(self, other: "DirectoryStats") -> None:
+        """Add the totals of a subdirectory."""
+        self.file_count += other.file_count
+        self.total_size += other.total_size
+        self.line_count += other.line_count
+        for language, count in other.languages.items():
+            self.languages[language] = self.languages.get(language, 0) + count
+
+
 @dataclass
 class ScanResult:
     """Results from scanning a project."""
@@ -165,85 +207,49 @@ class ScanResult:
     total_files: int = 0
     total_directories: int = 0
     total_size: int = 0
-    files: List[Dict[str, Any]] = field(default_factory=list)
+    # One record per scanned file; FileRecord views read like the old dicts
+    files: FileTable = field(default_factory=FileTable)
+    directories: List[str] = field(default_factory=list)
     language_stats: Dict[str, int] = field(default_factory=dict)
     tree_structure: str = ""
     scan_depth: int = 0
-
-
-def _calculate_json_size(data: Any) -> int:
-    """Calculate the UTF-8 byte size of data when serialized to JSON."""
-    return len(json.dumps(data, ensure_ascii=False).encode('utf-8'))
+    backend: str = "walk"
+    timings: Dict[str, float] = field(default_factory=dict)
+    # Relative directory path ("" for the root) -> subtree totals
+    directory_stats: Dict[str, DirectoryStats] = field(default_factory=dict)
+    # Noise kind (generated/vendored/minified/duplicate) -> {"files": n, "bytes": n}
+    noise_stats: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    # Identical files found by deduplication, most wasted bytes first, and
+    # how many files were hashed or had their hash reused
+    duplicates: List[DuplicateGroup] = field(default_factory=list)
+    dedupe_stats: Dict[str, int] = field(default_factory=dict)
+    # Exclude layer -> {"directories": n, "files": n, "file_bytes": n} pruned by it
+    exclude_stats: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    # Workspaces scanned as separate shards: path, name, kind, files, bytes
+    workspaces: List[Dict[str, Any]] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        if not self.files.root_path:
+            self.files.root_path = self.root_path
 
 
 def detect_encoding(file_path: Path) -> str:
     """Detect file encoding by trying multiple encodings."""
-    encodings_to_try = ['utf-8', 'utf-16', 'iso-8859-1', 'latin-1', 'ascii', 'gb2312', 'gbk']
+    sniff = sniff_file(str(file_path))
+    if sniff.encoding is None:
+        raise EncodingDetectionError(f"Could not detect encoding for {file_path}")
+    return sniff.encoding
 
-    for encoding in encodings_to_try:
-        try:
-            with open(file_path, 'r', encoding=encoding) as f:
-                f.read(1024)
-            return encoding
-        except (UnicodeDecodeError, UnicodeError):
-            continue
-        except Exception:
-            continue
-
-    raise EncodingDetectionError(f"Could not detect encoding for {file_path}")
 
-
-def is_binary_file(file_path: Path, sample_size: int = 8192) -> bool:
+def is_binary_file(file_path: Path, sample_size: int = SAMPLE_SIZE) -> bool:
     """Check if a file is binary by examining its content."""
     try:
         with open(file_path, 'rb') as f:
-            chunk = f.read(sample_size)
-
-        if not chunk:
-            return False
-
-        if b'\x00' in chunk:
-            return True
-
-        try:
-            chunk.decode('utf-8')
-            return False
-        except UnicodeDecodeError:
-            pass
-
-        for encoding in ['latin-1', 'iso-8859-1', 'cp1252', 'gbk', 'gb2312']:
-            try:
-                chunk.decode(encoding)
-                return False
-            except (UnicodeDecodeError, LookupError):
-                continue
-
-        text_chars = bytes(range(32, 127)) + b'\n\r\t\b\f\v'
-        non_text_count = sum(1 for byte in chunk if byte not in text_chars and byte < 128)
-
-        ascii_bytes = [b for b in chunk if b < 128]
-        if ascii_bytes:
-            return (non_text_count / len(ascii_bytes)) > 0.5
-
-        return True
+            return is_binary_sample(f.read(sample_size))
     except Exception:
         return False
 
 
-def detect_language(file_path: str) -> Optional[str]:
-    """Detect programming language from file extension."""
-    path = Path(file_path)
-    ext = path.suffix.lower()
-    name = path.name.lower()
-
-    if name.startswith('dockerfile'):
-        return 'Dockerfile'
-    if name in ['makefile', 'gnumakefile']:
-        return 'Makefile'
-
-    return EXTENSION_LANGUAGE_MAP.get(ext)
-
-
 def read_file_content(
     file_path: str,
     max_size: Optional[int] = None,
@@ -258,229 +264,517 @@ def read_file_content(
     if not path.is_file():
         raise FileReadError(f"Path is not a file: {file_path}")
 
-    file_size = path.stat().st_size
+    sniff = sniff_file(file_path, read_content=True, max_size=max_size, encoding=encoding)
+
+    if max_size and sniff.size > max_size:
+        raise FileReadError(f"File too large: {sniff.size} bytes (max: {max_size})")
 
-    if max_size and file_size > max_size:
-        raise FileReadError(f"File too large: {file_size} bytes (max: {max_size})")
+    if sniff.error:
+        raise FileReadError(f"Failed to read file {file_path}: {sniff.error}")
 
-    if is_binary_file(path):
+    if sniff.is_binary:
         raise FileReadError(f"File appears to be binary: {file_path}")
 
-    if encoding is None:
-        try:
-            encoding = detect_encoding(path)
-        except EncodingDetectionError as e:
-            raise FileReadError(f"Failed to detect encoding: {e}") from e
+    if sniff.encoding is None or sniff.content is None:
+        raise FileReadError(f"Failed to detect encoding: Could not detect encoding for {file_path}")
 
-    try:
-        with open(path, 'r', encoding=encoding, errors='replace') as f:
-            content = f.read()
-        return content, encoding
-    except Exception as e:
-        raise FileReadError(f"Failed to read file {file_path}: {e}") from e
+    return sniff.content, sniff.encoding
 
 
 def get_file_info(file_path: str) -> FileInfo:
     """Get comprehensive information about a file."""
-    path = Path(file_path)
-
-    try:
-        if not path.exists():
-            return FileInfo(
-                path=file_path,
-                size=0,
-                encoding="unknown",
-                error="File does not exist"
-            )
-
-        size = path.stat().st_size
-        is_binary = is_binary_file(path)
-
-        if is_binary:
-            return FileInfo(
-                path=file_path,
-                size=size,
-                encoding="binary",
-                is_binary=True
-            )
-
-        try:
-            encoding = detect_encoding(path)
-        except EncodingDetectionError:
-            encoding = "unknown"
-
-        language = detect_language(file_path)
+    sniff = sniff_file(file_path)
 
+    if sniff.error:
         return FileInfo(
             path=file_path,
-            size=size,
-            encoding=encoding,
-            language=language,
-            is_binary=False
+            size=0,
+            encoding="unknown",
+            error=sniff.error
         )
 
-    except Exception as e:
+    if sniff.is_binary:
         return FileInfo(
             path=file_path,
-            size=0,
-            encoding="unknown",
-            error=str(e)
+            size=sniff.size,
+            encoding="binary",
+            is_binary=True
         )
 
+    return FileInfo(
+        path=file_path,
+        size=sniff.size,
+        encoding=sniff.encoding or "unknown",
+        language=detect_language(file_path, sniff.sample),
+        is_binary=False
+    )
 
-def matches_pattern(path: str, pattern: str) -> bool:
-    """Check if a path matches a pattern."""
-    path = path.replace('\\', '/')
-    pattern = pattern.replace('\\', '/')
-
-    path_obj = Path(path)
-    path_name = path_obj.name
 
-    if pattern.endswith('/') or (not any(c in pattern for c in '*?[')):
-        folder_pattern = pattern.rstrip('/')
-        if path.startswith(folder_pattern + '/'):
-            return True
-        if '/' + folder_pattern + '/' in path or path == folder_pattern:
-            return True
+def count_lines(text: str) -> int:
+    """Count the lines of decoded text."""
+    if not text:
+        return 0
+    return text.count("\n") + (0 if text.endswith("\n") else 1)
 
-    if pattern.startswith('**/') and pattern.endswith('/**'):
-        dir_name = pattern[3:-3]
-        parts = path.split('/')
-        return dir_name in parts
 
-    if pattern.startswith('**/'):
-        suffix = pattern[3:]
-        return path.endswith(suffix) or ('/' + suffix) in path
+def get_file_stat_data(
+    file_path: str,
+    relative_path: str,
+    cache: Optional[ScanCache] = None,
+    stat: Optional[os.stat_result] = None
+) -> Dict[str, Any]:
+    """Collect the stat-tier attributes of a file without opening it.
+
+    A stat result already obtained while listing the directory can be
+    passed in. With a cache, attributes of an unchanged file (including
+    content-tier ones sniffed on an earlier run) are reused.
+    """
+    file_data: Dict[str, Any] = {
+        "path": file_path,
+        "relative_path": relative_path,
+        "size": 0,
+        "language": None,
+    }
 
-    if pattern.endswith('/**'):
-        prefix = pattern[:-3]
-        return path.startswith(prefix + '/') or ('/' + prefix + '/') in path
+    if stat is None:
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return file_data
 
-    if fnmatch.fnmatch(path_name, pattern):
-        return True
-    if fnmatch.fnmatch(path, pattern):
-        return True
+    file_data["size"] = stat.st_size
+    cached = cache.get_file(relative_path, stat) if cache is not None else None
 
-    if '**' in pattern:
-        try:
-            if path_obj.match(pattern):
-                return True
-        except ValueError:
-            pass
+    if cached is not None:
+        file_data.update(cached)
+    else:
+        file_data["language"] = detect_language(file_path)
+        if cache is not None:
+            cache.put_file(relative_path, stat, file_data)
 
-    return False
+    return file_data
 
 
-def should_exclude(path: str, exclude_patterns: List[str]) -> bool:
-    """Check if a path should be excluded based on patterns."""
-    for pattern in exclude_patterns:
-        if matches_pattern(path, pattern):
-            return True
+def wants_content(relative_path: str, language: Optional[str]) -> bool:
+    """Whether the "text" tier loads the content attributes of a file.
 
-    return False
+    Files with a language get them, as do extensionless files, whose
+    language only a shebang can tell. Files with an unknown extension
+    (images, archives, data) and files that are noise by their path alone
+    (lock files, vendored directories, minified names) are never opened.
+    """
+    if language is None and os.path.splitext(relative_path)[1]:
+        return False
+    return not classify_path(relative_path.replace(os.sep, '/'))
 
 
-def should_include(path: str, include_patterns: Optional[List[str]]) -> bool:
-    """Check if a path should be included based on patterns."""
-    if include_patterns is None or len(include_patterns) == 0:
-        return True
+def ensure_content_attributes(file_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Compute the content-tier attributes of a scanned file on first request.
 
-    for pattern in include_patterns:
-        if matches_pattern(path, pattern):
-            return True
+    Adds ``is_binary``, ``encoding`` and ``line_count`` to ``file_data`` in
+    place, and refines ``language`` from the first bytes (shebang, modeline,
+    .h/.m content) when the name alone is not conclusive. ``content_noise``
+    records generated/minified signals from the same bytes (see
+    generated_files.classify_sample()). Later calls are free.
+    """
+    if "is_binary" in file_data:
+        return file_data
 
-    return False
+    sniff = sniff_file(file_data["path"], read_content=True)
+    if needs_sample(file_data["path"], file_data["language"]):
+        file_data["language"] = detect_language(file_data["path"], sniff.sample)
+    file_data["content_noise"] = classify_sample(file_data["path"], sniff.sample)
+    file_data["is_binary"] = sniff.is_binary
+    file_data["encoding"] = "binary" if sniff.is_binary else (sniff.encoding or "unknown")
+    file_data["line_count"] = count_lines(sniff.content) if sniff.content is not None else None
 
+    return file_data
 
-def format_size(size_bytes: int) -> str:
-    """Format byte size to human-readable string."""
-    size = float(size_bytes)
-    for unit in ['B', 'KB', 'MB', 'GB']:
-        if size < 1024:
-            return f"{size:.1f} {unit}"
-        size /= 1024
-    return f"{size:.1f} TB"
 
+@dataclass
+class DirectoryListing:
+    """Raw result of listing one directory."""
+    stat: Optional[os.stat_result]
+    dirs: Optional[List[str]] = None
+    files: Optional[List[str]] = None
+    symlinked_dirs: Optional[List[str]] = None
+    file_stats: Dict[str, os.stat_result] = field(default_factory=dict)
+
+
+def list_directory(
+    dir_path: str,
+    known_fingerprint: Optional[Tuple[int, int]] = None,
+    stat_files: bool = False,
+    stat_dir: bool = False
+) -> Optional[DirectoryListing]:
+    """List a directory with os.scandir, reusing DirEntry results.
+
+    Returns None if the directory cannot be read. When ``known_fingerprint``
+    matches the directory's (inode, mtime_ns) the listing is skipped and only
+    ``stat`` is set. ``stat_files`` collects each file's stat result (free on
+    Windows, one call per file elsewhere) so callers need not stat again.
+    """
+    dir_stat = None
+    if stat_dir or known_fingerprint is not None:
+        try:
+            dir_stat = os.stat(dir_path)
+        except OSError:
+            return None
+        if known_fingerprint == (dir_stat.st_ino, dir_stat.st_mtime_ns):
+            return DirectoryListing(stat=dir_stat)
 
-def find_git_root(start_path: str) -> str:
-    """Find the git repository root by searching for .git directory."""
-    current = Path(start_path).resolve()
+    listing = DirectoryListing(stat=dir_stat, dirs=[], files=[], symlinked_dirs=[])
+    try:
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    listing.dirs.append(entry.name)
+                    if entry.is_symlink():
+                        listing.symlinked_dirs.append(entry.name)
+                else:
+                    listing.files.append(entry.name)
+                    if stat_files:
+                        try:
+                            listing.file_stats[entry.name] = entry.stat()
+                        except OSError:
+                            pass
+    except OSError:
+        return None
+
+    return listing
+
+
+def walk_tree(
+    top: str,
+    cache: Optional[ScanCache] = None,
+    respect_gitignore: bool = False,
+    workers: int = 1,
+    stat_files: bool = False,
+    rel_top: str = ".",
+    rules: Optional[IgnoreRules] = None
+):
+    """Walk a directory tree like os.walk(top) (top-down, no symlink following).
+
+    Yields (dirpath, dirnames, filenames, file_stats); callers may prune
+    dirnames in place. ``file_stats`` maps file names to stat results when
+    ``stat_files`` is set and the directory was listed in this run.
+
+    With ``workers`` > 1, the listings of the subdirectories that survive
+    pruning are prefetched concurrently in a bounded thread pool while the
+    caller processes earlier directories; the yield order is unchanged.
+
+    With a cache, directories whose inode and mtime are unchanged reuse
+    their cached listing instead of being listed again. With
+    ``respect_gitignore``, nested .gitignore files are loaded as the walk
+    descends and ignored entries are dropped before they are yielded, so
+    ignored directories are never listed.
+
+    When ``top`` is a subdirectory of the repository, ``rel_top`` is its
+    relative path (cache keys and .gitignore rules stay relative to the
+    repository root) and ``rules`` holds the .gitignore rules of the
+    directories above it (see load_ancestor_ignore_rules()).
+    """
+    pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    def schedule(dir_path: str, rel_dir: str):
+        known = cache.listing_fingerprint(rel_dir) if cache is not None else None
+        args = (dir_path, known, stat_files, cache is not None)
+        if pool is not None:
+            return pool.submit(list_directory, *args)
+        return args
+
+    stack: List[Tuple[str, str, Optional[IgnoreRules], Any]] = [
+        (top, rel_top, rules, schedule(top, rel_top))
+    ]
 
-    while current != current.parent:
-        if (current / ".git").exists():
-            return str(current)
-        current = current.parent
+    try:
+        while stack:
+            dir_path, rel_dir, rules, job = stack.pop()
+            listing = job.result() if pool is not None else list_directory(*job)
+            if listing is None:
+                continue
 
-    if (current / ".git").exists():
-        return str(current)
+            cached = None
+            if cache is not None:
+                cached = cache.get_listing(rel_dir, listing.stat)
+                if cached is None:
+                    cache.put_listing(
+                        rel_dir, listing.stat, listing.dirs, listing.files, listing.symlinked_dirs
+                    )
 
-    return str(Path(start_path).resolve())
+            if cached is not None:
+                dirs, files, symlinked_dirs = list(cached[0]), list(cached[1]), cached[2]
+            else:
+                dirs, files, symlinked_dirs = list(listing.dirs), list(listing.files), listing.symlinked_dirs
+
+            if respect_gitignore:
+                rule_base = "" if rel_dir == "." else rel_dir.replace(os.sep, "/")
+                if GITIGNORE_FILENAME in files:
+                    rules = IgnoreRules.load(
+                        os.path.join(dir_path, GITIGNORE_FILENAME), rule_base, rules
+                    )
+                if rules is not None:
+                    prefix = rule_base + "/" if rule_base else ""
+                    dirs = [d for d in dirs if not rules.is_ignored(prefix + d, True)]
+                    files = [f for f in files if not rules.is_ignored(prefix + f, False)]
+
+            yield dir_path, dirs, files, listing.file_stats
+
+            for name in reversed(dirs):
+                if name in symlinked_dirs:
+                    continue
+                child_path = os.path.join(dir_path, name)
+                child_rel = name if rel_dir == "." else os.path.join(rel_dir, name)
+                stack.append((child_path, child_rel, rules, schedule(child_path, child_rel)))
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def load_ancestor_ignore_rules(root_path: str, rel_dir: str) -> Optional[IgnoreRules]:
+    """Load the .gitignore files of the directories above ``rel_dir``, root first."""
+    rules = None
+    parts = rel_dir.split(os.sep) if rel_dir else []
+    for i in range(len(parts)):
+        base = parts[:i]
+        gitignore_path = os.path.join(root_path, *base, GITIGNORE_FILENAME)
+        if os.path.isfile(gitignore_path):
+            rules = IgnoreRules.load(gitignore_path, "/".join(base), rules)
+    return rules
+
+
+def walk_git_index(top: str, files: List[str], gitlinks: List[str]):
+    """Walk the directory tree implied by a git file list like walk_tree(top).
+
+    Submodules (gitlinks) appear as empty directories.
+    """
+    children: Dict[str, Tuple[List[str], List[str]]] = defaultdict(lambda: ([], []))
+    known_dirs = {""}
+
+    def add_dir(rel_dir: str) -> None:
+        while rel_dir not in known_dirs:
+            known_dirs.add(rel_dir)
+            parent, _, name = rel_dir.rpartition("/")
+            children[parent][0].append(name)
+            rel_dir = parent
+
+    for path in files:
+        parent, _, name = path.rpartition("/")
+        add_dir(parent)
+        children[parent][1].append(name)
+    for path in gitlinks:
+        add_dir(path)
+
+    stack = [(top, "")]
+    while stack:
+        dir_path, rel_dir = stack.pop()
+        dirs, dir_files = children.get(rel_dir, ([], []))
+        dirs = list(dirs)
+        yield dir_path, dirs, list(dir_files), {}
+
+        for name in reversed(dirs):
+            child_rel = f"{rel_dir}/{name}" if rel_dir else name
+            stack.append((os.path.join(dir_path, name), child_rel))
+
+
+def classify_files(files: Sequence[FileRecord], workers: int = 1) -> None:
+    """Load content-tier attributes for many scanned files.
+
+    Files are sniffed in a bounded thread pool (serially when ``workers``
+    is 1); each record is updated in place, so list order is preserved.
+    """
+    run_threaded(ensure_content_attributes, files, workers)
+
+
+def apply_duplicates(result: ScanResult, groups: List[DuplicateGroup]) -> None:
+    """Count duplicate copies of a finished scan as noise, in place.
+
+    Copies that are not noise already become DUPLICATE noise: they leave
+    the language counts of the scan and of their directories' subtree
+    totals and are collapsed in the tree like generated files.
+    """
+    result.duplicates = groups
+    if not groups:
+        return
+    # Copies are the records find_duplicates() gave a "duplicate_of"
+    for index in sorted(result.files.extras["duplicate_of"]):
+        file_data = result.files[index]
+        if file_data.get("noise"):
+            continue
+        file_data["noise"] = DUPLICATE
+        stats = result.noise_stats.setdefault(DUPLICATE, {"files": 0, "bytes": 0})
+        stats["files"] += 1
+        stats["bytes"] += file_data["size"]
+        language = file_data["language"]
+        if not language:
+            continue
+        if result.language_stats.get(language):
+            result.language_stats[language] -= 1
+            if not result.language_stats[language]:
+                del result.language_stats[language]
+        directory = file_data.directory
+        while True:
+            dir_stats = result.directory_stats.get(directory)
+            if dir_stats is not None and dir_stats.languages.get(language):
+                dir_stats.languages[language] -= 1
+                if not dir_stats.languages[language]:
+                    del dir_stats.languages[language]
+            if not directory:
+                break
+            directory = directory.rpartition(os.sep)[0]
 
 
-def generate_tree_structure(
-    root_path: str,
-    files: List[Dict[str, Any]],
-    max_depth: Optional[int] = None
-) -> str:
-    """Generate a tree-like string representation of the project structure."""
-    root = Path(root_path)
-    tree_lines = [root.name + "/"]
-    dir_tree: Dict[str, List[str]] = defaultdict(list)
-
-    for file_info in files:
-        file_path = Path(file_info["path"])
+def _excluded_file_size(file_path: str, stat: Optional[os.stat_result]) -> int:
+    """Size of an excluded file, from the walk's stat result when it has one."""
+    if stat is None:
         try:
-            rel_path = file_path.relative_to(root)
-            parts = rel_path.parts
+            stat = os.stat(file_path, follow_symlinks=False)
+        except OSError:
+            return 0
+    return stat.st_size
 
-            if max_depth and len(parts) > max_depth:
-                continue
 
-            current = ""
-            for part in parts[:-1]:
-                parent = current
-                current = str(Path(current) / part) if current else part
-                if current not in dir_tree[parent]:
-                    dir_tree[parent].append(current)
-
-            parent = str(Path(*parts[:-1])) if len(parts) > 1 else ""
-            file_entry = str(rel_path)
-            if file_entry not in dir_tree[parent]:
-                dir_tree[parent].append(file_entry)
-        except ValueError:
-            continue
+def should_exclude(path: str, exclude_patterns: List[str]) -> bool:
+    """Check if a path should be excluded based on patterns."""
+    return compile_patterns(tuple(exclude_patterns)).matches(path)
 
-    for key in dir_tree:
-        dir_tree[key].sort()
 
-    def add_tree_lines(parent: str, prefix: str, depth: int):
-        if max_depth and depth >= max_depth:
-            return
+def should_include(path: str, include_patterns: Optional[List[str]]) -> bool:
+    """Check if a path should be included based on patterns."""
+    if include_patterns is None or len(include_patterns) == 0:
+        return True
 
-        entries = dir_tree.get(parent, [])
-        for i, entry in enumerate(entries):
-            is_last = (i == len(entries) - 1)
-            entry_path = Path(entry)
-            is_dir = entry in dir_tree
+    return compile_patterns(tuple(include_patterns)).matches(path)
+
+
+def rollup_directory_stats(directory_stats: Dict[str, DirectoryStats]) -> None:
+    """Turn per-directory file totals into subtree totals, in place.
+
+    Every directory must be inserted after its parent (as scan_project()
+    does), so walking the dict backwards visits children before parents.
+    """
+    for rel_dir in reversed(list(directory_stats)):
+        if not rel_dir:
+            continue
+        parent = directory_stats.get(rel_dir.rpartition(os.sep)[0])
+        if parent is not None:
+            parent.merge(directory_stats[rel_dir])
 
-            if is_last:
-                tree_char = "└── "
-                next_prefix = prefix + "    "
-            else:
-                tree_char = "├── "
-                next_prefix = prefix + "│   "
 
-            name = entry_path.name
-            if is_dir:
-                name += "/"
+def directory_stats_table(
+    directory_stats: Dict[str, DirectoryStats],
+    budget: Optional[int] = None
+) -> Dict[str, Any]:
+    """Render directory stats as a compact JSON table keyed by directory.
+
+    Directories without files are left out. With a byte ``budget``,
+    shallower directories are kept first, and the heaviest ones first
+    within a level.
+    """
+    columns = ["files", "bytes", "lines", "languages"]
+    candidates = [
+        (rel_dir, stats) for rel_dir, stats in directory_stats.items()
+        if stats.file_count
+    ]
+    candidates.sort(key=lambda item: (
+        _path_depth(item[0]) if item[0] else 0, -item[1].total_size, item[0]
+    ))
+
+    rows: Dict[str, List[Any]] = {}
+    # Braces, the "columns"/"rows"/"truncated" members and their separators
+    used = json_size({"columns": columns, "rows": {}, "truncated": False})
+    truncated = False
+    for rel_dir, stats in candidates:
+        key = rel_dir.replace(os.sep, "/") if rel_dir else "."
+        row = [
+            stats.file_count,
+            stats.total_size,
+            stats.line_count,
+            dict(sorted(stats.languages.items(), key=lambda item: (-item[1], item[0]))),
+        ]
+        row_size = json_string_size(key) + 2 + json_size(row) + 2
+        if budget is not None and used + row_size > budget:
+            truncated = True
+            break
+        rows[key] = row
+        used += row_size
+
+    return {
+        "columns": columns,
+        "rows": dict(sorted(rows.items())),
+        "truncated": truncated,
+    }
 
-            tree_lines.append(prefix + tree_char + name)
 
-            if is_dir:
-                add_tree_lines(entry, next_prefix, depth + 1)
+def budget_cut(text: str, headings: List[Heading], limit: int, budget: PackBudget) -> str:
+    """Longest prefix of text within ``limit`` budget units, cut at a heading boundary."""
+    prefix = budget.truncate(text, limit)
+    if len(prefix) == len(text):
+        return text
+    return cut_at_heading(text, headings, len(prefix))
 
-    add_tree_lines("", "", 1)
-    return "\n".join(tree_lines)
+
+def doc_digest(
+    docs: List[DocFile],
+    budget: Optional[PackBudget] = None,
+    limit: Optional[int] = None,
+    excerpt_limit: Optional[int] = None
+) -> Dict[str, Any]:
+    """Heading outlines and leading excerpts of documentation files.
+
+    Outlines are added in priority order (see doc_digest.doc_priority())
+    while they fit ``limit`` budget units, out of which DOC_OUTLINE_SHARE
+    goes to outlines first; what is left funds excerpts of the same docs
+    in the same order, each cut at a heading boundary within
+    ``excerpt_limit`` until less than DOC_EXCERPT_MIN_SHARE of it is left.
+    Without a budget every outline is listed and no
+    excerpts are taken.
+    """
+    digest: Dict[str, Any] = {"found": len(docs), "files": [], "truncated": False}
+    if budget is None or limit is None:
+        budget, limit = None, None
+    used = budget.measure(digest) if budget else 0
+    outline_limit = used + int(limit * DOC_OUTLINE_SHARE) if limit is not None else None
+    texts: List[Tuple[Dict[str, Any], str, List[Heading]]] = []
+
+    for doc in docs[:DOC_DIGEST_MAX_FILES]:
+        try:
+            text, _ = read_file_content(doc.path, max_size=DOC_MAX_FILE_SIZE)
+        except FileReadError:
+            continue
+        headings = extract_headings(text, doc.format)
+        entry = {"path": doc.relative_path.replace(os.sep, "/"), "outline": format_outline(headings)}
+        if budget is not None:
+            size = budget.measure(entry) + 1
+            if used + size > outline_limit:
+                digest["truncated"] = True
+                break
+            used += size
+        digest["files"].append(entry)
+        texts.append((entry, text, headings))
+    if len(docs) > DOC_DIGEST_MAX_FILES:
+        digest["truncated"] = True
+
+    if budget is None:
+        return digest
+    excerpt_limit = excerpt_limit or limit
+    for entry, text, headings in texts:
+        available = min(limit - used, excerpt_limit) - budget.measure({"excerpt": ""})
+        if available < excerpt_limit * DOC_EXCERPT_MIN_SHARE:
+            digest["truncated"] = True
+            break
+        excerpt = budget_cut(text, headings, available, budget).strip()
+        if not excerpt:
+            continue
+        entry["excerpt"] = excerpt
+        used += budget.measure({"excerpt": excerpt})
+        if len(excerpt) < len(text.strip()):
+            digest["truncated"] = True
+    return digest
 
 
 def scan_project(
@@ -489,19 +783,72 @@ def scan_project(
     include_patterns: Optional[List[str]] = None,
     exclude_patterns: Optional[List[str]] = None,
     include_file_stats: bool = True,
-    include_git_status: bool = False
+    include_git_status: bool = False,
+    attributes: str = "stat",
+    cache: Optional[ScanCache] = None,
+    backend: str = "auto",
+    respect_gitignore: bool = True,
+    workers: int = DEFAULT_SCAN_WORKERS,
+    default_excludes: bool = True,
+    start_dir: str = "",
+    skip_dirs: Optional[List[str]] = None,
+    dedupe: bool = False
 ) -> ScanResult:
-    """Scan a project directory and collect structure information."""
+    """Scan a project directory and collect structure information.
+
+    With ``attributes="stat"`` (the default) no file is opened: each file
+    record only carries size and language. ``attributes="content"`` also
+    loads binary flag, encoding and line count up front; otherwise they are
+    computed per file by ensure_content_attributes() when needed.
+    ``attributes="text"`` loads them up front only for the files
+    wants_content() selects; lines are then only counted for files with a
+    language that are not noise, however the others were scanned before.
+
+    An optional ScanCache lets unchanged files and directories skip
+    re-sniffing and re-listing; the caller is responsible for saving it.
+
+    ``backend="git"`` enumerates files with git ls-files instead of walking
+    the file system, so git-ignored directories are never visited; "auto"
+    picks it whenever ``repo_path`` is inside a git repository. The file
+    system walk honours nested .gitignore files unless ``respect_gitignore``
+    is False. Directory listing and content classification each use up to
+    ``workers`` threads; per-stage wall times are recorded in ``timings``.
+
+    ``exclude_patterns`` are added on top of the default and ecosystem
+    exclude layers (see exclude_profiles) rather than replacing them;
+    ``default_excludes=False`` leaves only the given patterns. What each
+    layer pruned is recorded in ``exclude_stats``.
+
+    ``start_dir`` restricts the scan to one relative subdirectory and
+    ``skip_dirs`` names relative directories below it that are not
+    entered; paths, depths and .gitignore rules stay relative to
+    ``repo_path``. scan_project_sharded() uses them to split a repository.
+
+    With ``dedupe``, files with identical content are found (see
+    find_duplicates()) and their copies collapsed as DUPLICATE noise;
+    content hashes are kept in the cache, so unchanged files are not read
+    again on later scans.
+    """
     root = Path(repo_path)
 
+    if backend not in SCAN_BACKENDS:
+        raise ValidationError(
+            f"backend must be one of {', '.join(SCAN_BACKENDS)}, got {backend!r}"
+        )
+
+    if attributes not in ATTRIBUTE_TIERS:
+        raise ValidationError(
+            f"attributes must be one of {', '.join(ATTRIBUTE_TIERS)}, got {attributes!r}"
+        )
+
     if not root.exists():
         raise ProjectScannerError(f"Path does not exist: {repo_path}")
 
     if not root.is_dir():
         raise ProjectScannerError(f"Path is not a directory: {repo_path}")
 
-    if exclude_patterns is None:
-        exclude_patterns = DEFAULT_EXCLUDE_PATTERNS
+    exclude_profile = build_exclude_profile(str(root), exclude_patterns, default_excludes)
+    include_matcher = PathMatcher(include_patterns)
 
     result = ScanResult(
         root_path=str(root.absolute()),
@@ -509,16 +856,51 @@ def scan_project(
     )
 
     language_counts: Dict[str, int] = defaultdict(int)
+    directory_stats: Dict[str, DirectoryStats] = {}
     scanned_depth = 0
 
-    try:
-        for root_dir, dirs, files in os.walk(root):
-            current_path = Path(root_dir)
+    top = str(root / start_dir) if start_dir else str(root)
+    skip_set = set(skip_dirs or ())
 
-            try:
-                rel_path = current_path.relative_to(root)
-                current_depth = len(rel_path.parts) if str(rel_path) != "." else 0
-            except ValueError:
+    git_listing = None
+    if backend == "git" or (
+        backend == "auto" and (Path(find_git_root(str(root))) / ".git").exists()
+    ):
+        git_listing = list_git_files(
+            top, [os.path.relpath(d, start_dir or ".") for d in sorted(skip_set)]
+        )
+        if git_listing is None and backend == "git":
+            raise ProjectScannerError(f"git ls-files failed for: {top}")
+
+    if git_listing is not None:
+        result.backend = "git"
+        walker = walk_git_index(top, *git_listing)
+    else:
+        walker = walk_tree(
+            top,
+            cache,
+            respect_gitignore,
+            workers=workers,
+            stat_files=include_file_stats,
+            rel_top=start_dir or ".",
+            rules=load_ancestor_ignore_rules(str(root), start_dir) if respect_gitignore else None
+        )
+
+    root_str = str(root)
+    root_prefix = root_str if root_str.endswith(os.sep) else root_str + os.sep
+    result.files.root_path = root_str
+    to_classify: List[FileRecord] = []
+
+    try:
+        stage_start = time.perf_counter()
+        for root_dir, dirs, files, file_stats in walker:
+            if root_dir == root_str:
+                rel_dir = ""
+                current_depth = 0
+            elif root_dir.startswith(root_prefix):
+                rel_dir = root_dir[len(root_prefix):]
+                current_depth = rel_dir.count(os.sep) + 1
+            else:
                 continue
 
             if current_depth >= max_depth:
@@ -526,54 +908,124 @@ def scan_project(
                 continue
 
             scanned_depth = max(scanned_depth, current_depth)
-
-            dirs[:] = [
-                d for d in dirs
-                if not should_exclude(str(current_path / d), exclude_patterns)
-            ]
-            dirs.sort()
+            dir_stats = directory_stats.get(rel_dir)
+            if dir_stats is None:
+                dir_stats = directory_stats[rel_dir] = DirectoryStats()
+
+            # Patterns match paths relative to the root, so the root's own
+            # location never triggers a rule
+            kept_dirs = []
+            for d in dirs:
+                layer = exclude_profile.layer_for(os.path.join(rel_dir, d) if rel_dir else d)
+                if layer is None:
+                    kept_dirs.append(d)
+                else:
+                    layer.directories += 1
+            if skip_set:
+                kept_dirs = [
+                    d for d in kept_dirs
+                    if (os.path.join(rel_dir, d) if rel_dir else d) not in skip_set
+                ]
+            dirs[:] = sorted(kept_dirs)
 
             result.total_directories += len(dirs)
+            for d in dirs:
+                rel_subdir = os.path.join(rel_dir, d) if rel_dir else d
+                result.directories.append(rel_subdir)
+                directory_stats[rel_subdir] = DirectoryStats()
 
             for filename in sorted(files):
-                file_path = current_path / filename
-                file_path_str = str(file_path)
+                file_path_str = os.path.join(root_dir, filename)
+                relative_path = os.path.join(rel_dir, filename) if rel_dir else filename
 
-                if should_exclude(file_path_str, exclude_patterns):
+                layer = exclude_profile.layer_for(relative_path)
+                if layer is not None:
+                    layer.files += 1
+                    layer.bytes += _excluded_file_size(file_path_str, file_stats.get(filename))
                     continue
 
-                if not should_include(file_path_str, include_patterns):
+                if include_matcher and not include_matcher.matches(relative_path):
                     continue
 
                 result.total_files += 1
 
-                if include_file_stats:
-                    info = get_file_info(file_path_str)
+                if not include_file_stats:
+                    dir_stats.file_count += 1
+                else:
+                    file_data = result.files.append(get_file_stat_data(
+                        file_path_str, relative_path, cache, file_stats.get(filename)
+                    ))
 
-                    file_data = {
-                        "path": file_path_str,
-                        "relative_path": str(file_path.relative_to(root)),
-                        "size": info.size,
-                        "language": info.language,
-                        "is_binary": info.is_binary,
-                    }
+                    if "is_binary" not in file_data and (
+                        attributes == "content"
+                        or attributes == "text" and wants_content(relative_path, file_data["language"])
+                    ):
+                        to_classify.append(file_data)
 
                     if include_git_status:
                         file_data["git_status"] = None
 
-                    result.files.append(file_data)
-                    result.total_size += info.size
+                    result.total_size += file_data["size"]
+
+        result.exclude_stats = exclude_profile.stats()
+        result.timings["enumerate"] = time.perf_counter() - stage_start
+
+        stage_start = time.perf_counter()
+        classify_files(to_classify, workers)
+        if cache is not None:
+            for file_data in to_classify:
+                cache.update_file(file_data["relative_path"], file_data)
+        result.timings["classify"] = time.perf_counter() - stage_start
+
+        # Languages are final once content refinement and .gitattributes
+        # overrides (which are never cached) have been applied.
+        # Generated/vendored/minified files are flagged here as well and left
+        # out of the language counts.
+        stage_start = time.perf_counter()
+        gitattributes = GitAttributes(str(root))
+        files = result.files
+        for index in range(len(files)):
+            posix_path = files.relative_path(index).replace(os.sep, '/')
+            attributes_of_file = gitattributes.attributes_for(posix_path)
+            override = linguist_language(attributes_of_file)
+            if override:
+                files.set_field(index, "language", override)
+            noise = classify_noise(posix_path, attributes_of_file, files.label(index, "content_noise"))
+            files.set_field(index, "noise", noise)
+            language = files.label(index, "language")
+            size = files.sizes[index]
+            if noise:
+                stats = result.noise_stats.setdefault(noise, {"files": 0, "bytes": 0})
+                stats["files"] += 1
+                stats["bytes"] += size
+            elif language:
+                language_counts[language] += 1
+            line_count = files.line_counts[index]
+            if attributes == "text" and (noise or not language):
+                # Not sniffed on a cold scan, so not counted on a warm one either
+                line_count = -1
+            directory_stats[files.directories[files.dir_ids[index]]].add_file(
+                size, line_count, None if noise else language
+            )
+        rollup_directory_stats(directory_stats)
+        result.directory_stats = directory_stats
+        result.language_stats = dict(language_counts)
+        result.timings["aggregate"] = time.perf_counter() - stage_start
 
-                    if info.language:
-                        language_counts[info.language] += 1
+        if dedupe and include_file_stats:
+            stage_start = time.perf_counter()
+            groups, result.dedupe_stats = find_duplicates(result.files, cache, workers)
+            apply_duplicates(result, groups)
+            result.timings["dedupe"] = time.perf_counter() - stage_start
 
-        result.language_stats = dict(language_counts)
+        stage_start = time.perf_counter()
         result.scan_depth = scanned_depth
         result.tree_structure = generate_tree_structure(
             str(root),
             result.files,
             max_depth=max_depth
         )
+        result.timings["tree"] = time.perf_counter() - stage_start
 
         return result
 
@@ -581,24 +1033,609 @@ def scan_project(
         raise ProjectScannerError(f"Failed to scan project: {e}") from e
 
 
+def _scan_shard(
+    repo_path: str,
+    start_dir: str,
+    skip_dirs: List[str],
+    cache: Optional[ScanCache],
+    options: Dict[str, Any]
+) -> Tuple[ScanResult, Optional[ScanCache]]:
+    """Scan one shard of a repository; runs in a worker process.
+
+    The cache partition is returned along with the result so the parent
+    can merge what the shard looked up and stored.
+    """
+    result = scan_project(
+        repo_path, start_dir=start_dir, skip_dirs=skip_dirs, cache=cache, **options
+    )
+    # The merged tree is rendered once by the parent
+    result.tree_structure = ""
+    result.timings.pop("tree", None)
+    return result, cache
+
+
+def _add_counts(target: Dict[str, Dict[str, int]], source: Dict[str, Dict[str, int]]) -> None:
+    for key, counts in source.items():
+        totals = target.setdefault(key, {})
+        for name, value in counts.items():
+            totals[name] = totals.get(name, 0) + value
+
+
+def merge_shard_results(
+    root_path: str,
+    shards: List[Tuple[str, ScanResult]],
+    max_depth: int
+) -> ScanResult:
+    """Merge per-shard scans into the ScanResult of the whole repository.
+
+    ``shards`` pairs each shard's relative root ("" for the repository
+    root) with its result, shallowest first. Shards that skipped a nested
+    shard are missing its directory entries and subtree totals, so each
+    shard root and its ancestors are recorded here, and its subtree totals
+    are added to every ancestor's directory stats.
+    """
+    merged = ScanResult(root_path=root_path, scan_depth=0)
+    if shards:
+        merged.files.root_path = shards[0][1].files.root_path
+    known_dirs = set()
+    language_counts: Dict[str, int] = defaultdict(int)
+
+    def add_directory(rel_dir: str) -> None:
+        if rel_dir not in known_dirs:
+            known_dirs.add(rel_dir)
+            merged.directories.append(rel_dir)
+
+    for start_dir, shard in shards:
+        if shard.backend == "git":
+            merged.backend = "git"
+        present = (
+            shard.total_files or shard.directories
+            or (shard.backend == "walk" and start_dir in shard.directory_stats)
+        )
+        if start_dir and present:
+            ancestor = ""
+            for part in start_dir.split(os.sep):
+                ancestor = os.path.join(ancestor, part) if ancestor else part
+                add_directory(ancestor)
+        for directory in shard.directories:
+            add_directory(directory)
+
+        merged.files.extend(shard.files)
+        merged.total_files += shard.total_files
+        merged.total_size += shard.total_size
+        merged.scan_depth = max(merged.scan_depth, shard.scan_depth)
+        for language, count in shard.language_stats.items():
+            language_counts[language] += count
+        _add_counts(merged.noise_stats, shard.noise_stats)
+        _add_counts(merged.exclude_stats, shard.exclude_stats)
+        for stage, seconds in shard.timings.items():
+            merged.timings[stage] = max(merged.timings.get(stage, 0.0), seconds)
+
+        merged.directory_stats.update(shard.directory_stats)
+        totals = shard.directory_stats.get(start_dir)
+        if start_dir and totals is not None:
+            ancestor = start_dir
+            while ancestor:
+                ancestor = ancestor.rpartition(os.sep)[0]
+                stats = merged.directory_stats.get(ancestor)
+                if stats is None:
+                    stats = merged.directory_stats[ancestor] = DirectoryStats()
+                stats.merge(totals)
+
+    merged.total_directories = len(merged.directories)
+    merged.language_stats = dict(language_counts)
+    merged.tree_structure = generate_tree_structure(root_path, merged.files, max_depth=max_depth)
+    return merged
+
+
+def scan_project_sharded(
+    repo_path: str,
+    max_depth: int = 10,
+    include_patterns: Optional[List[str]] = None,
+    exclude_patterns: Optional[List[str]] = None,
+    attributes: str = "stat",
+    cache: Optional[ScanCache] = None,
+    backend: str = "auto",
+    respect_gitignore: bool = True,
+    workers: int = DEFAULT_SCAN_WORKERS,
+    default_excludes: bool = True,
+    processes: int = DEFAULT_SCAN_PROCESSES,
+    workspaces: Optional[List[Workspace]] = None,
+    dedupe: bool = False
+) -> ScanResult:
+    """Scan a monorepo as one shard per workspace, in parallel processes.
+
+    Workspaces are detected from the root manifests (see workspaces.py)
+    unless given. Each workspace, and the rest of the repository, is
+    scanned by scan_project() in a ProcessPoolExecutor of up to
+    ``processes`` workers (in this process when it is 1), each using up to
+    ``workers`` threads; the shards are merged into one ScanResult equal to
+    an unsharded scan. Without workspaces this is plain scan_project().
+    With ``dedupe``, duplicates are found across shards after the merge.
+    """
+    root = Path(repo_path)
+    if workspaces is None:
+        exclude_profile = build_exclude_profile(str(root), exclude_patterns, default_excludes)
+        workspaces = detect_workspaces(str(root), skip=exclude_profile)
+    # Workspaces at or below the depth limit stay in their parent shard
+    workspaces = [ws for ws in workspaces if _path_depth(ws.path) < max_depth]
+
+    options = dict(
+        max_depth=max_depth,
+        include_patterns=include_patterns,
+        exclude_patterns=exclude_patterns,
+        attributes=attributes,
+        backend=backend,
+        respect_gitignore=respect_gitignore,
+        workers=workers,
+        default_excludes=default_excludes,
+    )
+    if not workspaces:
+        return scan_project(repo_path, cache=cache, dedupe=dedupe, **options)
+
+    roots = [""] + [ws.path for ws in workspaces]
+    root_set = set(roots)
+    nested: Dict[str, List[str]] = {shard_root: [] for shard_root in roots}
+    for shard_root in roots[1:]:
+        parent = os.path.dirname(shard_root)
+        while parent not in root_set:
+            parent = os.path.dirname(parent)
+        nested[parent].append(shard_root)
+
+    partitions = cache.partition(roots) if cache is not None else {}
+    stage_start = time.perf_counter()
+    shard_results: Dict[str, ScanResult] = {}
+    if processes > 1:
+        with ProcessPoolExecutor(max_workers=min(processes, len(roots))) as pool:
+            futures = {
+                shard_root: pool.submit(
+                    _scan_shard, str(root), shard_root, nested[shard_root],
+                    partitions.get(shard_root), options
+                )
+                for shard_root in roots
+            }
+            for shard_root, future in futures.items():
+                shard_results[shard_root], partition = future.result()
+                if partition is not None:
+                    cache.absorb(partition)
+    else:
+        for shard_root in roots:
+            shard_results[shard_root], _ = _scan_shard(
+                str(root), shard_root, nested[shard_root], cache, options
+            )
+    shards_time = time.perf_counter() - stage_start
+
+    stage_start = time.perf_counter()
+    ordered = sorted(shard_results.items(), key=lambda item: (item[0].count(os.sep), item[0]))
+    merged = merge_shard_results(str(root.absolute()), ordered, max_depth)
+    for ws in workspaces:
+        stats = merged.directory_stats.get(ws.path)
+        merged.workspaces.append({
+            "path": ws.path.replace(os.sep, "/"),
+            "name": ws.name,
+            "kind": ws.kind,
+            "files": stats.file_count if stats else 0,
+            "bytes": stats.total_size if stats else 0,
+        })
+    merged.timings["shards"] = shards_time
+    merged.timings["merge"] = time.perf_counter() - stage_start
+
+    if dedupe:
+        stage_start = time.perf_counter()
+        groups, merged.dedupe_stats = find_duplicates(merged.files, cache, workers)
+        apply_duplicates(merged, groups)
+        if groups:
+            merged.tree_structure = generate_tree_structure(
+                merged.root_path, merged.files, max_depth=max_depth
+            )
+        merged.timings["dedupe"] = time.perf_counter() - stage_start
+    return merged
+
+
+def _path_depth(relative_path: str) -> int:
+    """Return the number of components in a relative path."""
+    return relative_path.count(os.sep) + 1
+
+
+def _count_files(result: ScanResult, language_counts: Dict[str, int]) -> None:
+    """Add the file, size, noise and language totals of ``result.files`` to the result."""
+    files = result.files
+    for index in range(len(files)):
+        size = files.sizes[index]
+        result.total_files += 1
+        result.total_size += size
+        noise = files.label(index, "noise")
+        if noise:
+            stats = result.noise_stats.setdefault(noise, {"files": 0, "bytes": 0})
+            stats["files"] += 1
+            stats["bytes"] += size
+        else:
+            language = files.label(index, "language")
+            if language:
+                language_counts[language] += 1
+
+
+def limit_scan_depth(scan_result: ScanResult, max_depth: int) -> ScanResult:
+    """Derive a depth-limited ScanResult from an existing scan without touching disk.
+
+    The result is identical to calling scan_project() with the smaller
+    max_depth, provided the source scan was run with at least that depth
+    and the same include/exclude patterns.
+    """
+    limited = ScanResult(
+        root_path=scan_result.root_path,
+        scan_depth=max_depth
+    )
+    language_counts: Dict[str, int] = defaultdict(int)
+
+    files = scan_result.files
+    # A file's depth is its directory's depth plus one
+    shallow_dirs = {
+        directory_id for directory_id, directory in enumerate(files.directories)
+        if (_path_depth(directory) if directory else 0) < max_depth
+    }
+    limited.files = files.select(
+        index for index, directory_id in enumerate(files.dir_ids) if directory_id in shallow_dirs
+    )
+    _count_files(limited, language_counts)
+
+    scanned_depth = 0
+    for directory in scan_result.directories:
+        depth = _path_depth(directory)
+        if depth > max_depth:
+            continue
+        limited.directories.append(directory)
+        limited.total_directories += 1
+        if depth < max_depth:
+            scanned_depth = max(scanned_depth, depth)
+
+    limited.language_stats = dict(language_counts)
+    limited.scan_depth = scanned_depth
+    limited.tree_structure = generate_tree_structure(
+        scan_result.root_path,
+        limited.files,
+        max_depth=max_depth
+    )
+
+    return limited
+
+
+def subset_scan(scan_result: ScanResult, rel_dir: str, max_depth: int) -> ScanResult:
+    """Re-root an existing scan at one of its directories without touching disk.
+
+    File records are copied with paths relative to ``rel_dir``; exclude
+    statistics are not split per directory and are left empty.
+    """
+    prefix = rel_dir + os.sep
+    sub = ScanResult(
+        root_path=os.path.join(scan_result.root_path, rel_dir),
+        scan_depth=0,
+        backend=scan_result.backend
+    )
+    language_counts: Dict[str, int] = defaultdict(int)
+
+    sub.files = scan_result.files.subset(rel_dir)
+    _count_files(sub, language_counts)
+
+    for directory in scan_result.directories:
+        if directory.startswith(prefix):
+            relative = directory[len(prefix):]
+            sub.directories.append(relative)
+            if _path_depth(relative) < max_depth:
+                sub.scan_depth = max(sub.scan_depth, _path_depth(relative))
+    sub.total_directories = len(sub.directories)
+
+    for directory, stats in scan_result.directory_stats.items():
+        if directory == rel_dir:
+            sub.directory_stats[""] = stats
+        elif directory.startswith(prefix):
+            sub.directory_stats[directory[len(prefix):]] = stats
+
+    sub.language_stats = dict(language_counts)
+    sub.tree_structure = generate_tree_structure(sub.root_path, sub.files, max_depth=max_depth)
+    return sub
+
+
 def collect_context(
     repo_path: str,
     max_depth: int = 10,
     include_patterns: Optional[List[str]] = None,
-    exclude_patterns: Optional[List[str]] = None
+    exclude_patterns: Optional[List[str]] = None,
+    cache_path: Optional[str] = None,
+    backend: str = "auto",
+    respect_gitignore: bool = True,
+    workers: int = DEFAULT_SCAN_WORKERS,
+    tree_mode: str = "priority",
+    default_excludes: bool = True,
+    processes: int = DEFAULT_SCAN_PROCESSES,
+    shard_workspaces: bool = True,
+    workspace_packs: bool = False,
+    max_tokens: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+    index_symbols: bool = True,
+    symbol_index_path: Optional[str] = None,
+    index_imports: bool = True,
+    import_index_path: Optional[str] = None,
+    churn_since: Optional[str] = DEFAULT_CHURN_SINCE,
+    dedupe: bool = True,
+    output_dir: Optional[str] = None
 ) -> Dict[str, Any]:
-    """Collect comprehensive project context."""
+    """Collect comprehensive project context.
+
+    When ``cache_path`` is given, file attributes and directory listings are
+    reused from (and saved back to) a persistent ScanCache at that path.
+    ``tree_mode`` picks how an over-budget tree is shrunk (see TREE_MODES).
+    ``exclude_patterns`` extend the default and ecosystem exclude layers
+    unless ``default_excludes`` is False.
+
+    Monorepo workspaces are scanned as parallel shards in up to
+    ``processes`` processes unless ``shard_workspaces`` is False (see
+    scan_project_sharded()). With ``workspace_packs``, a separate context
+    pack per workspace is returned under the "workspace_packs" key, keyed
+    by workspace path; callers write those out separately.
+
+    The pack is budgeted in estimated tokens (``max_tokens``) or in bytes
+    (``max_bytes``); without either, DEFAULT_MAX_TOKENS applies unless
+    DOC_GEN_DEFAULT_MAX_BYTES is set. Token counts are cached next to the
+    scan cache.
+
+    With ``index_symbols``, the top-level symbols of the scanned source
+    files are indexed (see symbol_index) and summarized in the pack; the
+    index is reused from and saved to ``symbol_index_path`` when given.
+    With ``index_imports``, their imports are resolved into a directory
+    import graph (see import_graph) the same way, cached at
+    ``import_index_path``.
+
+    Unless ``churn_since`` is None, the git history since then is mined for
+    commit counts, lines changed and recency per file and directory (see
+    git_churn); the ranking goes into the pack and weights the tree.
+
+    With ``dedupe``, copies of identical files are collapsed in the tree
+    and listed under their canonical path (see find_duplicates()).
+
+    Documentation under ``output_dir`` (the wiki this tool writes) is not
+    digested as project documentation.
+    """
     if not repo_path or not repo_path.strip():
         raise ValidationError("Repository path cannot be empty")
     if max_depth < 1:
         raise ValidationError(f"max_depth must be at least 1, got {max_depth}")
     if max_depth > 20:
         raise ValidationError(f"max_depth cannot exceed 20, got {max_depth}")
+    if workers < 1:
+        raise ValidationError(f"workers must be at least 1, got {workers}")
+    if processes < 1:
+        raise ValidationError(f"processes must be at least 1, got {processes}")
+    if tree_mode not in TREE_MODES:
+        raise ValidationError(
+            f"tree_mode must be one of {', '.join(TREE_MODES)}, got {tree_mode}"
+        )
+    if max_tokens is not None and max_bytes is not None:
+        raise ValidationError("max_tokens and max_bytes cannot both be set")
+    if max_bytes is None and max_tokens is None and "DOC_GEN_DEFAULT_MAX_BYTES" in os.environ:
+        max_bytes = DEFAULT_MAX_BYTES
+    unit, limit = ("bytes", max_bytes) if max_bytes is not None else ("tokens", DEFAULT_MAX_TOKENS if max_tokens is None else max_tokens)
+    if limit < 1:
+        raise ValidationError(f"max_{unit} must be at least 1, got {limit}")
     repo_path = find_git_root(repo_path)
+
+    token_cache_path = os.path.join(os.path.dirname(cache_path), TOKEN_CACHE_FILENAME) if cache_path else None
+    budget = PackBudget(unit, limit, TokenEstimator.from_env(token_cache_path))
+
+    metadata: Dict[str, Any] = {
+        "repo_path": str(repo_path),
+        "has_readme": False,
+        "budget_used": True,
+    }
+    doc_exclude_dirs = []
+    if output_dir:
+        rel_output = os.path.relpath(os.path.realpath(output_dir), os.path.realpath(repo_path))
+        # Never the repository itself, e.g. for a pack written to its root
+        if rel_output not in (".", "..") and not rel_output.startswith(".." + os.sep):
+            doc_exclude_dirs.append(os.path.normpath(os.path.join(repo_path, rel_output)))
+    full_scan: Optional[ScanResult] = None
+    scan_error: Optional[str] = None
+    workspaces: List[Workspace] = []
+
+    # Walk the tree once at the requested depth; shallower views are
+    # derived from the retained scan in memory.
+    try:
+        # Workspaces shard the scan (unless shard_workspaces is False) and
+        # name the packages imports resolve to either way
+        workspaces = detect_workspaces(
+            str(repo_path), skip=build_exclude_profile(str(repo_path), exclude_patterns, default_excludes)
+        )
+        cache = ScanCache.load(cache_path, repo_path) if cache_path else None
+        full_scan = scan_project_sharded(
+            repo_path=repo_path,
+            max_depth=max_depth,
+            include_patterns=include_patterns,
+            exclude_patterns=exclude_patterns,
+            attributes="text",
+            cache=cache,
+            backend=backend,
+            respect_gitignore=respect_gitignore,
+            workers=workers,
+            default_excludes=default_excludes,
+            processes=processes,
+            workspaces=workspaces if shard_workspaces else [],
+            dedupe=dedupe,
+        )
+        metadata["scan_backend"] = full_scan.backend
+        metadata["excluded"] = full_scan.exclude_stats
+        metadata["scan_timings"] = {
+            stage: round(seconds, 3) for stage, seconds in full_scan.timings.items()
+        }
+        if full_scan.dedupe_stats:
+            metadata["dedupe"] = dict(
+                full_scan.dedupe_stats,
+                groups=len(full_scan.duplicates),
+                files=sum(len(group.copies) for group in full_scan.duplicates),
+            )
+        if full_scan.workspaces:
+            metadata["workspaces"] = full_scan.workspaces
+            if workspace_packs:
+                for workspace in full_scan.workspaces:
+                    workspace["pack"] = workspace_pack_name(workspace["path"])
+        if cache is not None:
+            try:
+                cache.save()
+            except OSError as e:
+                print(f"Warning: could not save scan cache: {e}", file=sys.stderr)
+            metadata["scan_cache"] = cache.stats()
+    except Exception as e:
+        scan_error = str(e)
+
+    symbols: Optional[Dict[str, List[List[Any]]]] = None
+    if index_symbols and full_scan is not None:
+        stage_start = time.perf_counter()
+        try:
+            symbols, symbol_stats = build_symbol_index(
+                repo_path, full_scan.files, symbol_index_path, processes
+            )
+            metadata["symbol_index"] = dict(symbol_stats, path=symbol_index_path)
+        except OSError as e:
+            print(f"Warning: could not build symbol index: {e}", file=sys.stderr)
+        metadata["scan_timings"]["symbols"] = round(time.perf_counter() - stage_start, 3)
+
+    import_edges: Optional[Edges] = None
+    if index_imports and full_scan is not None:
+        stage_start = time.perf_counter()
+        try:
+            imports, import_stats = build_import_index(
+                repo_path, full_scan.files, import_index_path, processes
+            )
+            import_edges, resolve_stats = resolve_import_edges(
+                repo_path,
+                full_scan.files,
+                imports,
+                [
+                    {"path": ws.path.replace(os.sep, "/"), "name": ws.name, "kind": ws.kind}
+                    for ws in workspaces
+                ],
+            )
+            metadata["import_graph"] = dict(import_stats, **resolve_stats, path=import_index_path)
+        except OSError as e:
+            print(f"Warning: could not build import graph: {e}", file=sys.stderr)
+        metadata["scan_timings"]["imports"] = round(time.perf_counter() - stage_start, 3)
+
+    churn: Optional[GitChurn] = None
+    if churn_since is not None and full_scan is not None:
+        stage_start = time.perf_counter()
+        churn = collect_churn(
+            repo_path, [file_data["relative_path"] for file_data in full_scan.files], churn_since
+        )
+        metadata["scan_timings"]["history"] = round(time.perf_counter() - stage_start, 3)
+
+    # Memory high-water mark of the scan and indexing stages
+    memory = peak_rss()
+    if memory is not None:
+        metadata["peak_rss"] = memory
+
+    result = build_context_pack(
+        repo_path, full_scan, max_depth, tree_mode, metadata, scan_error, budget, symbols, import_edges,
+        churn, doc_exclude_dirs
+    )
+
+    if workspace_packs and full_scan is not None:
+        packs: Dict[str, Dict[str, Any]] = {}
+        for workspace in full_scan.workspaces:
+            rel_dir = workspace["path"].replace("/", os.sep)
+            depth = max(1, max_depth - _path_depth(rel_dir))
+            workspace_path = os.path.join(repo_path, rel_dir)
+            workspace_symbols = None
+            if symbols is not None:
+                prefix = rel_dir + os.sep
+                workspace_symbols = {
+                    rel_path[len(prefix):]: file_symbols
+                    for rel_path, file_symbols in symbols.items()
+                    if rel_path.startswith(prefix)
+                }
+            workspace_edges = None
+            if import_edges is not None:
+                workspace_edges = relocate_edges(import_edges, workspace["path"])
+            packs[workspace["path"]] = build_context_pack(
+                workspace_path,
+                subset_scan(full_scan, rel_dir, depth),
+                depth,
+                tree_mode,
+                {
+                    "repo_path": workspace_path,
+                    "has_readme": False,
+                    "budget_used": True,
+                    "workspace": workspace,
+                },
+                budget=budget,
+                symbols=workspace_symbols,
+                import_edges=workspace_edges,
+                churn=churn.subset(rel_dir) if churn is not None else None,
+                doc_exclude_dirs=doc_exclude_dirs,
+            )
+        result["workspace_packs"] = packs
+
+    try:
+        budget.estimator.save()
+    except OSError as e:
+        print(f"Warning: could not save token cache: {e}", file=sys.stderr)
+
+    return result
+
+
+def peak_rss() -> Optional[Dict[str, int]]:
+    """Peak resident set size in bytes of this process and of its finished child processes.
+
+    None where the resource module is unavailable (Windows).
+    """
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return {
+        "process": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale,
+    }
+
+
+def wiki_output_dir(output_path: str) -> str:
+    """Wiki directory of a context pack path ({output_dir}/_context/context_pack.json)."""
+    directory = os.path.dirname(os.path.abspath(output_path))
+    if os.path.basename(directory) == CONTEXT_DIR_NAME:
+        directory = os.path.dirname(directory)
+    return directory
+
+
+def build_context_pack(
+    repo_path: str,
+    full_scan: Optional[ScanResult],
+    max_depth: int,
+    tree_mode: str,
+    metadata: Dict[str, Any],
+    scan_error: Optional[str] = None,
+    budget: Optional[PackBudget] = None,
+    symbols: Optional[Dict[str, List[List[Any]]]] = None,
+    import_edges: Optional[Edges] = None,
+    churn: Optional[GitChurn] = None,
+    doc_exclude_dirs: Sequence[str] = ()
+) -> Dict[str, Any]:
+    """Render a scan, the README of ``repo_path`` and its docs as a budgeted context pack.
+
+    ``metadata`` seeds the pack's metadata (and counts against the budget);
+    a missing scan is reported as ``scan_error`` in the structure section.
+    ``budget`` limits the pack in estimated tokens or bytes (default:
+    DEFAULT_MAX_TOKENS tokens); token budgets are converted to bytes for the
+    tree at the rate measured on a sample of it. ``symbols`` (keyed by
+    relative path, see symbol_index) are summarized as "symbols", and
+    directory ``import_edges`` (see import_graph) as "imports". ``churn``
+    is ranked as "churn" and weights directories in the priority tree.
+    The README and a digest of the other documentation in the scan (see
+    doc_digest()) share README_BUDGET_PCT, cut at heading boundaries;
+    docs under ``doc_exclude_dirs`` (absolute paths) are left out.
+    """
     repo_path_obj = Path(repo_path)
 
-    max_bytes = DEFAULT_MAX_BYTES
-    budget_used = True
+    if budget is None:
+        budget = PackBudget("tokens", DEFAULT_MAX_TOKENS)
+    budget_used = metadata.get("budget_used", True)
     structure_truncated = False
     readme_truncated = False
     actual_max_depth = max_depth
@@ -606,75 +1643,152 @@ def collect_context(
     result: Dict[str, Any] = {
         "structure": {},
         "readme": {},
-        "metadata": {
-            "repo_path": str(repo_path),
-            "has_readme": False,
-            "budget_used": budget_used,
-        }
+        "docs": {},
+        "metadata": metadata,
     }
 
-    # 1. Collect directory structure with adaptive depth reduction
+    # 1. Collect directory structure; an over-budget tree is summarized by
+    #    priority or cut to a uniform depth, depending on tree_mode
+    structure_size = 0
+    temp_structure: Dict[str, Any] = {}
     try:
-        structure_budget = int(max_bytes * STRUCTURE_BUDGET_PCT) if budget_used else float('inf')
+        structure_limit = int(budget.limit * STRUCTURE_BUDGET_PCT) if budget_used else float('inf')
         current_depth = max_depth
         min_depth = 3
-        temp_structure: Dict[str, Any] = {}
-        structure_size = 0
-
-        while current_depth >= min_depth:
-            scan_result = scan_project(
-                repo_path=repo_path,
-                max_depth=current_depth,
-                include_patterns=include_patterns,
-                exclude_patterns=exclude_patterns,
-                include_file_stats=True,
-                include_git_status=False,
+        if full_scan is None:
+            raise ProjectScannerError(scan_error or "Scan failed")
+
+        sample = full_scan.tree_structure[:TOKEN_RATE_SAMPLE_CHARS]
+        full_structure = {
+            "tree": full_scan.tree_structure,
+            "file_count": full_scan.total_files,
+            "directory_count": full_scan.total_directories,
+            "total_size": full_scan.total_size,
+            "total_size_formatted": format_size(full_scan.total_size),
+            "languages": full_scan.language_stats,
+            "noise_files": full_scan.noise_stats,
+            "directory_stats": directory_stats_table(
+                full_scan.directory_stats,
+                budget=budget.to_bytes(DIRECTORY_STATS_BUDGET_PCT, sample) if budget_used else None
+            ),
+        }
+        if symbols is not None:
+            full_structure["symbols"] = symbol_summary(
+                symbols,
+                full_scan.files,
+                budget=budget.to_bytes(SYMBOLS_BUDGET_PCT, sample) if budget_used else None
             )
-
-            temp_structure = {
-                "tree": scan_result.tree_structure,
-                "file_count": scan_result.total_files,
-                "directory_count": scan_result.total_directories,
-                "total_size": scan_result.total_size,
-                "total_size_formatted": format_size(scan_result.total_size),
-                "languages": scan_result.language_stats,
-            }
-
-            structure_size = _calculate_json_size(temp_structure)
-
-            if structure_size <= structure_budget:
-                result["structure"] = temp_structure
-                actual_max_depth = current_depth
-                if current_depth < max_depth:
-                    structure_truncated = True
-                break
-            current_depth -= 1
-        else:
+        if import_edges is not None:
+            full_structure["imports"] = import_graph_summary(
+                import_edges,
+                budget=budget.to_bytes(IMPORT_GRAPH_BUDGET_PCT, sample) if budget_used else None
+            )
+        if full_scan.duplicates:
+            full_structure["duplicates"] = duplicates_summary(
+                full_scan.duplicates,
+                budget=budget.to_bytes(DUPLICATES_BUDGET_PCT, sample) if budget_used else None
+            )
+        if churn is not None:
+            full_structure["churn"] = churn_summary(
+                churn, budget=budget.to_bytes(CHURN_BUDGET_PCT, sample) if budget_used else None
+            )
+        # Members are measured once and then only re-measured as they change
+        structure_tracker = JsonSizeTracker(budget)
+        for key, value in full_structure.items():
+            structure_size = structure_tracker.set(key, value)
+        if tree_mode == "priority" and structure_size > structure_limit:
+            # Budget what is left for the tree once the other fields are counted
+            tree_budget = budget.to_bytes(STRUCTURE_BUDGET_PCT, sample) - (
+                json_size(full_structure) - json_size(full_structure["tree"])
+            )
+            # Token rates of the summarized tree differ from the sample's;
+            # shrink the tree's byte budget until the estimate fits
+            fixed_size = structure_tracker.set("tree", "")
+            dir_weights = churn.dir_weights(full_scan.directory_stats) if churn is not None else None
+            for _ in range(TOKEN_BUDGET_PASSES):
+                tree, summary = summarize_tree_structure(
+                    repo_path,
+                    full_scan.files,
+                    budget=tree_budget,
+                    max_depth=max_depth,
+                    dir_weights=dir_weights,
+                )
+                temp_structure = dict(full_structure, tree=tree)
+                structure_size = structure_tracker.set("tree", tree)
+                if structure_size <= structure_limit:
+                    break
+                tree_budget = int(
+                    tree_budget * (structure_limit - fixed_size) / (structure_size - fixed_size) * 0.98
+                )
             result["structure"] = temp_structure
-            actual_max_depth = min_depth
+            result["metadata"]["tree_summary"] = summary
+            actual_max_depth = summary["depth"]
             structure_truncated = True
+        else:
+            while current_depth >= min_depth:
+                if current_depth == max_depth:
+                    temp_structure = full_structure
+                else:
+                    scan_result = limit_scan_depth(full_scan, current_depth)
+                    changed = dict(
+                        tree=scan_result.tree_structure,
+                        file_count=scan_result.total_files,
+                        directory_count=scan_result.total_directories,
+                        total_size=scan_result.total_size,
+                        total_size_formatted=format_size(scan_result.total_size),
+                        languages=scan_result.language_stats,
+                        noise_files=scan_result.noise_stats,
+                    )
+                    temp_structure = dict(full_structure, **changed)
+                    for key, value in changed.items():
+                        structure_size = structure_tracker.set(key, value)
+
+                if structure_size <= structure_limit:
+                    result["structure"] = temp_structure
+                    actual_max_depth = current_depth
+                    if current_depth < max_depth:
+                        structure_truncated = True
+                    break
+                current_depth -= 1
+            else:
+                result["structure"] = temp_structure
+                actual_max_depth = min_depth
+                structure_truncated = True
     except Exception as e:
         result["structure"]["error"] = str(e)
 
-    # 2. Collect README with budget control
-    readme_names = ["README.md", "README.MD", "README", "Readme.md", "readme.md"]
-    for readme_name in readme_names:
-        readme_path = repo_path_obj / readme_name
+    # 2. Collect README and the documentation digest with budget control
+    docs = find_doc_files(full_scan.files, doc_exclude_dirs) if full_scan is not None else []
+    readme_candidates = [
+        repo_path_obj / readme_name
+        for readme_name in ["README.md", "README.MD", "README", "Readme.md", "readme.md"]
+    ]
+    readme_candidates += [Path(doc.path) for doc in docs if doc.priority[0] == 0]
+    docs_budget: Optional[int] = None
+    if budget_used:
+        result_tracker = JsonSizeTracker(budget)
+        structure_measured = result["structure"] is temp_structure and "error" not in temp_structure
+        result_tracker.set("structure", result["structure"], size=structure_size if structure_measured else None)
+        for key in ("readme", "docs", "metadata"):
+            result_tracker.set(key, result[key])
+        docs_budget = min(int(budget.limit * README_BUDGET_PCT), budget.limit - result_tracker.size)
+    for readme_path in readme_candidates:
         if readme_path.exists() and readme_path.is_file():
             try:
                 content, encoding = read_file_content(str(readme_path))
+                # Extensionless READMEs are read as Markdown
+                readme_format = doc_format(readme_path.name)
+                readme_headings = extract_headings(content, "markdown" if readme_format == "text" else readme_format)
+                readme_real_path = os.path.realpath(readme_path)
+                docs = [doc for doc in docs if os.path.realpath(doc.path) != readme_real_path]
 
                 if budget_used:
-                    current_size = _calculate_json_size(result)
-                    remaining_budget = max_bytes - current_size
-                    readme_budget = int(max_bytes * README_BUDGET_PCT)
-                    effective_readme_budget = min(readme_budget, remaining_budget)
-
-                    if effective_readme_budget > 0:
-                        content_bytes = content.encode('utf-8')
-                        if len(content_bytes) > effective_readme_budget:
-                            truncated_bytes = content_bytes[:effective_readme_budget]
-                            content = truncated_bytes.decode('utf-8', errors='ignore')
+                    readme_budget = int(docs_budget * README_CONTENT_SHARE) if docs else docs_budget
+
+                    if readme_budget > 0:
+                        truncated = budget_cut(content, readme_headings, readme_budget, budget)
+                        if len(truncated) < len(content):
+                            content = truncated
                             readme_truncated = True
                     else:
                         content = "[README content omitted due to budget constraints]"
@@ -693,16 +1807,57 @@ def collect_context(
     if not result["metadata"]["has_readme"]:
         result["readme"]["error"] = "No README file found"
 
-    total_size = _calculate_json_size(result)
+    if budget_used:
+        docs_budget -= budget.measure(result["readme"].get("content", ""))
+        result["docs"] = doc_digest(
+            docs,
+            budget,
+            limit=max(0, docs_budget),
+            excerpt_limit=int(budget.limit * README_BUDGET_PCT * DOC_EXCERPT_SHARE)
+        )
+    else:
+        result["docs"] = doc_digest(docs)
 
+    estimator = budget.estimator
     result["metadata"].update({
-        "total_size": total_size,
-        "total_size_formatted": format_size(total_size),
         "structure_truncated": structure_truncated,
         "structure_depth_used": actual_max_depth,
         "readme_truncated": readme_truncated,
+        "budget": {"unit": budget.unit, "limit": budget.limit},
+        "token_estimator": estimator.name,
+        # Placeholders at the width of the final values, filled in below
+        "estimated_tokens": {
+            "structure": budget.limit, "readme": budget.limit, "docs": budget.limit, "total": budget.limit
+        },
+        "total_size": budget.limit,
+        "total_size_formatted": format_size(budget.limit),
     })
 
+    # Final exact check: budgets above count the raw README, so JSON
+    # escaping can still push the pack over; trim exactly the overflow off
+    # the README's end (a heading-aware cut here could drop far more).
+    overflow = budget.measure(result) - budget.limit
+    while budget_used and overflow > 0 and result["readme"].get("content"):
+        content = result["readme"]["content"]
+        trimmed = budget.truncate(content, budget.measure_text(content) - overflow)
+        if trimmed == content:
+            break
+        result["readme"]["content"] = trimmed
+        result["metadata"]["readme_truncated"] = True
+        overflow = budget.measure(result) - budget.limit
+
+    result["metadata"]["estimated_tokens"] = {
+        "structure": estimator.count(json.dumps(result["structure"], ensure_ascii=False)),
+        "readme": estimator.count(result["readme"].get("content", "")),
+        "docs": estimator.count(json.dumps(result["docs"], ensure_ascii=False)),
+    }
+    total_size = calculate_json_size(result)
+    result["metadata"]["total_size"] = total_size
+    result["metadata"]["total_size_formatted"] = format_size(total_size)
+    result["metadata"]["estimated_tokens"]["total"] = estimator.count(
+        json.dumps(result, ensure_ascii=False)
+    )
+
     return result
 
 
@@ -731,22 +1886,150 @@ def main() -> int:
         "--exclude",
         action="append",
         dest="exclude_patterns",
-        help="Exclude patterns (can be repeated)"
+        help="Exclude patterns, added to the default and ecosystem excludes (can be repeated)"
+    )
+    parser.add_argument(
+        "--no-default-excludes",
+        action="store_false",
+        dest="default_excludes",
+        help="Only apply --exclude patterns, not the built-in default and ecosystem excludes"
     )
     parser.add_argument(
         "--output",
         help="Output file path (default: stdout)"
     )
+    parser.add_argument(
+        "--cache-file",
+        help=f"Scan cache path (default: {CACHE_FILENAME} next to --output)"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Disable the persistent scan cache"
+    )
+    parser.add_argument(
+        "--backend",
+        choices=SCAN_BACKENDS,
+        default="auto",
+        help="File enumeration: git ls-files inside git repos, or a file system walk (default: auto)"
+    )
+    parser.add_argument(
+        "--no-gitignore",
+        action="store_false",
+        dest="respect_gitignore",
+        help="Don't apply .gitignore files when walking the file system"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_SCAN_WORKERS,
+        help=f"Threads for directory listing and file classification; 1 disables threading (default: {DEFAULT_SCAN_WORKERS})"
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=DEFAULT_SCAN_PROCESSES,
+        help=f"Processes for scanning monorepo workspaces in parallel; 1 scans them in this process (default: {DEFAULT_SCAN_PROCESSES})"
+    )
+    parser.add_argument(
+        "--no-workspaces",
+        action="store_false",
+        dest="shard_workspaces",
+        help="Don't detect workspaces; scan the repository as a single shard"
+    )
+    parser.add_argument(
+        "--workspace-packs",
+        action="store_true",
+        help=f"Also write one context pack per workspace to {WORKSPACE_PACK_DIR}/ next to --output"
+    )
+    parser.add_argument(
+        "--tree-mode",
+        choices=TREE_MODES,
+        default="priority",
+        help="How to shrink a tree over budget: expand directories by priority and summarize the rest, or cut all of it to one depth (default: priority)"
+    )
+
+    budget_group = parser.add_mutually_exclusive_group()
+    budget_group.add_argument(
+        "--max-tokens",
+        type=int,
+        help=f"Context pack budget in estimated tokens (default: {DEFAULT_MAX_TOKENS})"
+    )
+    budget_group.add_argument(
+        "--max-bytes",
+        type=int,
+        help="Context pack budget in bytes, instead of tokens"
+    )
+
+    parser.add_argument(
+        "--no-symbols",
+        action="store_false",
+        dest="index_symbols",
+        help=f"Don't index top-level symbols ({SYMBOL_INDEX_FILENAME} next to --output)"
+    )
+    parser.add_argument(
+        "--no-imports",
+        action="store_false",
+        dest="index_imports",
+        help=f"Don't build the directory import graph ({IMPORT_INDEX_FILENAME} next to --output)"
+    )
+    parser.add_argument(
+        "--no-dedupe",
+        action="store_false",
+        dest="dedupe",
+        help="Don't collapse files with identical content"
+    )
+    parser.add_argument(
+        "--churn-since",
+        default=DEFAULT_CHURN_SINCE,
+        help=f"Git history window for the churn ranking, as for git log --since (default: {DEFAULT_CHURN_SINCE})"
+    )
+    parser.add_argument(
+        "--no-churn",
+        action="store_const",
+        const=None,
+        dest="churn_since",
+        help="Don't mine git history for the churn ranking"
+    )
 
     args = parser.parse_args()
+    if args.workspace_packs and not args.output:
+        parser.error("--workspace-packs requires --output")
+    if args.workspace_packs and not args.shard_workspaces:
+        parser.error("--workspace-packs cannot be combined with --no-workspaces")
+
+    cache_path = args.cache_file
+    if cache_path is None and args.output:
+        cache_path = str(Path(args.output).parent / CACHE_FILENAME)
+    if args.no_cache:
+        cache_path = None
 
     try:
         result = collect_context(
             repo_path=args.repo_path,
             max_depth=args.max_depth,
             include_patterns=args.include_patterns,
-            exclude_patterns=args.exclude_patterns
+            exclude_patterns=args.exclude_patterns,
+            cache_path=cache_path,
+            backend=args.backend,
+            respect_gitignore=args.respect_gitignore,
+            workers=args.workers,
+            tree_mode=args.tree_mode,
+            default_excludes=args.default_excludes,
+            processes=args.processes,
+            shard_workspaces=args.shard_workspaces,
+            workspace_packs=args.workspace_packs,
+            max_tokens=args.max_tokens,
+            max_bytes=args.max_bytes,
+            index_symbols=args.index_symbols,
+            symbol_index_path=str(Path(args.output).parent / SYMBOL_INDEX_FILENAME) if args.output else None,
+            index_imports=args.index_imports,
+            import_index_path=str(Path(args.output).parent / IMPORT_INDEX_FILENAME) if args.output else None,
+            churn_since=args.churn_since,
+            dedupe=args.dedupe,
+            output_dir=wiki_output_dir(args.output) if args.output else None
         )
+        workspace_packs = result.pop("workspace_packs", {})
 
         output = json.dumps(result, ensure_ascii=False, indent=2)
 
@@ -755,6 +2038,12 @@ def main() -> int:
             output_path.parent.mkdir(parents=True, exist_ok=True)
             output_path.write_text(output, encoding='utf-8')
             print(f"Context saved to: {args.output}", file=sys.stderr)
+            if workspace_packs:
+                write_workspace_packs(str(output_path.parent), workspace_packs)
+                print(
+                    f"Workspace contexts saved to: {output_path.parent / WORKSPACE_PACK_DIR}",
+                    file=sys.stderr
+                )
         else:
             print(output)
 
@@ -20,7 +20,6 @@ Options:
 """
 
 import argparse
-import fnmatch
 import json
 import re
 import subprocess
@@ -30,6 +29,8 @@ from typing import Dict, Any, List, Optional
 
 import yaml
 
+from path_matcher import SourcePatternMatcher, compile_source_patterns
+
 
 def run_git_command(repo_path: str, args: List[str]) -> str:
     """Run a git command and return output."""
@@ -167,27 +168,7 @@ def load_toc(toc_path: str) -> Dict[str, Any]:
 
 def match_file_to_patterns(filepath: str, patterns: List[str]) -> bool:
     """Check if a file path matches any pattern."""
-    for pattern in patterns:
-        normalized_path = filepath.replace('\\', '/')
-        normalized_pattern = pattern.replace('\\', '/')
-
-        # Folder path matching
-        if normalized_pattern.endswith('/'):
-            folder = normalized_pattern.rstrip('/')
-            if normalized_path.startswith(folder + '/') or normalized_path.startswith(folder):
-                return True
-            continue
-
-        # Glob matching
-        if fnmatch.fnmatch(normalized_path, normalized_pattern):
-            return True
-
-        # Filename matching
-        if '/' not in normalized_pattern and '*' not in normalized_pattern:
-            if Path(normalized_path).name == normalized_pattern:
-                return True
-
-    return False
+    return compile_source_patterns(tuple(patterns)).matches(filepath)
 
 
 def collect_section_sources(toc: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
@@ -413,7 +394,8 @@ def collect_update_context(
             continue
 
         # Find matched files
-        matched = [p for p in changed_paths if match_file_to_patterns(p, patterns)]
+        matcher = compile_source_patterns(tuple(patterns))
+        matched = [p for p in changed_paths if matcher.matches(p)]
         if matched:
             # Get current content from doc
             current_content = ""
@@ -453,10 +435,10 @@ def collect_update_context(
     for info in sections_map.values():
         covered_patterns.update(info.get("source_patterns", []))
 
+    covered_matcher = SourcePatternMatcher(sorted(covered_patterns))
     new_source_files = []
     for f in new_files:
-        is_covered = any(match_file_to_patterns(f["path"], [p]) for p in covered_patterns)
-        if not is_covered:
+        if not covered_matcher.matches(f["path"]):
             new_source_files.append({
                 "path": f["path"],
                 "status": "A",
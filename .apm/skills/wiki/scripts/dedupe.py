@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Content deduplication of scanned files.
+
+Identical copies (vendored libraries checked in twice, copied fixtures,
+generated files committed in several places) are found by grouping files
+of equal size and hashing only those groups. Each group keeps one
+canonical path; the scan counts the other copies as DUPLICATE noise and
+duplicates_summary() lists them for the context pack.
+"""
+
+import hashlib
+import os
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from file_index import run_threaded
+from file_table import FileRecord, FileTable
+from generated_files import classify_path
+from pack_budget import json_size, json_string_size
+from scan_cache import ScanCache
+
+
+# Smallest file fingerprinted for deduplication; tiny identical files
+# (empty __init__.py, .gitkeep, license stubs) are not worth collapsing
+DEDUP_MIN_SIZE = int(os.getenv("DOC_GEN_DEDUP_MIN_SIZE", "1024"))
+HASH_CHUNK_SIZE = 1024 * 1024
+# Copies listed per duplicate group; the rest are counted
+DUPLICATE_COPIES_PER_GROUP = 10
+
+
+@dataclass
+class DuplicateGroup:
+    """Files with identical content; ``copies`` are collapsed in favour of ``canonical``."""
+    canonical: str
+    copies: List[str]
+    size: int
+
+
+def content_hash(file_path: str) -> Optional[str]:
+    """BLAKE2b-128 hex digest of a file's content, or None if it cannot be read."""
+    digest = hashlib.blake2b(digest_size=16)
+    try:
+        with open(file_path, 'rb') as f:
+            while True:
+                chunk = f.read(HASH_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+def _ensure_content_hash(file_data: Dict[str, Any]) -> None:
+    file_data["content_hash"] = content_hash(file_data["path"])
+
+
+def find_duplicates(
+    files: FileTable,
+    cache: Optional[ScanCache] = None,
+    workers: int = 1,
+    min_size: int = DEDUP_MIN_SIZE
+) -> Tuple[List[DuplicateGroup], Dict[str, int]]:
+    """Group scanned files with identical content.
+
+    Files are bucketed by size first; only files sharing a size with
+    another one are hashed (see content_hash()), in up to ``workers``
+    threads. Hashes already in the records, e.g. from the scan cache, are
+    reused and new ones are stored back into ``cache``. Each copy gets a
+    "duplicate_of" field naming its group's canonical file: a path that is
+    not vendored by name if possible, then the shallowest, then the first.
+
+    Returns:
+        (groups, stats) where stats counts the files hashed and reused
+    """
+    by_size: Dict[int, List[int]] = defaultdict(list)
+    for index, size in enumerate(files.sizes):
+        if size >= min_size:
+            by_size[size].append(index)
+    candidates = [files[index] for bucket in by_size.values() if len(bucket) > 1 for index in bucket]
+    to_hash = [file_data for file_data in candidates if not file_data.get("content_hash")]
+
+    run_threaded(_ensure_content_hash, to_hash, workers)
+    if cache is not None:
+        for file_data in to_hash:
+            cache.update_file(file_data["relative_path"], file_data)
+
+    by_content: Dict[Tuple[int, str], List[FileRecord]] = defaultdict(list)
+    for file_data in candidates:
+        if file_data.get("content_hash"):
+            by_content[(file_data["size"], file_data["content_hash"])].append(file_data)
+
+    groups: List[DuplicateGroup] = []
+    for (size, _), members in by_content.items():
+        if len(members) < 2:
+            continue
+        paths = sorted(
+            (file_data["relative_path"] for file_data in members),
+            key=lambda path: (
+                classify_path(path.replace(os.sep, '/')) is not None, path.count(os.sep), path
+            )
+        )
+        canonical = paths[0]
+        for file_data in members:
+            if file_data["relative_path"] != canonical:
+                file_data["duplicate_of"] = canonical
+        groups.append(DuplicateGroup(canonical=canonical, copies=paths[1:], size=size))
+    groups.sort(key=lambda group: (-group.size * len(group.copies), group.canonical))
+
+    return groups, {"hashed": len(to_hash), "hashes_reused": len(candidates) - len(to_hash)}
+
+
+def duplicates_summary(groups: List[DuplicateGroup], budget: Optional[int] = None) -> Dict[str, Any]:
+    """Render duplicate groups as canonical path -> copies, most wasted bytes first.
+
+    Groups with more than DUPLICATE_COPIES_PER_GROUP copies list that many
+    and a count of the rest. With a byte ``budget``, groups are added in
+    order as long as they fit.
+    """
+    summary: Dict[str, Any] = {
+        "groups": len(groups),
+        "files": sum(len(group.copies) for group in groups),
+        "bytes": sum(group.size * len(group.copies) for group in groups),
+        "copies": {},
+        "truncated": False,
+    }
+    used = json_size(summary)
+    for group in groups:
+        copies = [path.replace(os.sep, "/") for path in group.copies[:DUPLICATE_COPIES_PER_GROUP]]
+        if len(group.copies) > DUPLICATE_COPIES_PER_GROUP:
+            copies.append(f"... {len(group.copies) - DUPLICATE_COPIES_PER_GROUP} more")
+        key = group.canonical.replace(os.sep, "/")
+        size = json_string_size(key) + 2 + json_size(copies) + 2
+        if budget is not None and used + size > budget:
+            summary["truncated"] = True
+            break
+        summary["copies"][key] = copies
+        used += size
+    return summary
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Documentation discovery and heading outlines for the context pack digest.
+
+Finds the prose documentation among the files of a scan (the root README,
+architecture and contributing guides, ``docs/`` trees, ADRs, per-package
+READMEs), ranks it, and extracts a heading outline from Markdown,
+reStructuredText and AsciiDoc files. Text is cut at heading boundaries,
+falling back to paragraph and line boundaries, so an excerpt never ends
+mid-section when a whole section fits.
+"""
+
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+DOC_EXTENSIONS = {
+    ".md": "markdown",
+    ".markdown": "markdown",
+    ".mdx": "markdown",
+    ".rst": "rst",
+    ".adoc": "asciidoc",
+    ".asciidoc": "asciidoc",
+    ".txt": "text",
+}
+# Directories whose files are documentation whatever their name
+DOC_DIRS = {"docs", "doc", "documentation", "design", "rfcs", "adr", "adrs", "decisions"}
+ADR_DIRS = {"adr", "adrs", "decisions"}
+
+# Upper-cased file stems, by what they say about the project
+README_NAMES = {"README", "READ_ME", "INDEX", "OVERVIEW"}
+GUIDE_NAMES = {
+    "ARCHITECTURE", "DESIGN", "CONTRIBUTING", "HACKING", "DEVELOPMENT", "DEVELOPING",
+    "INTERNALS", "GETTING_STARTED", "GETTING-STARTED",
+}
+HISTORY_NAMES = {"CHANGELOG", "CHANGES", "HISTORY", "NEWS", "RELEASES", "RELEASE_NOTES", "UPGRADING", "MIGRATION"}
+# Directories of this tool's own output (context packs, caches, reports)
+OUTPUT_DIRS = {"_context", "_reports"}
+SKIPPED_NAMES = {
+    "LICENSE", "LICENCE", "COPYING", "NOTICE", "AUTHORS", "CONTRIBUTORS", "CODEOWNERS",
+    "CODE_OF_CONDUCT", "SECURITY", "SUPPORT", "FUNDING",
+}
+
+DOC_NAMES = README_NAMES | GUIDE_NAMES | HISTORY_NAMES
+
+# Priority tiers, most useful first
+TIER_ROOT_README = 0
+TIER_GUIDE = 1
+TIER_DOCS_INDEX = 2
+TIER_PACKAGE_README = 3
+TIER_DOCS = 4
+TIER_ADR = 5
+TIER_OTHER = 6
+TIER_HISTORY = 7
+
+# Share of the allowed length a heading or paragraph cut has to keep
+CUT_MIN_SHARE = 0.5
+
+# Headings kept per outline, and the deepest level kept
+OUTLINE_MAX_HEADINGS = 40
+OUTLINE_MAX_LEVEL = 3
+
+_ATX_HEADING = re.compile(r'^ {0,3}(#{1,6})[ \t]+(.*?)(?:[ \t]+#+)?[ \t]*$')
+_SETEXT_UNDERLINE = re.compile(r'^ {0,3}(=+|-+)[ \t]*$')
+_FENCE = re.compile(r'^ {0,3}(`{3,}|~{3,})')
+_RST_ADORNMENT = re.compile(r'^([!-/:-@\[-`{-~])\1{2,}[ \t]*$')
+_ADOC_HEADING = re.compile(r'^(={1,6})[ \t]+(\S.*?)[ \t]*$')
+_ADOC_BLOCK = re.compile(r'^(-{4,}|\.{4,}|={4,}|\+{4,}|_{4,}|\*{4,}|/{4,})[ \t]*$')
+
+
+@dataclass
+class DocFile:
+    """A documentation file of a scan, ranked by ``priority`` (lowest first)."""
+    path: str
+    relative_path: str
+    size: int
+    format: str
+    priority: Tuple[int, int, str]
+
+
+@dataclass
+class Heading:
+    """A heading of a document; ``offset`` is where its first line starts."""
+    level: int
+    title: str
+    line: int
+    offset: int
+
+
+def doc_format(relative_path: str) -> Optional[str]:
+    """Documentation format of a path ("markdown", "rst", "asciidoc", "text"), or None.
+
+    Files named like documentation (README, CONTRIBUTING, CHANGELOG, ...)
+    count anywhere; other prose files only at the root or in a docs
+    directory, and plain text only in a docs directory.
+    """
+    name = os.path.basename(relative_path)
+    stem, ext = os.path.splitext(name)
+    ext = ext.lower()
+    if ext in DOC_EXTENSIONS:
+        doc_kind = DOC_EXTENSIONS[ext]
+        if stem.upper() in DOC_NAMES or _in_doc_dir(relative_path):
+            return doc_kind
+        return doc_kind if doc_kind != "text" and os.sep not in relative_path else None
+    if not ext and name.upper() in DOC_NAMES:
+        return "text"
+    return None
+
+
+def _dir_parts(relative_path: str) -> List[str]:
+    return [part.lower() for part in relative_path.split(os.sep)[:-1]]
+
+
+def _in_doc_dir(relative_path: str) -> bool:
+    return any(part in DOC_DIRS for part in _dir_parts(relative_path))
+
+
+def doc_priority(relative_path: str) -> Optional[Tuple[int, int, str]]:
+    """Rank of a documentation file as (tier, depth, path), or None if it is not one."""
+    if doc_format(relative_path) is None:
+        return None
+    stem = os.path.splitext(os.path.basename(relative_path))[0].upper()
+    if stem in SKIPPED_NAMES or "TEMPLATE" in stem:
+        return None
+    parts = _dir_parts(relative_path)
+    depth = len(parts)
+    # .github/ and docs/ hold root-level guides too
+    top_level = depth == 0 or (depth == 1 and parts[0] in {".github", "docs", "doc"})
+
+    if stem in README_NAMES and depth == 0:
+        tier = TIER_ROOT_README
+    elif stem in GUIDE_NAMES and top_level:
+        tier = TIER_GUIDE
+    elif stem in HISTORY_NAMES:
+        tier = TIER_HISTORY
+    elif any(part in ADR_DIRS for part in parts):
+        tier = TIER_ADR
+    elif any(part in DOC_DIRS for part in parts):
+        tier = TIER_DOCS_INDEX if stem in README_NAMES | GUIDE_NAMES else TIER_DOCS
+    elif stem in README_NAMES:
+        tier = TIER_PACKAGE_README
+    elif stem in GUIDE_NAMES:
+        tier = TIER_DOCS
+    else:
+        tier = TIER_OTHER
+    return tier, depth, relative_path
+
+
+def _output_dirs(relative_paths: Iterable[str]) -> List[str]:
+    """Relative paths of OUTPUT_DIRS and of the directories holding them below the root."""
+    directories = set()
+    for relative_path in relative_paths:
+        parts = relative_path.split(os.sep)[:-1]
+        for i, part in enumerate(parts):
+            if part in OUTPUT_DIRS:
+                directories.add(os.sep.join(parts[:i + 1]))
+                if i:
+                    # A wiki written by an earlier run, e.g. docs/wiki/
+                    directories.add(os.sep.join(parts[:i]))
+                break
+    return sorted(directories)
+
+
+def _under(path: str, directories: Iterable[str]) -> bool:
+    return any(path.startswith(directory + os.sep) for directory in directories)
+
+
+def find_doc_files(files: Iterable[Dict[str, Any]], exclude_dirs: Iterable[str] = ()) -> List[DocFile]:
+    """Documentation files among scanned file records, highest priority first.
+
+    Generated, vendored and duplicate files (any ``noise``) are left out,
+    as are files under ``exclude_dirs`` (absolute paths, e.g. the wiki
+    this tool writes), under its ``_context``/``_reports`` directories and
+    under any directory below the root holding one of those, which is a
+    wiki written by an earlier run.
+    """
+    files = list(files)
+    exclude_dirs = [directory.rstrip(os.sep) for directory in exclude_dirs]
+    output_dirs = _output_dirs(file_data["relative_path"] for file_data in files)
+    docs = []
+    for file_data in files:
+        if file_data.get("noise") or file_data.get("is_binary"):
+            continue
+        if _under(file_data["relative_path"], output_dirs) or _under(file_data["path"], exclude_dirs):
+            continue
+        priority = doc_priority(file_data["relative_path"])
+        if priority is None:
+            continue
+        docs.append(DocFile(
+            path=file_data["path"],
+            relative_path=file_data["relative_path"],
+            size=file_data["size"],
+            format=doc_format(file_data["relative_path"]),
+            priority=priority,
+        ))
+    docs.sort(key=lambda doc: doc.priority)
+    return docs
+
+
+def _line_offsets(lines: List[str]) -> List[int]:
+    offsets = []
+    offset = 0
+    for line in lines:
+        offsets.append(offset)
+        offset += len(line)
+    return offsets
+
+
+def _markdown_headings(lines: List[str], offsets: List[int]) -> List[Heading]:
+    headings = []
+    fence = None
+    start = 0
+    # YAML front matter is not part of the text
+    if lines and lines[0].rstrip() == "---":
+        for i in range(1, len(lines)):
+            if lines[i].rstrip() in ("---", "..."):
+                start = i + 1
+                break
+    previous_text = False
+    for i in range(start, len(lines)):
+        line = lines[i].rstrip("\r\n")
+        match = _FENCE.match(line)
+        if fence:
+            if match and match.group(1)[0] == fence[0] and len(match.group(1)) >= len(fence):
+                fence = None
+            previous_text = False
+            continue
+        if match:
+            fence = match.group(1)
+            previous_text = False
+            continue
+        match = _ATX_HEADING.match(line)
+        if match:
+            title = match.group(2).strip()
+            if title:
+                headings.append(Heading(len(match.group(1)), title, i + 1, offsets[i]))
+            previous_text = False
+            continue
+        match = _SETEXT_UNDERLINE.match(line)
+        if match and previous_text:
+            title = lines[i - 1].strip()
+            level = 1 if match.group(1)[0] == "=" else 2
+            headings.append(Heading(level, title, i, offsets[i - 1]))
+            previous_text = False
+            continue
+        stripped = line.strip()
+        # Only a plain paragraph line can be a setext title
+        previous_text = bool(stripped) and not stripped.startswith(("-", "*", "+", ">", "|", "<"))
+    return headings
+
+
+def _rst_headings(lines: List[str], offsets: List[int]) -> List[Heading]:
+    headings = []
+    styles: List[Tuple[str, bool]] = []
+    i = 0
+    while i < len(lines) - 1:
+        line = lines[i].rstrip("\r\n")
+        title_index = None
+        overline = False
+        if _RST_ADORNMENT.match(line) and i + 2 < len(lines):
+            # Overline, title, underline of the same character
+            under = lines[i + 2].rstrip("\r\n")
+            title = lines[i + 1].strip()
+            if title and under.strip() and under.strip()[0] == line.strip()[0] and _RST_ADORNMENT.match(under):
+                title_index, overline = i + 1, True
+        if title_index is None:
+            under = lines[i + 1].rstrip("\r\n")
+            title = line.strip()
+            if (
+                title
+                and not _RST_ADORNMENT.match(line)
+                and not line[:1].isspace()
+                and _RST_ADORNMENT.match(under)
+                and len(under.rstrip()) >= len(title)
+            ):
+                title_index = i
+        if title_index is None:
+            i += 1
+            continue
+        char = lines[title_index + 1].strip()[0]
+        style = (char, overline)
+        if style not in styles:
+            styles.append(style)
+        start = title_index - 1 if overline else title_index
+        headings.append(Heading(styles.index(style) + 1, lines[title_index].strip(), title_index + 1, offsets[start]))
+        i = title_index + 2
+    return headings
+
+
+def _asciidoc_headings(lines: List[str], offsets: List[int]) -> List[Heading]:
+    headings = []
+    block = None
+    for i, raw in enumerate(lines):
+        line = raw.rstrip("\r\n")
+        match = _ADOC_BLOCK.match(line)
+        if block:
+            if line.strip() == block:
+                block = None
+            continue
+        if match:
+            block = match.group(1)
+            continue
+        match = _ADOC_HEADING.match(line)
+        if match:
+            headings.append(Heading(len(match.group(1)), match.group(2), i + 1, offsets[i]))
+    return headings
+
+
+def extract_headings(text: str, doc_kind: str) -> List[Heading]:
+    """Headings of a document in order; plain text has none."""
+    lines = text.splitlines(keepends=True)
+    offsets = _line_offsets(lines)
+    if doc_kind == "markdown":
+        return _markdown_headings(lines, offsets)
+    if doc_kind == "rst":
+        return _rst_headings(lines, offsets)
+    if doc_kind == "asciidoc":
+        return _asciidoc_headings(lines, offsets)
+    return []
+
+
+def format_outline(
+    headings: List[Heading],
+    max_level: int = OUTLINE_MAX_LEVEL,
+    max_headings: int = OUTLINE_MAX_HEADINGS
+) -> List[str]:
+    """Render headings as Markdown-style outline lines, e.g. "## Installation".
+
+    Levels below ``max_level`` are dropped first; if there are still more
+    than ``max_headings``, the list is cut and the rest counted.
+    """
+    kept = [heading for heading in headings if heading.level <= max_level]
+    outline = [f"{'#' * heading.level} {heading.title}" for heading in kept[:max_headings]]
+    if len(kept) > max_headings:
+        outline.append(f"... {len(kept) - max_headings} more")
+    return outline
+
+
+def cut_at_heading(text: str, headings: List[Heading], max_chars: int) -> str:
+    """Longest prefix of ``text`` within ``max_chars`` that ends before a heading.
+
+    A heading is only taken if the prefix keeps at least CUT_MIN_SHARE of
+    ``max_chars``; failing that the cut falls back to the last paragraph
+    break, then the last line break under the same condition, then
+    ``max_chars`` itself.
+    """
+    if len(text) <= max_chars:
+        return text
+    min_cut = int(max_chars * CUT_MIN_SHARE)
+    cut = 0
+    for heading in headings:
+        if heading.offset > max_chars:
+            break
+        cut = heading.offset
+    if cut < min_cut:
+        cut = text.rfind("\n\n", 0, max_chars + 1)
+    if cut < min_cut:
+        cut = text.rfind("\n", 0, max_chars + 1)
+    if cut < min_cut:
+        cut = max_chars
+    return text[:cut].rstrip()
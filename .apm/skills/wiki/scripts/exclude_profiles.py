@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Layered exclude profiles for repository scans.
+
+A scan skips paths matched by any of these layers, in order:
+
+1. ``default``: build output, caches and VCS directories of any project
+2. one layer per ecosystem detected from marker files in the repository
+   root or its top-level directories (``package.json`` -> ``.next``,
+   ``.turbo``; ``Cargo.toml`` -> ``target``; ``pom.xml`` -> ``.m2``; ...).
+   A marker in the root applies the preset everywhere; a marker in a
+   top-level directory only applies it below that directory, in a layer
+   named ``<preset>:<directory>``
+3. ``user``: the patterns given on the command line
+
+User patterns add to the built-in layers instead of replacing them. All
+unscoped layers are compiled into one PathMatcher and the scoped ones into
+one per directory, so a path that is not excluded costs at most two
+matches; only excluded paths are attributed to the first layer that
+matches them. A layer records how many directories it pruned and how
+many files it skipped with their bytes (``file_bytes``). Pruned
+directories are never listed, so the files below them are neither
+counted nor sized.
+"""
+
+import fnmatch
+import os
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from path_matcher import PathMatcher
+
+
+DEFAULT_LAYER = "default"
+USER_LAYER = "user"
+
+# Default patterns to exclude
+DEFAULT_EXCLUDE_PATTERNS = [
+    '.git',
+    '.svn',
+    '.hg',
+    'node_modules',
+    '__pycache__',
+    '*.pyc',
+    '.venv',
+    'venv',
+    'env',
+    '.env',
+    'dist',
+    'build',
+    'target',
+    '*.egg-info',
+    '.idea',
+    '.vscode',
+    '.DS_Store',
+    '*.log',
+    '.pytest_cache',
+    '.mypy_cache',
+    '.tox',
+    'coverage',
+    '.coverage',
+]
+
+
+@dataclass(frozen=True)
+class EcosystemPreset:
+    """Exclude patterns that apply when one of the marker files is present."""
+    name: str
+    # File names, or fnmatch globs such as '*.csproj'
+    markers: Tuple[str, ...]
+    patterns: Tuple[str, ...]
+
+
+ECOSYSTEM_PRESETS = (
+    EcosystemPreset(
+        "node",
+        ("package.json",),
+        ('.next', '.nuxt', '.turbo', '.svelte-kit', '.parcel-cache', '.angular',
+         '.expo', '.vercel', '.docusaurus', '.yarn', 'bower_components'),
+    ),
+    EcosystemPreset("rust", ("Cargo.toml",), ('target',)),
+    EcosystemPreset("maven", ("pom.xml",), ('target', '.m2')),
+    EcosystemPreset(
+        "gradle",
+        ("build.gradle", "build.gradle.kts", "settings.gradle", "settings.gradle.kts"),
+        ('.gradle', 'build', '.kotlin'),
+    ),
+    EcosystemPreset(
+        "python",
+        ("pyproject.toml", "setup.py", "setup.cfg", "requirements.txt", "Pipfile"),
+        ('.ruff_cache', '.nox', '.hypothesis', '.pytype', '.pyre', 'htmlcov',
+         '.eggs', '__pypackages__', '*.pyo'),
+    ),
+    EcosystemPreset("dotnet", ("*.csproj", "*.fsproj", "*.vbproj", "*.sln"), ('bin', 'obj', '.vs')),
+    EcosystemPreset("php", ("composer.json",), ('vendor',)),
+    EcosystemPreset("ruby", ("Gemfile",), ('.bundle',)),
+    EcosystemPreset("dart", ("pubspec.yaml",), ('.dart_tool', '.pub-cache')),
+    EcosystemPreset("elixir", ("mix.exs",), ('_build', 'deps', '.elixir_ls')),
+    EcosystemPreset("haskell", ("stack.yaml", "cabal.project", "*.cabal"), ('.stack-work', 'dist-newstyle')),
+    EcosystemPreset("swift", ("Package.swift",), ('.build', '.swiftpm')),
+    EcosystemPreset("cocoapods", ("Podfile",), ('Pods',)),
+    EcosystemPreset("terraform", ("*.tf",), ('.terraform',)),
+    EcosystemPreset("bazel", ("WORKSPACE", "WORKSPACE.bazel", "MODULE.bazel"), ('bazel-*',)),
+    EcosystemPreset("zig", ("build.zig",), ('zig-cache', '.zig-cache', 'zig-out')),
+)
+
+
+@dataclass
+class ExcludeLayer:
+    """One layer of an exclude profile and what it pruned during a scan.
+
+    A layer with a ``scope`` only applies below that top-level directory,
+    matching paths relative to it.
+    """
+    name: str
+    patterns: List[str]
+    scope: str = ""
+    directories: int = 0
+    files: int = 0
+    bytes: int = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Pruned directories, and skipped files with their bytes (not those of pruned directories)."""
+        return {"directories": self.directories, "files": self.files, "file_bytes": self.bytes}
+
+
+def _combine(layers: Iterable[ExcludeLayer]) -> PathMatcher:
+    return PathMatcher(list(dict.fromkeys(p for layer in layers for p in layer.patterns)))
+
+
+class ExcludeProfile:
+    """Exclude layers compiled into one matcher, plus one per layer scope.
+
+    ``profile.layer_for(path)`` returns None for paths that are kept and the
+    first matching layer for excluded ones; callers record the pruned entry
+    on that layer.
+    """
+
+    def __init__(self, layers: Iterable[ExcludeLayer]):
+        self.layers: List[ExcludeLayer] = [layer for layer in layers if layer.patterns]
+        self._matcher = _combine(layer for layer in self.layers if not layer.scope)
+        scoped: Dict[str, List[ExcludeLayer]] = defaultdict(list)
+        for layer in self.layers:
+            if layer.scope:
+                scoped[layer.scope].append(layer)
+        self._scoped_matchers = {scope: _combine(group) for scope, group in scoped.items()}
+        self._layer_matchers = [(layer, PathMatcher(layer.patterns)) for layer in self.layers]
+
+    def __bool__(self) -> bool:
+        return bool(self._matcher) or bool(self._scoped_matchers)
+
+    @property
+    def patterns(self) -> List[str]:
+        """All patterns, scoped ones prefixed with their directory."""
+        return self._matcher.patterns + [
+            f"{scope}/{pattern}"
+            for scope, matcher in self._scoped_matchers.items()
+            for pattern in matcher.patterns
+        ]
+
+    def _scoped_path(self, path: str) -> Tuple[str, str]:
+        """Split a path into (top-level directory, rest) when a scoped layer could match it."""
+        if not self._scoped_matchers:
+            return "", ""
+        scope, _, rest = path.replace('\\', '/').partition('/')
+        if rest and scope in self._scoped_matchers:
+            return scope, rest
+        return "", ""
+
+    def matches(self, path: str) -> bool:
+        """Check if a path is excluded by any layer."""
+        if self._matcher.matches(path):
+            return True
+        scope, rest = self._scoped_path(path)
+        return bool(scope) and self._scoped_matchers[scope].matches(rest)
+
+    def layer_for(self, path: str) -> Optional[ExcludeLayer]:
+        """Return the first layer that excludes a path, or None if it is kept."""
+        if not self.matches(path):
+            return None
+        scope, rest = self._scoped_path(path)
+        for layer, matcher in self._layer_matchers:
+            if not layer.scope:
+                if matcher.matches(path):
+                    return layer
+            elif layer.scope == scope and matcher.matches(rest):
+                return layer
+        return None
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Per-layer pruned directory and skipped file counts and file bytes."""
+        return {layer.name: layer.stats() for layer in self.layers}
+
+
+def _has_marker(names: List[str], markers: Tuple[str, ...]) -> bool:
+    for marker in markers:
+        if any(c in marker for c in '*?['):
+            if fnmatch.filter(names, marker):
+                return True
+        elif marker in names:
+            return True
+    return False
+
+
+def _list_names(path: str) -> Tuple[List[str], List[str]]:
+    """Return (file names, directory names) of a directory, empty if unreadable."""
+    files: List[str] = []
+    dirs: List[str] = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        dirs.append(entry.name)
+                    else:
+                        files.append(entry.name)
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return files, dirs
+
+
+def detect_ecosystems(
+    root_path: str,
+    skip: Optional[PathMatcher] = None
+) -> List[Tuple[EcosystemPreset, str]]:
+    """Find the presets whose marker files sit in the root or a top-level directory.
+
+    Returns (preset, scope) pairs: scope is "" for a marker in the root and
+    the directory name otherwise. A preset found in the root is not also
+    returned for top-level directories. Top-level directories that are
+    hidden or matched by ``skip`` are not looked into.
+    """
+    root_files, root_dirs = _list_names(root_path)
+    listings = [("", root_files)]
+    for name in sorted(root_dirs):
+        if name.startswith('.') or (skip is not None and skip.matches(name)):
+            continue
+        listings.append((name, _list_names(os.path.join(root_path, name))[0]))
+
+    found: List[Tuple[EcosystemPreset, str]] = []
+    for preset in ECOSYSTEM_PRESETS:
+        for scope, names in listings:
+            if _has_marker(names, preset.markers):
+                found.append((preset, scope))
+                if not scope:
+                    break
+    return found
+
+
+def build_exclude_profile(
+    root_path: str,
+    user_patterns: Optional[List[str]] = None,
+    use_defaults: bool = True
+) -> ExcludeProfile:
+    """Build the exclude profile of a repository.
+
+    Args:
+        root_path: Repository root, searched for ecosystem marker files;
+            presets found in a top-level directory only apply below it
+        user_patterns: Extra patterns from the caller, added as the last layer
+        use_defaults: Whether to include the default and ecosystem layers
+
+    Returns:
+        The compiled ExcludeProfile
+    """
+    layers: List[ExcludeLayer] = []
+    if use_defaults:
+        layers.append(ExcludeLayer(DEFAULT_LAYER, list(DEFAULT_EXCLUDE_PATTERNS)))
+        for preset, scope in detect_ecosystems(root_path, skip=PathMatcher(DEFAULT_EXCLUDE_PATTERNS)):
+            name = f"{preset.name}:{scope}" if scope else preset.name
+            layers.append(ExcludeLayer(name, list(preset.patterns), scope=scope))
+    if user_patterns:
+        layers.append(ExcludeLayer(USER_LAYER, list(user_patterns)))
+    return ExcludeProfile(layers)
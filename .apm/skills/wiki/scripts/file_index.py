@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Per-file extraction with a fingerprint cache and a process pool.
+
+Indexes such as the symbol index and the import graph read each source
+file of a scan and keep a small JSON-serializable result per file. They
+share the mechanics here:
+
+- only files in the extractor's languages are read; generated/vendored
+  files, binaries and files over MAX_INDEXED_FILE_SIZE are skipped
+- a saved index is reused per file while its (inode, size, mtime_ns,
+  language) is unchanged, so a warm run only reads changed files
+- files that need extracting are spread over worker processes in chunks
+
+Saved indexes hold ``{"version", "root", "files"}`` with one
+``[inode, size, mtime_ns, language, result]`` entry per relative path.
+
+run_threaded() is the in-process counterpart for per-file work that
+mostly waits on I/O, such as sniffing or hashing files.
+"""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Collection, Dict, List, Optional, Sequence, Tuple
+
+from file_sniffer import sniff_file
+
+
+# Larger files are not indexed; they are rarely hand-written source
+MAX_INDEXED_FILE_SIZE = int(os.getenv("DOC_GEN_INDEX_MAX_FILE_SIZE", str(1024 * 1024)))
+
+# Files sent to a worker process at a time
+EXTRACT_CHUNK_SIZE = 64
+# Items queued per thread at a time when sniffing or hashing files
+THREAD_BATCH_SIZE = 256
+
+# Extractor: (decoded text, language) -> JSON-serializable result. Must be
+# a module-level function so worker processes can unpickle it.
+Extractor = Callable[[str, str], Any]
+
+
+def run_threaded(function: Callable[[Any], Any], items: Sequence[Any], workers: int = 1) -> None:
+    """Call ``function`` on every item in up to ``workers`` threads (serially for 1).
+
+    Items are handed to the pool THREAD_BATCH_SIZE per worker at a time:
+    a pending future costs far more than a file record, so queueing them
+    all at once would dominate peak memory on large scans.
+    """
+    if workers <= 1 or len(items) < 2:
+        for item in items:
+            function(item)
+        return
+
+    batch = workers * THREAD_BATCH_SIZE
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for start in range(0, len(items), batch):
+            for _ in pool.map(function, items[start:start + batch]):
+                pass
+
+
+def extract_file(path: str, language: str, extract: Extractor) -> Any:
+    """Read one file and run an extractor on it; None if it is not readable text."""
+    sniff = sniff_file(path, read_content=True)
+    if sniff.error or sniff.is_binary or sniff.content is None:
+        return None
+    return extract(sniff.content, language)
+
+
+def _extract_chunk(extract: Extractor, root_path: str, items: List[Tuple[str, str]]) -> List[Any]:
+    """Extract a chunk of (relative path, language) pairs; runs in a worker process."""
+    return [
+        extract_file(os.path.join(root_path, rel_path), language, extract)
+        for rel_path, language in items
+    ]
+
+
+def load_index(index_path: Optional[str], root_path: str, version: int) -> Dict[str, List[Any]]:
+    """Entries of a saved index, keyed by relative path; empty if unusable."""
+    if not index_path:
+        return {}
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if (
+        isinstance(data, dict)
+        and data.get("version") == version
+        and data.get("root") == root_path
+        and isinstance(data.get("files"), dict)
+    ):
+        return data["files"]
+    return {}
+
+
+def save_index(index_path: str, root_path: str, version: int, entries: Dict[str, List[Any]]) -> None:
+    """Write an index atomically."""
+    data = {
+        "version": version,
+        "root": root_path,
+        "files": entries,
+    }
+    directory = os.path.dirname(index_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{index_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, index_path)
+
+
+def build_file_index(
+    root_path: str,
+    files: List[Dict[str, Any]],
+    extract: Extractor,
+    languages: Collection[str],
+    version: int,
+    index_path: Optional[str] = None,
+    processes: int = 1
+) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    """Run an extractor over scanned files, reusing unchanged entries of a saved index.
+
+    Args:
+        root_path: Repository root
+        files: Scanned file records with "relative_path", "language" and,
+            if known, "noise"/"is_binary"/"size"
+        extract: Extractor for the text of one file
+        languages: Languages the extractor handles
+        version: Index format version; saved indexes of another version are ignored
+        index_path: Index file to reuse and update (default: in memory only)
+        processes: Worker processes for files that need extracting
+
+    Returns:
+        (results keyed by os.sep-separated relative path, stats) where stats
+        has the indexed file count and cache hits/misses
+    """
+    previous = load_index(index_path, root_path, version)
+    entries: Dict[str, List[Any]] = {}
+    pending: List[Tuple[str, str, os.stat_result]] = []
+    hits = 0
+
+    for file_data in files:
+        language = file_data.get("language")
+        if (
+            language not in languages
+            or file_data.get("noise")
+            or file_data.get("is_binary")
+            or file_data.get("size", 0) > MAX_INDEXED_FILE_SIZE
+        ):
+            continue
+        rel_path = file_data["relative_path"]
+        try:
+            stat = os.stat(os.path.join(root_path, rel_path))
+        except OSError:
+            continue
+        entry = previous.get(rel_path)
+        if entry and entry[:4] == [stat.st_ino, stat.st_size, stat.st_mtime_ns, language]:
+            entries[rel_path] = entry
+            hits += 1
+        else:
+            pending.append((rel_path, language, stat))
+
+    items = [(rel_path, language) for rel_path, language, _ in pending]
+    chunks = [items[i:i + EXTRACT_CHUNK_SIZE] for i in range(0, len(items), EXTRACT_CHUNK_SIZE)]
+    if processes > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=min(processes, len(chunks))) as pool:
+            extracted = [
+                result
+                for chunk_results in pool.map(
+                    _extract_chunk, [extract] * len(chunks), [root_path] * len(chunks), chunks
+                )
+                for result in chunk_results
+            ]
+    else:
+        extracted = [result for chunk in chunks for result in _extract_chunk(extract, root_path, chunk)]
+
+    for (rel_path, language, stat), result in zip(pending, extracted):
+        if result is not None:
+            entries[rel_path] = [stat.st_ino, stat.st_size, stat.st_mtime_ns, language, result]
+
+    if index_path:
+        save_index(index_path, root_path, version, entries)
+
+    return {rel_path: entry[4] for rel_path, entry in entries.items()}, {
+        "files": len(entries),
+        "cache_hits": hits,
+        "cache_misses": len(pending),
+    }
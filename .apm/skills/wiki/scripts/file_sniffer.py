@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Single-read file sniffing shared by the wiki scripts.
+
+Each file is opened once. The first SAMPLE_SIZE bytes decide whether the
+file is binary (null bytes) and which encoding it uses (BOM first, then
+UTF-8 validation, then the fallback encodings). When the content is
+needed, the same buffer is decoded in place, or the file is memory-mapped
+when it is larger than MMAP_THRESHOLD.
+
+Decoded content matches what open(path, 'r', encoding=..., errors='replace')
+would return, including universal newline translation.
+"""
+
+import codecs
+import mmap
+import os
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+
+SAMPLE_SIZE = 8192
+MMAP_THRESHOLD = 1024 * 1024
+
+# Tried in order after BOM detection; the first one that decodes the sample wins.
+ENCODINGS_TO_TRY = ['utf-8', 'utf-16', 'iso-8859-1', 'latin-1', 'ascii', 'gb2312', 'gbk']
+
+BOM_ENCODINGS = [
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+
+@dataclass
+class FileSniff:
+    """Result of sniffing (and optionally reading) a file."""
+    path: str
+    size: int = 0
+    is_binary: bool = False
+    encoding: Optional[str] = None
+    sample: bytes = b""
+    content: Optional[str] = None
+    error: Optional[str] = None
+
+
+def _decodes(sample: bytes, encoding: str) -> bool:
+    # Not final: a multi-byte sequence cut off at the end of the sample is fine.
+    try:
+        codecs.getincrementaldecoder(encoding)().decode(sample, False)
+        return True
+    except (UnicodeDecodeError, UnicodeError, LookupError):
+        return False
+
+
+def detect_sample_encoding(sample: bytes) -> Optional[str]:
+    """Detect the encoding of a byte sample."""
+    for bom, encoding in BOM_ENCODINGS:
+        if sample.startswith(bom):
+            return encoding
+
+    for encoding in ENCODINGS_TO_TRY:
+        if _decodes(sample, encoding):
+            return encoding
+
+    return None
+
+
+def is_binary_sample(sample: bytes) -> bool:
+    """Check whether a byte sample looks binary."""
+    # Anything without null bytes decodes as latin-1, so trying further
+    # encodings could only ever classify the sample as text.
+    return b'\x00' in sample
+
+
+def sniff_bytes(sample: bytes) -> Tuple[bool, Optional[str]]:
+    """Return (is_binary, encoding) for a byte sample."""
+    if is_binary_sample(sample):
+        return True, None
+    return False, detect_sample_encoding(sample)
+
+
+def _translate_newlines(text: str) -> str:
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+
+def decode_buffer(buffer, encoding: str) -> str:
+    """Decode a bytes-like buffer the way text-mode open() would."""
+    return _translate_newlines(str(buffer, encoding, 'replace'))
+
+
+def sniff_file(
+    path: str,
+    read_content: bool = False,
+    max_size: Optional[int] = None,
+    encoding: Optional[str] = None
+) -> FileSniff:
+    """Sniff a file with a single open, optionally decoding its content.
+
+    Args:
+        path: File path
+        read_content: Whether to decode and return the full content
+        max_size: Refuse to read content of files larger than this
+        encoding: Skip encoding detection and decode with this encoding
+
+    Returns:
+        FileSniff; ``error`` is set instead of raising on I/O failures.
+    """
+    result = FileSniff(path=path)
+
+    try:
+        with open(path, 'rb') as f:
+            result.size = os.fstat(f.fileno()).st_size
+
+            if read_content and max_size and result.size > max_size:
+                result.error = f"File too large: {result.size} bytes (max: {max_size})"
+                return result
+
+            if read_content and result.size > MMAP_THRESHOLD:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    result.sample = mm[:SAMPLE_SIZE]
+                    _classify(result, encoding)
+                    if result.encoding and not result.is_binary:
+                        result.content = decode_buffer(mm, result.encoding)
+                return result
+
+            buffer = f.read() if read_content else f.read(SAMPLE_SIZE)
+    except OSError as e:
+        result.error = str(e)
+        return result
+
+    result.sample = buffer[:SAMPLE_SIZE]
+    _classify(result, encoding)
+    if read_content and result.encoding and not result.is_binary:
+        result.content = decode_buffer(buffer, result.encoding)
+
+    return result
+
+
+def _classify(result: FileSniff, encoding: Optional[str]) -> None:
+    result.is_binary = is_binary_sample(result.sample)
+    if result.is_binary:
+        return
+    result.encoding = encoding or detect_sample_encoding(result.sample)
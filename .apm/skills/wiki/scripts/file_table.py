@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Columnar storage of scanned file records.
+
+A scan of a large repository used to keep one dict per file holding its
+absolute and relative path plus a handful of attributes. FileTable keeps
+the same records as parallel columns instead:
+
+- an interned directory table, each file storing the index of its
+  directory and its own (interned) name; paths are joined on demand
+- ``array`` columns for sizes, line counts and the content-tier flag
+- label columns (``array`` of ids into one interned table of strings) for
+  language, noise kind, content noise signal and encoding
+- sparse dicts for attributes few files have (content hash, duplicate_of,
+  git status)
+
+FileRecord is a ``__slots__`` view of one row that reads and writes the
+columns through the dict-style access (``record["size"]``,
+``record.get("noise")``) the scan's consumers use.
+"""
+
+import os
+import sys
+import threading
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional
+
+
+# Columns holding label ids; id 0 is None
+LABEL_FIELDS = ("language", "noise", "content_noise", "encoding")
+# Sparse attributes kept per row only when set
+EXTRA_FIELDS = ("content_hash", "duplicate_of", "git_status")
+# Attributes present once the file's content has been sniffed
+CONTENT_TIER_FIELDS = ("is_binary", "encoding", "line_count", "content_noise")
+
+_UNKNOWN = -1
+# Fields FileTable.append() stores without going through set_field()
+_APPENDED_FIELDS = {"path", "relative_path", "size", "language"}
+
+
+class FileRecord:
+    """View of one row of a FileTable, read and written like a dict."""
+
+    __slots__ = ("table", "index")
+
+    def __init__(self, table: "FileTable", index: int):
+        self.table = table
+        self.index = index
+
+    @property
+    def name(self) -> str:
+        return self.table.names[self.index]
+
+    @property
+    def directory(self) -> str:
+        return self.table.directories[self.table.dir_ids[self.index]]
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self:
+            raise KeyError(key)
+        return self.table.get_field(self.index, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key not in self:
+            return default
+        return self.table.get_field(self.index, key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.table.set_field(self.index, key, value)
+
+    def __contains__(self, key: object) -> bool:
+        return self.table.has_field(self.index, key)
+
+    def keys(self) -> List[str]:
+        return [key for key in self.table.FIELDS if key in self]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: self.table.get_field(self.index, key) for key in self.keys()}
+
+    def __repr__(self) -> str:
+        return f"FileRecord({self.to_dict()!r})"
+
+
+class FileTable:
+    """Scanned file records of one scan root, stored column by column."""
+
+    FIELDS = ("path", "relative_path", "size", "language", "noise") + CONTENT_TIER_FIELDS + EXTRA_FIELDS
+
+    def __init__(self, root_path: str = ""):
+        self.root_path = root_path
+        # Relative directory paths ("" for the root), each stored once
+        self.directories: List[str] = []
+        self._directory_ids: Dict[str, int] = {}
+        # Interned strings of the label columns; id 0 is None
+        self.labels: List[Optional[str]] = [None]
+        self._label_ids: Dict[Optional[str], int] = {None: 0}
+        self._lock = threading.Lock()
+
+        self.dir_ids = array('I')
+        self.names: List[str] = []
+        self.sizes = array('q')
+        self.line_counts = array('q')
+        # -1: content not sniffed yet, else 0/1
+        self.binary_flags = array('b')
+        self.label_columns: Dict[str, array] = {key: array('H') for key in LABEL_FIELDS}
+        self.extras: Dict[str, Dict[int, Any]] = {key: {} for key in EXTRA_FIELDS}
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __iter__(self) -> Iterator[FileRecord]:
+        for index in range(len(self.names)):
+            yield FileRecord(self, index)
+
+    def __getitem__(self, index: int) -> FileRecord:
+        if index < 0:
+            index += len(self.names)
+        if not 0 <= index < len(self.names):
+            raise IndexError("file index out of range")
+        return FileRecord(self, index)
+
+    def directory_id(self, directory: str) -> int:
+        """Id of a relative directory, adding it to the directory table if new."""
+        directory_id = self._directory_ids.get(directory)
+        if directory_id is None:
+            directory_id = self._directory_ids[directory] = len(self.directories)
+            self.directories.append(sys.intern(directory))
+        return directory_id
+
+    def label_id(self, label: Optional[str]) -> int:
+        """Id of a label string; labels may be added from several threads."""
+        label_id = self._label_ids.get(label)
+        if label_id is None:
+            with self._lock:
+                label_id = self._label_ids.get(label)
+                if label_id is None:
+                    label_id = len(self.labels)
+                    self.labels.append(label)
+                    self._label_ids[label] = label_id
+        return label_id
+
+    def label(self, index: int, key: str) -> Optional[str]:
+        """Value of a label column of a row."""
+        return self.labels[self.label_columns[key][index]]
+
+    def relative_path(self, index: int) -> str:
+        directory = self.directories[self.dir_ids[index]]
+        return f"{directory}{os.sep}{self.names[index]}" if directory else self.names[index]
+
+    def path(self, index: int) -> str:
+        return os.path.join(self.root_path, self.relative_path(index))
+
+    def append(self, attributes: Mapping[str, Any]) -> FileRecord:
+        """Add a record from a dict with at least "relative_path"; returns its view."""
+        directory, _, name = attributes["relative_path"].rpartition(os.sep)
+        directory_id = self._directory_ids.get(directory)
+        if directory_id is None:
+            directory_id = self.directory_id(directory)
+        index = len(self.names)
+        self.dir_ids.append(directory_id)
+        self.names.append(sys.intern(name))
+        self.sizes.append(attributes.get("size", 0))
+        self.line_counts.append(_UNKNOWN)
+        self.binary_flags.append(_UNKNOWN)
+        columns = self.label_columns
+        columns["language"].append(self.label_id(attributes.get("language")))
+        columns["noise"].append(0)
+        columns["content_noise"].append(0)
+        columns["encoding"].append(0)
+        if len(attributes) > len(_APPENDED_FIELDS):
+            for key in attributes.keys() - _APPENDED_FIELDS:
+                self.set_field(index, key, attributes[key])
+        return FileRecord(self, index)
+
+    def has_field(self, index: int, key: object) -> bool:
+        if key in ("path", "relative_path", "size", "language", "noise"):
+            return True
+        if key in CONTENT_TIER_FIELDS:
+            return self.binary_flags[index] != _UNKNOWN
+        if key in self.extras:
+            return index in self.extras[key]
+        return False
+
+    def get_field(self, index: int, key: str) -> Any:
+        if key == "relative_path":
+            return self.relative_path(index)
+        if key == "path":
+            return self.path(index)
+        if key == "size":
+            return self.sizes[index]
+        if key in self.label_columns:
+            return self.labels[self.label_columns[key][index]]
+        if key == "is_binary":
+            flag = self.binary_flags[index]
+            return None if flag == _UNKNOWN else bool(flag)
+        if key == "line_count":
+            count = self.line_counts[index]
+            return None if count == _UNKNOWN else count
+        if key in self.extras:
+            return self.extras[key].get(index)
+        raise KeyError(key)
+
+    def set_field(self, index: int, key: str, value: Any) -> None:
+        if key == "size":
+            self.sizes[index] = value
+        elif key in self.label_columns:
+            self.label_columns[key][index] = self.label_id(value)
+        elif key == "is_binary":
+            self.binary_flags[index] = _UNKNOWN if value is None else int(bool(value))
+        elif key == "line_count":
+            self.line_counts[index] = _UNKNOWN if value is None else value
+        elif key in self.extras:
+            self.extras[key][index] = value
+        else:
+            raise KeyError(key)
+
+    def _copy_rows(self, source: "FileTable", rows: Iterable[int], directory_map: Dict[int, int]) -> None:
+        """Append rows of ``source`` whose directory ids map into this table."""
+        label_map = [self.label_id(label) for label in source.labels]
+        label_pairs = [(self.label_columns[key], source.label_columns[key]) for key in LABEL_FIELDS]
+        extra_pairs = [(self.extras[key], source.extras[key]) for key in EXTRA_FIELDS]
+        for row in rows:
+            index = len(self.names)
+            self.dir_ids.append(directory_map[source.dir_ids[row]])
+            self.names.append(source.names[row])
+            self.sizes.append(source.sizes[row])
+            self.line_counts.append(source.line_counts[row])
+            self.binary_flags.append(source.binary_flags[row])
+            for target, column in label_pairs:
+                target.append(label_map[column[row]])
+            for target, values in extra_pairs:
+                if row in values:
+                    target[index] = values[row]
+
+    def extend(self, other: "FileTable") -> None:
+        """Append all records of a table scanned from the same root."""
+        directory_map = {
+            directory_id: self.directory_id(directory)
+            for directory_id, directory in enumerate(other.directories)
+        }
+        self._copy_rows(other, range(len(other)), directory_map)
+
+    def select(self, rows: Iterable[int]) -> "FileTable":
+        """New table with the given rows, in order."""
+        table = FileTable(self.root_path)
+        directory_map = {
+            directory_id: table.directory_id(directory)
+            for directory_id, directory in enumerate(self.directories)
+        }
+        table._copy_rows(self, rows, directory_map)
+        return table
+
+    def subset(self, rel_dir: str) -> "FileTable":
+        """New table of the records under ``rel_dir``, with paths relative to it."""
+        table = FileTable(os.path.join(self.root_path, rel_dir))
+        prefix = rel_dir + os.sep
+        directory_map = {}
+        for directory_id, directory in enumerate(self.directories):
+            if directory == rel_dir:
+                directory_map[directory_id] = table.directory_id("")
+            elif directory.startswith(prefix):
+                directory_map[directory_id] = table.directory_id(directory[len(prefix):])
+        rows = [row for row, directory_id in enumerate(self.dir_ids) if directory_id in directory_map]
+        table._copy_rows(self, rows, directory_map)
+        return table
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Detection of generated, vendored and minified files.
+
+Such files (lock files, protobuf outputs, bundled third-party code,
+minified assets) carry little information for documentation but can take
+a large share of a context budget. A file is classified from, in order of
+precedence:
+
+1. ``.gitattributes``: ``linguist-generated`` / ``linguist-vendored``; an
+   explicit ``-linguist-generated`` or ``-linguist-vendored`` also turns the
+   matching heuristics off
+2. its path: well-known lock files, generated-code suffixes and vendor
+   directories
+3. cheap content signals from the first bytes already read by the sniffer:
+   a "generated" marker in the header, or a very long average line length
+   in JavaScript/CSS-like files
+"""
+
+import re
+from typing import Any, Dict, Optional
+
+
+GENERATED = "generated"
+VENDORED = "vendored"
+MINIFIED = "minified"
+NOISE_KINDS = (GENERATED, VENDORED, MINIFIED)
+# Exact copy of another scanned file. Set by the scan's content
+# deduplication, never by classify_noise().
+DUPLICATE = "duplicate"
+
+# File names produced by package managers
+LOCK_FILENAMES = frozenset({
+    'package-lock.json',
+    'npm-shrinkwrap.json',
+    'yarn.lock',
+    'pnpm-lock.yaml',
+    'bun.lockb',
+    'composer.lock',
+    'gemfile.lock',
+    'cargo.lock',
+    'poetry.lock',
+    'pipfile.lock',
+    'pdm.lock',
+    'uv.lock',
+    'go.sum',
+    'podfile.lock',
+    'packages.lock.json',
+    'flake.lock',
+    'mix.lock',
+    'pubspec.lock',
+})
+
+# Name suffixes of generated sources (protobuf/gRPC, designers, codegen)
+GENERATED_SUFFIXES = (
+    '_pb2.py',
+    '_pb2.pyi',
+    '_pb2_grpc.py',
+    '.pb.go',
+    '.pb.gw.go',
+    '.pb.cc',
+    '.pb.h',
+    '_pb.js',
+    '_pb.d.ts',
+    '_grpc_pb.js',
+    '.pb.swift',
+    '.g.dart',
+    '.freezed.dart',
+    '.designer.cs',
+    '.g.cs',
+    '.generated.cs',
+    '.generated.ts',
+    '.generated.js',
+)
+
+MINIFIED_SUFFIXES = (
+    '.min.js',
+    '.min.mjs',
+    '.min.css',
+    '.js.map',
+    '.css.map',
+)
+
+# Directories holding third-party copies
+VENDOR_DIRS = frozenset({
+    'vendor',
+    'vendors',
+    'third_party',
+    'third-party',
+    'thirdparty',
+    '3rdparty',
+    'bower_components',
+    'node_modules',
+    'jspm_packages',
+})
+
+# Content checks only look at the start of the sample
+HEADER_SIZE = 1024
+HEADER_LINES = 5
+
+# Average line length above which JS/CSS-like files count as minified
+MINIFIED_LINE_LENGTH = 110
+MINIFIED_MIN_SAMPLE = 1024
+MINIFIABLE_EXTENSIONS = ('.js', '.mjs', '.cjs', '.css', '.json', '.svg', '.map')
+
+# Markers at the start of a (comment) line, e.g. "// Code generated by protoc.
+# DO NOT EDIT." or "# This file was automatically generated from foo.yaml".
+# "Do not edit" alone is common in hand-written files ("do not edit without
+# updating X"); it only counts after "generated" on the same line, or as an
+# upper-case comment of its own.
+_GENERATED_HEADER_RE = re.compile(
+    rb'@generated\b'
+    rb'|\bgenerated\b[^\n]*\bdo not (?:edit|modify)\b'
+    rb'|^[ \t]*(?://+|#+|/?\*+|--|;+|<!--|\{-|\(\*)[ \t]*(?-i:DO NOT (?:EDIT|MODIFY))\b'
+    rb'|^\W*this (?:file|code|module) (?:is|was|has been) (?:auto-?|automatically )?generated\b'
+    rb'|^\W*(?:code )?(?:auto-?|automatically |machine[- ])generated\b'
+    rb'|^\W*(?:code )?generated by\b',
+    re.IGNORECASE | re.MULTILINE
+)
+
+
+def _flag(value: Any) -> Optional[bool]:
+    """Read a boolean attribute that may also be written as "=true"/"=false"."""
+    if isinstance(value, str):
+        value = value.lower()
+        return True if value == "true" else False if value == "false" else None
+    return value
+
+
+def classify_path(rel_path: str) -> Optional[str]:
+    """Classify a '/'-separated relative path from its name and directories."""
+    directory, _, name = rel_path.rpartition('/')
+    lower = name.lower()
+
+    if lower in LOCK_FILENAMES or lower.endswith(GENERATED_SUFFIXES):
+        return GENERATED
+    if lower.endswith(MINIFIED_SUFFIXES):
+        return MINIFIED
+    if directory and not VENDOR_DIRS.isdisjoint(directory.lower().split('/')):
+        return VENDORED
+    return None
+
+
+def classify_sample(name: str, sample: bytes) -> Optional[str]:
+    """Classify a text file from its first bytes."""
+    if not sample or b'\x00' in sample:
+        return None
+
+    header = b'\n'.join(sample[:HEADER_SIZE].split(b'\n', HEADER_LINES)[:HEADER_LINES])
+    if _GENERATED_HEADER_RE.search(header):
+        return GENERATED
+
+    if len(sample) >= MINIFIED_MIN_SAMPLE and name.lower().endswith(MINIFIABLE_EXTENSIONS):
+        lines = sample.count(b'\n') + 1
+        if len(sample) / lines > MINIFIED_LINE_LENGTH:
+            return MINIFIED
+    return None
+
+
+def classify_noise(
+    rel_path: str,
+    attributes: Optional[Dict[str, Any]] = None,
+    content_signal: Optional[str] = None
+) -> Optional[str]:
+    """Combine .gitattributes, path heuristics and a content signal.
+
+    Args:
+        rel_path: '/'-separated path relative to the repository root
+        attributes: The path's .gitattributes (see GitAttributes.attributes_for)
+        content_signal: Result of classify_sample(), if the file was sniffed
+
+    Returns:
+        One of NOISE_KINDS, or None for regular files
+    """
+    attributes = attributes or {}
+    generated = _flag(attributes.get("linguist-generated"))
+    vendored = _flag(attributes.get("linguist-vendored"))
+
+    if vendored is True:
+        return VENDORED
+    if generated is True:
+        return GENERATED
+
+    for kind in (classify_path(rel_path), content_signal):
+        if kind is None:
+            continue
+        if kind == VENDORED and vendored is False:
+            continue
+        if kind != VENDORED and generated is False:
+            continue
+        return kind
+    return None
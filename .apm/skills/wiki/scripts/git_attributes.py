@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Read-only .gitattributes lookup for repository scans.
+
+Attribute files are loaded lazily, once per directory, the first time a
+path below that directory is queried. Patterns follow gitattributes(5):
+they use the .gitignore glob syntax (see gitignore_rules), deeper files
+override shallower ones, later lines override earlier ones, and
+``.git/info/attributes`` overrides everything. Each attribute is
+``True`` (set), ``False`` (unset, "-attr") or a string ("attr=value");
+"!attr" returns it to unspecified.
+
+Only the attributes the scripts care about are surfaced by helpers, such
+as ``linguist-language``.
+"""
+
+import os
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+
+from gitignore_rules import parse_rule
+
+
+GITATTRIBUTES_FILENAME = ".gitattributes"
+INFO_ATTRIBUTES_PATH = os.path.join(".git", "info", "attributes")
+
+# Marker for "!attr": removes an attribute set by an earlier rule
+UNSPECIFIED = None
+
+AttributeRule = Tuple[Pattern[str], Dict[str, Any]]
+
+
+def parse_attributes_line(line: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """Parse one .gitattributes line into (pattern, attributes)."""
+    line = line.strip()
+    if not line or line.startswith('#'):
+        return None
+
+    fields = line.split()
+    pattern, tokens = fields[0], fields[1:]
+    attributes: Dict[str, Any] = {}
+    for token in tokens:
+        if token.startswith('-'):
+            attributes[token[1:]] = False
+        elif token.startswith('!'):
+            attributes[token[1:]] = UNSPECIFIED
+        elif '=' in token:
+            key, _, value = token.partition('=')
+            attributes[key] = value
+        else:
+            attributes[token] = True
+    return pattern, attributes
+
+
+def parse_attributes(text: str) -> List[AttributeRule]:
+    """Compile the rules of a .gitattributes file."""
+    rules: List[AttributeRule] = []
+    for line in text.splitlines():
+        parsed = parse_attributes_line(line)
+        if parsed is None:
+            continue
+        pattern, attributes = parsed
+        rule = parse_rule(pattern)
+        # Negative patterns are not allowed in .gitattributes, and patterns
+        # with a trailing slash never match a file.
+        if rule is None or rule.negated or rule.dir_only or not attributes:
+            continue
+        rules.append((rule.regex, attributes))
+    return rules
+
+
+def _load_rules(file_path: str) -> List[AttributeRule]:
+    try:
+        with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+            return parse_attributes(f.read())
+    except OSError:
+        return []
+
+
+class GitAttributes:
+    """Lazily loaded .gitattributes of one repository."""
+
+    def __init__(self, root_path: str):
+        self.root_path = root_path
+        # Relative directory -> its own rules (empty when it has no file)
+        self._dir_rules: Dict[str, List[AttributeRule]] = {}
+        # Relative directory -> (base, rules) of every level that applies, shallow first
+        self._chains: Dict[str, List[Tuple[str, List[AttributeRule]]]] = {}
+        self._info_rules = _load_rules(os.path.join(root_path, INFO_ATTRIBUTES_PATH))
+
+    def _rules_in(self, rel_dir: str) -> List[AttributeRule]:
+        rules = self._dir_rules.get(rel_dir)
+        if rules is None:
+            directory = os.path.join(self.root_path, rel_dir) if rel_dir else self.root_path
+            file_path = os.path.join(directory, GITATTRIBUTES_FILENAME)
+            rules = _load_rules(file_path) if os.path.isfile(file_path) else []
+            self._dir_rules[rel_dir] = rules
+        return rules
+
+    def _chain(self, rel_dir: str) -> List[Tuple[str, List[AttributeRule]]]:
+        chain = self._chains.get(rel_dir)
+        if chain is None:
+            if rel_dir:
+                chain = list(self._chain(rel_dir.rpartition('/')[0]))
+            else:
+                chain = []
+            rules = self._rules_in(rel_dir)
+            if rules:
+                chain.append((rel_dir, rules))
+            self._chains[rel_dir] = chain
+        return chain
+
+    def attributes_for(self, rel_path: str) -> Dict[str, Any]:
+        """Return the attributes of a '/'-separated path relative to the root."""
+        attributes: Dict[str, Any] = {}
+        levels = self._chain(rel_path.rpartition('/')[0])
+        if self._info_rules:
+            levels = levels + [("", self._info_rules)]
+
+        for base, rules in levels:
+            local_path = rel_path[len(base) + 1:] if base else rel_path
+            for regex, values in rules:
+                if regex.match(local_path):
+                    attributes.update(values)
+
+        return {key: value for key, value in attributes.items() if value is not UNSPECIFIED}
+
+    def language_for(self, rel_path: str) -> Optional[str]:
+        """Return the linguist-language override of a path, if any."""
+        return linguist_language(self.attributes_for(rel_path))
+
+
+def linguist_language(attributes: Dict[str, Any]) -> Optional[str]:
+    """Return the linguist-language value from a path's attributes, if set."""
+    language = attributes.get("linguist-language")
+    return language if isinstance(language, str) and language else None
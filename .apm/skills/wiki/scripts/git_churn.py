@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Git history mining: commit counts, lines changed and recency per file.
+
+One streaming ``git log --numstat -z`` pass over a window of history is
+aggregated per file and per directory. Only paths in the current scan are
+kept, so memory is bounded by the scan rather than by the history. Each
+commit adds a hotness of 0.5 ** (age / CHURN_HALF_LIFE_DAYS), so recently
+busy code outranks code that was busy long ago. churn_summary() renders
+the rankings for the context pack within a byte budget.
+"""
+
+import math
+import os
+import subprocess
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Collection, Dict, List, Optional, Set
+
+from pack_budget import json_size, json_string_size
+
+
+# History window, as accepted by git log --since
+DEFAULT_CHURN_SINCE = os.getenv("DOC_GEN_CHURN_SINCE", "1 year ago")
+# Most recent commits read, whatever the window
+DEFAULT_CHURN_MAX_COMMITS = int(os.getenv("DOC_GEN_CHURN_MAX_COMMITS", "20000"))
+# Age at which a commit counts half towards hotness
+CHURN_HALF_LIFE_DAYS = 90
+
+# Tree score multipliers: directories untouched in the window get the
+# lowest, the hottest directory the highest
+COLD_DIRECTORY_WEIGHT = 0.5
+HOT_DIRECTORY_WEIGHT = 2.0
+
+_READ_SIZE = 1 << 16
+_COMMIT_MARKER = "\x01"
+
+
+@dataclass
+class ChurnStats:
+    """History of a file or directory within the window."""
+    commits: int = 0
+    lines: int = 0
+    last_touched: int = 0
+    hotness: float = 0.0
+
+    def add(self, lines: int, timestamp: int, weight: float) -> None:
+        self.commits += 1
+        self.lines += lines
+        self.last_touched = max(self.last_touched, timestamp)
+        self.hotness += weight
+
+    def row(self) -> List[Any]:
+        """Row of GitChurn.COLUMNS."""
+        touched = datetime.fromtimestamp(self.last_touched, timezone.utc).strftime("%Y-%m-%d")
+        return [self.commits, self.lines, touched, round(self.hotness, 2)]
+
+
+@dataclass
+class GitChurn:
+    """Per-file and per-directory history of a repository (os.sep-separated paths)."""
+    since: str
+    commits: int = 0
+    files: Dict[str, ChurnStats] = field(default_factory=dict)
+    directories: Dict[str, ChurnStats] = field(default_factory=dict)
+
+    COLUMNS = ["commits", "lines", "last_touched", "hotness"]
+
+    def ranked_files(self) -> List[str]:
+        return sorted(self.files, key=lambda path: (-self.files[path].hotness, path))
+
+    def ranked_directories(self) -> List[str]:
+        return sorted(self.directories, key=lambda path: (-self.directories[path].hotness, path))
+
+    def dir_weights(self, directories: Collection[str]) -> Dict[str, float]:
+        """Tree score multipliers for ``directories`` (see build_summary_tree()).
+
+        Weights grow with the square root of a directory's subtree hotness
+        relative to the hottest directory. Empty if there is no history.
+        """
+        hottest = max((stats.hotness for stats in self.directories.values()), default=0.0)
+        if hottest <= 0:
+            return {}
+        span = HOT_DIRECTORY_WEIGHT - COLD_DIRECTORY_WEIGHT
+        weights = {}
+        for directory in directories:
+            stats = self.directories.get(directory)
+            hotness = stats.hotness if stats else 0.0
+            weights[directory] = COLD_DIRECTORY_WEIGHT + span * math.sqrt(hotness / hottest)
+        return weights
+
+    def subset(self, directory: str) -> "GitChurn":
+        """History of the paths under ``directory``, relative to it."""
+        prefix = directory + os.sep
+        return GitChurn(
+            since=self.since,
+            commits=self.directories[directory].commits if directory in self.directories else 0,
+            files={
+                path[len(prefix):]: stats for path, stats in self.files.items() if path.startswith(prefix)
+            },
+            directories={
+                path[len(prefix):]: stats for path, stats in self.directories.items() if path.startswith(prefix)
+            },
+        )
+
+
+def _parent_dirs(path: str) -> List[str]:
+    parents = []
+    directory = os.path.dirname(path)
+    while directory:
+        parents.append(directory)
+        directory = os.path.dirname(directory)
+    return parents
+
+
+def iter_log_records(repo_path: str, args: List[str]):
+    """Yield the NUL-separated records of a git log, reading its output in chunks."""
+    proc = subprocess.Popen(
+        ["git", "log"] + args,
+        cwd=repo_path,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        pending = b""
+        while True:
+            chunk = proc.stdout.read(_READ_SIZE)
+            if not chunk:
+                break
+            records = (pending + chunk).split(b'\0')
+            pending = records.pop()
+            for record in records:
+                yield os.fsdecode(record)
+        if pending:
+            yield os.fsdecode(pending)
+    finally:
+        proc.stdout.close()
+        proc.wait()
+
+
+def collect_churn(
+    repo_path: str,
+    paths: Collection[str],
+    since: str = DEFAULT_CHURN_SINCE,
+    max_commits: int = DEFAULT_CHURN_MAX_COMMITS,
+    now: Optional[float] = None
+) -> Optional[GitChurn]:
+    """Aggregate the git history of ``paths`` over a window.
+
+    Args:
+        repo_path: Root of the git work tree
+        paths: os.sep-separated relative paths to keep (the scanned files)
+        since: Window start, in any form git log --since accepts
+        max_commits: Most recent commits to read
+        now: Reference time for hotness decay (default: current time)
+
+    Returns:
+        GitChurn, or None if the history cannot be read. Merge commits and
+        renames are not followed; binary files count commits but no lines.
+    """
+    try:
+        probe = subprocess.run(
+            ["git", "rev-parse", "--verify", "-q", "HEAD"],
+            cwd=repo_path,
+            capture_output=True,
+        )
+    except OSError:
+        return None
+    if probe.returncode != 0:
+        return None
+
+    wanted: Set[str] = set(paths)
+    now = time.time() if now is None else now
+    decay = math.log(2) / (CHURN_HALF_LIFE_DAYS * 86400)
+
+    churn = GitChurn(since=since)
+    timestamp = 0
+    weight = 0.0
+    commit_dirs: Dict[str, int] = {}
+
+    def flush_commit() -> None:
+        for directory, lines in commit_dirs.items():
+            stats = churn.directories.get(directory)
+            if stats is None:
+                stats = churn.directories[directory] = ChurnStats()
+            stats.add(lines, timestamp, weight)
+        commit_dirs.clear()
+
+    args = [
+        "--numstat", "-z", "--no-renames", "--no-merges",
+        f"--format={_COMMIT_MARKER}%ct", f"--since={since}", f"--max-count={max_commits}",
+    ]
+    for record in iter_log_records(repo_path, args):
+        if record.startswith(_COMMIT_MARKER):
+            flush_commit()
+            churn.commits += 1
+            try:
+                timestamp = int(record[1:])
+            except ValueError:
+                timestamp = 0
+            weight = math.exp(-decay * max(0.0, now - timestamp))
+            continue
+        added, _, rest = record.lstrip("\n").partition("\t")
+        deleted, _, path = rest.partition("\t")
+        if os.sep != "/":
+            path = path.replace("/", os.sep)
+        if path not in wanted:
+            continue
+        lines = (int(added) if added.isdigit() else 0) + (int(deleted) if deleted.isdigit() else 0)
+        stats = churn.files.get(path)
+        if stats is None:
+            stats = churn.files[path] = ChurnStats()
+        stats.add(lines, timestamp, weight)
+        for directory in _parent_dirs(path):
+            commit_dirs[directory] = commit_dirs.get(directory, 0) + lines
+    flush_commit()
+    return churn
+
+
+def churn_summary(churn: GitChurn, budget: Optional[int] = None) -> Dict[str, Any]:
+    """Render git churn as directory and file tables ranked by hotness.
+
+    With a byte ``budget``, directories take up to half of it and files the
+    rest, hottest first.
+    """
+    summary: Dict[str, Any] = {
+        "since": churn.since,
+        "commits": churn.commits,
+        "columns": GitChurn.COLUMNS,
+        "directories": {},
+        "files": {},
+        "truncated": False,
+    }
+    used = json_size(summary)
+    for section, ranked, stats, share in (
+        ("directories", churn.ranked_directories(), churn.directories, 0.5),
+        ("files", churn.ranked_files(), churn.files, 1.0),
+    ):
+        limit = None if budget is None else int(budget * share)
+        for rel_path in ranked:
+            key = rel_path.replace(os.sep, "/")
+            row = stats[rel_path].row()
+            size = json_string_size(key) + 2 + json_size(row) + 2
+            if limit is not None and used + size > limit:
+                summary["truncated"] = True
+                break
+            summary[section][key] = row
+            used += size
+    return summary
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Git work tree helpers shared by the scan and the history tools.
+
+Both shell out to ``git`` and degrade gracefully when it is missing or the
+path is not inside a work tree.
+"""
+
+import os
+import re
+import subprocess
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+
+_LS_FILES_STAGE_RE = re.compile(r'^[0-7]{6} [0-9a-f]{40,64} [0-3]\t(.*)$', re.DOTALL)
+GITLINK_MODE = "160000"
+
+
+def find_git_root(start_path: str) -> str:
+    """Find the git repository root by searching for .git directory."""
+    current = Path(start_path).resolve()
+
+    while current != current.parent:
+        if (current / ".git").exists():
+            return str(current)
+        current = current.parent
+
+    if (current / ".git").exists():
+        return str(current)
+
+    return str(Path(start_path).resolve())
+
+
+def _run_git_z(repo_path: str, args: List[str]) -> Optional[List[str]]:
+    """Run a git command with NUL-separated output; None if it fails."""
+    try:
+        proc = subprocess.run(
+            ["git"] + args,
+            cwd=repo_path,
+            capture_output=True
+        )
+    except OSError:
+        return None
+    if proc.returncode != 0:
+        return None
+    return [os.fsdecode(item) for item in proc.stdout.split(b'\0') if item]
+
+
+def list_git_files(
+    repo_path: str,
+    exclude_dirs: Optional[List[str]] = None
+) -> Optional[Tuple[List[str], List[str]]]:
+    """List tracked and untracked, non-ignored files with git ls-files.
+
+    Returns (files, gitlinks) as paths relative to ``repo_path``, or None if
+    ``repo_path`` is not inside a usable git work tree. Ignored directories
+    are never visited, and tracked files deleted from the work tree are
+    left out. ``exclude_dirs`` (relative to ``repo_path``) are left out of
+    the listing altogether.
+    """
+    pathspecs: List[str] = []
+    if exclude_dirs:
+        pathspecs = ["--", "."] + [
+            ":(exclude,literal)" + d.replace(os.sep, "/") for d in exclude_dirs
+        ]
+    entries = _run_git_z(
+        repo_path,
+        ["ls-files", "-z", "--stage", "--cached", "--others", "--exclude-standard"] + pathspecs
+    )
+    if entries is None:
+        return None
+    deleted = _run_git_z(repo_path, ["ls-files", "-z", "--deleted"] + pathspecs) or []
+    deleted_set = set(deleted)
+
+    files: List[str] = []
+    gitlinks: List[str] = []
+    seen = set()
+    for entry in entries:
+        # Index entries carry "<mode> <object> <stage>\t"; untracked ones are bare paths
+        match = _LS_FILES_STAGE_RE.match(entry)
+        path = match.group(1) if match else entry
+        if path in seen or path in deleted_set:
+            continue
+        seen.add(path)
+        if match and entry.startswith(GITLINK_MODE):
+            gitlinks.append(path)
+        else:
+            files.append(path)
+
+    return files, gitlinks
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Hierarchical .gitignore rules for file system walks outside of git.
+
+Each directory that contains a .gitignore gets an IgnoreRules object whose
+rules are compiled once and which inherits the rules of its parent
+directory. Supported syntax follows gitignore(5): comments, escaped
+characters, negation ("!"), anchoring (a slash at the start or middle),
+directory-only rules (trailing slash), "*", "?", character classes and
+the "**" forms. Rules in deeper files take precedence, and within a file
+the last matching rule wins.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Pattern
+
+
+GITIGNORE_FILENAME = ".gitignore"
+
+
+@dataclass
+class IgnoreRule:
+    """A single compiled .gitignore line."""
+    pattern: str
+    regex: Pattern[str]
+    negated: bool = False
+    dir_only: bool = False
+
+
+def _translate_glob(pattern: str) -> str:
+    """Translate a gitignore glob (without anchoring) to a regex body."""
+    i = 0
+    n = len(pattern)
+    out = []
+
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern.startswith('**', i):
+                at_start = i == 0 or pattern[i - 1] == '/'
+                at_end = i + 2 == n or pattern[i + 2] == '/'
+                if at_start and at_end:
+                    if i + 2 == n:
+                        # "dir/**": everything inside
+                        out.append('.*')
+                    else:
+                        # "**/" : zero or more leading directories
+                        out.append('(?:.*/)?')
+                        i += 1
+                    i += 2
+                    continue
+                # A "**" that is not a whole segment acts like "*"
+                i += 1
+            out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            j = i + 1
+            if j < n and pattern[j] in '!^':
+                j += 1
+            if j < n and pattern[j] == ']':
+                j += 1
+            while j < n and pattern[j] != ']':
+                j += 1
+            if j >= n:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:j]
+                if body[:1] in ('!', '^'):
+                    body = '^' + body[1:]
+                out.append('[' + body.replace('\\', '\\\\') + ']')
+                i = j
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+
+    return ''.join(out)
+
+
+def parse_rule(line: str) -> Optional[IgnoreRule]:
+    """Parse one .gitignore line; None for blanks and comments."""
+    line = line.rstrip('\n').rstrip('\r')
+
+    # Trailing spaces are ignored unless escaped
+    stripped = line.rstrip(' ')
+    if stripped.endswith('\\') and len(stripped) < len(line):
+        stripped += ' '
+    line = stripped
+
+    if not line or line.startswith('#'):
+        return None
+
+    negated = False
+    if line.startswith('!'):
+        negated = True
+        line = line[1:]
+    elif line.startswith('\\!') or line.startswith('\\#'):
+        line = line[1:]
+
+    dir_only = line.endswith('/')
+    body = line.rstrip('/')
+    if not body:
+        return None
+
+    anchored = '/' in body
+    body = body.lstrip('/')
+    regex = _translate_glob(body)
+    if not anchored:
+        regex = '(?:.*/)?' + regex
+
+    return IgnoreRule(
+        pattern=line,
+        regex=re.compile(f'^{regex}$', re.DOTALL),
+        negated=negated,
+        dir_only=dir_only
+    )
+
+
+class IgnoreRules:
+    """Compiled rules of one .gitignore, chained to its parent directory's rules."""
+
+    def __init__(
+        self,
+        base: str,
+        rules: List[IgnoreRule],
+        parent: Optional["IgnoreRules"] = None
+    ):
+        # base: directory of the .gitignore relative to the walk root ("" for the root)
+        self.base = base
+        self.rules = rules
+        self.parent = parent
+
+        # Without negations the rule order does not matter, so all rules of
+        # a kind collapse into one regex.
+        self._has_negation = any(rule.negated for rule in rules)
+        self._any_regex = self._combine([r for r in rules if not r.dir_only])
+        self._dir_regex = self._combine([r for r in rules if r.dir_only])
+
+    @staticmethod
+    def _combine(rules: List[IgnoreRule]) -> Optional[Pattern[str]]:
+        if not rules:
+            return None
+        return re.compile('|'.join(f'(?:{r.regex.pattern})' for r in rules), re.DOTALL)
+
+    @classmethod
+    def parse(
+        cls,
+        text: str,
+        base: str = "",
+        parent: Optional["IgnoreRules"] = None
+    ) -> "IgnoreRules":
+        """Build rules from .gitignore content."""
+        rules = [rule for rule in map(parse_rule, text.splitlines()) if rule is not None]
+        return cls(base, rules, parent)
+
+    @classmethod
+    def load(
+        cls,
+        file_path: str,
+        base: str = "",
+        parent: Optional["IgnoreRules"] = None
+    ) -> "IgnoreRules":
+        """Load rules from a .gitignore file; unreadable files add no rules."""
+        try:
+            with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+                text = f.read()
+        except OSError:
+            return cls(base, [], parent)
+        return cls.parse(text, base, parent)
+
+    def _match_level(self, rel_path: str, is_dir: bool) -> Optional[bool]:
+        """Return True/False if a rule of this file decides, else None."""
+        if self.base:
+            if not rel_path.startswith(self.base + '/'):
+                return None
+            rel_path = rel_path[len(self.base) + 1:]
+
+        if not self._has_negation:
+            if self._any_regex is not None and self._any_regex.match(rel_path):
+                return True
+            if is_dir and self._dir_regex is not None and self._dir_regex.match(rel_path):
+                return True
+            return None
+
+        for rule in reversed(self.rules):
+            if rule.dir_only and not is_dir:
+                continue
+            if rule.regex.match(rel_path):
+                return not rule.negated
+        return None
+
+    def is_ignored(self, rel_path: str, is_dir: bool = False) -> bool:
+        """Check a '/'-separated path relative to the walk root."""
+        level: Optional[IgnoreRules] = self
+        while level is not None:
+            decision = level._match_level(rel_path, is_dir)
+            if decision is not None:
+                return decision
+            level = level.parent
+        return False
@@ -0,0 +1,604 @@
+#!/usr/bin/env python3
+"""
+Import graph of a repository, collapsed to directories.
+
+Import statements are read from the source files of a scan with regular
+expressions (see file_index for the fingerprint cache and process pool)
+and resolved to files or directories inside the repository:
+
+- Python: ``import a.b`` / ``from a.b import c`` against the directory of
+  the importing file and each of its ancestors up to the repository root
+  (nearest first, so script-directory siblings and namespace packages
+  without ``__init__.py`` resolve), then ``src/`` and workspace roots, then
+  the module names of the repository's files relative to their topmost
+  package's parent; relative imports against the importing package
+- JavaScript/TypeScript: relative specifiers with the usual extensions
+  and index files; bare specifiers naming a workspace package
+- Go: import paths under a module declared by a go.mod in the repository
+- Rust: ``crate::``/``self::``/``super::`` paths, ``mod x;`` and paths
+  into another crate of the repository
+- Java: imported classes and packages against the ``package`` of each file
+- C#: ``using`` namespaces against the namespaces each file declares
+
+Imports that resolve to nothing in the repository (standard library,
+third-party packages) are counted but left out of the graph. Edges are
+kept between the directories of the importing and imported files;
+import_graph_summary() collapses them to the deepest directory level that
+fits a byte budget.
+
+Run this script to check the Python resolution rules on a set of cases:
+
+    python import_graph.py
+"""
+
+import argparse
+import os
+import posixpath
+import re
+import sys
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from file_index import build_file_index
+from pack_budget import json_size, json_string_size
+
+
+# Bumped whenever extracted imports change for the same file contents
+IMPORT_INDEX_VERSION = 1
+IMPORT_INDEX_FILENAME = "import_index.json"
+
+# Directory-level edges: (importing directory, imported directory) -> imports.
+# Directories are "/"-separated and relative to the repository root ("." for it).
+Edges = Dict[Tuple[str, str], int]
+
+_JS_LANGUAGES = ("JavaScript", "JavaScript React", "TypeScript", "TypeScript React")
+INDEXED_LANGUAGES = ("Python", "Go", "Rust", "Java", "C#") + _JS_LANGUAGES
+
+# Extensions tried, in order, for extensionless JavaScript/TypeScript specifiers
+_JS_EXTENSIONS = (".ts", ".tsx", ".d.ts", ".js", ".jsx", ".mjs", ".cjs")
+
+_PY_IMPORT_RE = re.compile(r'^[ \t]*import[ \t]+([\w. \t,]+)', re.MULTILINE)
+_PY_FROM_RE = re.compile(
+    r'^[ \t]*from[ \t]+(\.*[\w.]*)[ \t]+import[ \t]+(\([^)]*\)|[^\n#;]+)', re.MULTILINE
+)
+_JS_FROM_RE = re.compile(r'\b(?:import|export)\b[^\'";`]*?\bfrom[ \t]*[\'"]([^\'"\n]+)[\'"]')
+_JS_BARE_IMPORT_RE = re.compile(r'^[ \t]*import[ \t]*[\'"]([^\'"\n]+)[\'"]', re.MULTILINE)
+_JS_CALL_RE = re.compile(r'\b(?:require|import)[ \t]*\([ \t]*[\'"]([^\'"\n]+)[\'"][ \t]*\)')
+_GO_IMPORT_RE = re.compile(r'^import[ \t]+(?:[\w.]+[ \t]+)?"([^"]+)"', re.MULTILINE)
+_GO_IMPORT_BLOCK_RE = re.compile(r'^import[ \t]*\(([^)]*)\)', re.MULTILINE)
+_GO_STRING_RE = re.compile(r'"([^"]+)"')
+_GO_MODULE_RE = re.compile(r'^module[ \t]+(\S+)', re.MULTILINE)
+_RUST_USE_RE = re.compile(r'^[ \t]*(?:pub(?:\([^)]*\))?[ \t]+)?use[ \t]+([^;]+);', re.MULTILINE)
+_RUST_MOD_RE = re.compile(r'^[ \t]*(?:pub(?:\([^)]*\))?[ \t]+)?mod[ \t]+(\w+)[ \t]*;', re.MULTILINE)
+_RUST_EXTERN_RE = re.compile(r'^[ \t]*extern[ \t]+crate[ \t]+(\w+)', re.MULTILINE)
+_CARGO_NAME_RE = re.compile(r'^\[package\][^\[]*?^\s*name\s*=\s*"([^"]+)"', re.MULTILINE | re.DOTALL)
+_JAVA_IMPORT_RE = re.compile(r'^[ \t]*import[ \t]+(?:static[ \t]+)?([\w.]+(?:\.\*)?)[ \t]*;', re.MULTILINE)
+_JAVA_PACKAGE_RE = re.compile(r'^[ \t]*package[ \t]+([\w.]+)[ \t]*;', re.MULTILINE)
+_CSHARP_USING_RE = re.compile(
+    r'^[ \t]*(?:global[ \t]+)?using[ \t]+(?:static[ \t]+)?(?:\w+[ \t]*=[ \t]*)?([\w.]+)[ \t]*;', re.MULTILINE
+)
+_CSHARP_NAMESPACE_RE = re.compile(r'^[ \t]*namespace[ \t]+([\w.]+)', re.MULTILINE)
+
+# Cases of the Python resolution check: (repository files, importing file,
+# import specifier as extracted, expected target or None)
+CHECK_CASES = (
+    (("src/pkg/mod.py", "src/pkg/user.py"), "src/pkg/user.py", "pkg.mod.run", "src/pkg/mod.py"),
+    (("pkg/sub/mod.py", "app.py"), "app.py", "pkg.sub.mod.run", "pkg/sub/mod.py"),
+    (("pkg/sub/mod.py", "app.py"), "app.py", "pkg.sub", "pkg/sub"),
+    (("tools/a/util.py", "tools/a/cli.py", "tools/b/util.py", "tools/b/cli.py"),
+     "tools/b/cli.py", "util.helper", "tools/b/util.py"),
+    (("scripts/lib/helpers.py", "scripts/cli.py"), "scripts/cli.py", "lib.helpers.load", "scripts/lib/helpers.py"),
+    (("lib/pkg/__init__.py", "lib/pkg/core.py", "app/main.py"), "app/main.py", "pkg.core.run", "lib/pkg/core.py"),
+    (("src/proj/__init__.py", "src/proj/x.py", "tests/test_x.py"), "tests/test_x.py", "proj.x", "src/proj/x.py"),
+    (("pkg/__init__.py", "pkg/a.py", "pkg/b.py"), "pkg/a.py", ".b.run", "pkg/b.py"),
+    (("pkg/a.py",), "pkg/a.py", "os.path", None),
+)
+
+
+def _python_imports(text: str) -> List[str]:
+    imports: List[str] = []
+    for match in _PY_IMPORT_RE.finditer(text):
+        for part in match.group(1).split(','):
+            name = part.split()[0] if part.split() else ""
+            if name:
+                imports.append(name)
+    for match in _PY_FROM_RE.finditer(text):
+        module, names = match.group(1), match.group(2).strip('()')
+        # "from a import b" may import module a.b; resolution falls back to a
+        separator = "" if module.endswith('.') else "."
+        for part in names.split(','):
+            name = part.split()[0] if part.split() else ""
+            if name and name != '*' and name.isidentifier():
+                imports.append(f"{module}{separator}{name}")
+            elif name == '*':
+                imports.append(module)
+    return imports
+
+
+def _rust_imports(text: str) -> List[str]:
+    imports: List[str] = []
+    for match in _RUST_USE_RE.finditer(text):
+        path = re.sub(r'\s+', '', re.sub(r'\s+as\s+\w+', '', match.group(1)))
+        prefix, brace, rest = path.partition('{')
+        if not brace:
+            imports.append(path)
+            continue
+        # One level of "a::{b, c::d}"; deeper groups resolve to their prefix
+        depth = 0
+        item = ""
+        for char in rest:
+            if char == '{':
+                depth += 1
+            elif char == '}':
+                depth -= 1
+                if depth < 0:
+                    break
+            elif char == ',' and depth == 0:
+                imports.append(prefix + item.split('{')[0].rstrip(':'))
+                item = ""
+                continue
+            item += char
+        if item:
+            imports.append(prefix + item.split('{')[0].rstrip(':'))
+    imports.extend(f"mod::{name}" for name in _RUST_MOD_RE.findall(text))
+    imports.extend(_RUST_EXTERN_RE.findall(text))
+    return [path for path in imports if path]
+
+
+def extract_imports(text: str, language: str) -> Dict[str, List[str]]:
+    """Raw import specifiers of source text, and the packages/namespaces it declares."""
+    packages: List[str] = []
+    if language == "Python":
+        imports = _python_imports(text)
+    elif language in _JS_LANGUAGES:
+        imports = (
+            _JS_FROM_RE.findall(text) + _JS_BARE_IMPORT_RE.findall(text) + _JS_CALL_RE.findall(text)
+        )
+    elif language == "Go":
+        imports = _GO_IMPORT_RE.findall(text)
+        for block in _GO_IMPORT_BLOCK_RE.findall(text):
+            imports.extend(_GO_STRING_RE.findall(block))
+    elif language == "Rust":
+        imports = _rust_imports(text)
+    elif language == "Java":
+        imports = _JAVA_IMPORT_RE.findall(text)
+        packages = _JAVA_PACKAGE_RE.findall(text)[:1]
+    elif language == "C#":
+        imports = _CSHARP_USING_RE.findall(text)
+        packages = _CSHARP_NAMESPACE_RE.findall(text)
+    else:
+        imports = []
+    result = {"imports": list(dict.fromkeys(imports))}
+    if packages:
+        result["packages"] = list(dict.fromkeys(packages))
+    return result
+
+
+def build_import_index(
+    root_path: str,
+    files: List[Dict[str, Any]],
+    index_path: Optional[str] = None,
+    processes: int = 1
+) -> Tuple[Dict[str, Dict[str, List[str]]], Dict[str, int]]:
+    """Extract the imports of scanned files, reusing unchanged entries of a saved index.
+
+    See file_index.build_file_index() for the arguments.
+    """
+    return build_file_index(
+        root_path, files, extract_imports, INDEXED_LANGUAGES, IMPORT_INDEX_VERSION,
+        index_path=index_path, processes=processes,
+    )
+
+
+def _read_text(path: str) -> str:
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            return f.read()
+    except OSError:
+        return ""
+
+
+def _dir_of(path: str) -> str:
+    return posixpath.dirname(path) or "."
+
+
+class ImportResolver:
+    """Resolves raw import specifiers to repository directories."""
+
+    def __init__(
+        self,
+        root_path: str,
+        paths: Iterable[str],
+        facts: Dict[str, Dict[str, List[str]]],
+        workspaces: Optional[List[Dict[str, Any]]] = None
+    ):
+        self.paths: Set[str] = set(paths)
+        self.dirs: Set[str] = {_dir_of(path) for path in self.paths}
+        self._python_modules: Dict[str, str] = {}
+        self._java_classes: Dict[str, str] = {}
+        self._java_packages: Dict[str, Set[str]] = defaultdict(set)
+        self._namespaces: Dict[str, Set[str]] = defaultdict(set)
+        self._go_modules: List[Tuple[str, str]] = []
+        self._crates: Dict[str, str] = {}
+        self._packages: Dict[str, str] = {}
+        # Extra roots for absolute Python imports, after the importer's ancestors
+        self._python_roots: List[List[str]] = [["src"]] if "src" in self.dirs else []
+
+        for workspace in workspaces or []:
+            if workspace.get("kind") in ("pnpm", "npm", "lerna"):
+                self._packages[workspace["name"]] = workspace["path"]
+            if workspace["path"] != ".":
+                self._python_roots.append(workspace["path"].split('/'))
+                if f"{workspace['path']}/src" in self.dirs:
+                    self._python_roots.append(workspace["path"].split('/') + ["src"])
+        for path in sorted(self.paths):
+            name = posixpath.basename(path)
+            if path.endswith((".py", ".pyi")):
+                self._index_python(path)
+            elif name == "go.mod":
+                match = _GO_MODULE_RE.search(_read_text(os.path.join(root_path, path)))
+                if match:
+                    self._go_modules.append((match.group(1), _dir_of(path)))
+            elif name == "Cargo.toml":
+                match = _CARGO_NAME_RE.search(_read_text(os.path.join(root_path, path)))
+                if match:
+                    self._crates[match.group(1).replace('-', '_')] = _dir_of(path)
+        # Longest module path first, so nested modules win
+        self._go_modules.sort(key=lambda item: -len(item[0]))
+
+        for path, fact in facts.items():
+            packages = fact.get("packages", [])
+            if path.endswith(".java") and packages:
+                stem = posixpath.splitext(posixpath.basename(path))[0]
+                self._java_classes[f"{packages[0]}.{stem}"] = path
+                self._java_packages[packages[0]].add(_dir_of(path))
+            elif path.endswith(".cs"):
+                for namespace in packages:
+                    self._namespaces[namespace].add(_dir_of(path))
+
+    def _index_python(self, path: str) -> None:
+        parts = posixpath.splitext(path)[0].split('/')
+        if parts[-1] == "__init__":
+            parts = parts[:-1]
+        if not parts:
+            return
+        self._python_modules.setdefault('.'.join(parts), path)
+        # Also index relative to the parent of the topmost package
+        directory = _dir_of(path)
+        top = len(parts) - (0 if path.endswith(("__init__.py", "__init__.pyi")) else 1)
+        while top > 0:
+            if f"{directory}/__init__.py" not in self.paths and f"{directory}/__init__.pyi" not in self.paths:
+                break
+            directory = _dir_of(directory)
+            top -= 1
+        if 0 < top < len(parts):
+            self._python_modules.setdefault('.'.join(parts[top:]), path)
+
+    def _python_path(self, base: List[str], names: List[str], namespace: bool = False) -> Optional[str]:
+        """Longest prefix of ``names`` that is a module file or package under ``base``.
+
+        With ``namespace``, the full name may also be a directory without
+        ``__init__.py`` (a namespace package).
+        """
+        for end in range(len(names), 0, -1):
+            stem = '/'.join(base + names[:end])
+            for candidate in (f"{stem}.py", f"{stem}.pyi", f"{stem}/__init__.py", f"{stem}/__init__.pyi"):
+                if candidate in self.paths:
+                    return candidate
+            if namespace and end == len(names) and stem in self.dirs:
+                return stem
+        return None
+
+    def _python_search_path(self, source: str) -> Iterator[List[str]]:
+        """Directories an absolute import of ``source`` may be found under, nearest first."""
+        directory = _dir_of(source)
+        parts = directory.split('/') if directory != "." else []
+        for end in range(len(parts), -1, -1):
+            yield parts[:end]
+        yield from self._python_roots
+
+    def resolve_python(self, source: str, spec: str) -> Optional[str]:
+        if spec.startswith('.'):
+            level = len(spec) - len(spec.lstrip('.'))
+            base = _dir_of(source).split('/') if _dir_of(source) != "." else []
+            if level - 1 > len(base):
+                return None
+            base = base[:len(base) - (level - 1)]
+            names = [name for name in spec[level:].split('.') if name]
+            if not names:
+                init = '/'.join(base + ["__init__.py"])
+                return init if init in self.paths else None
+            return self._python_path(base, names)
+        names = spec.split('.')
+        for base in self._python_search_path(source):
+            path = self._python_path(base, names, namespace=True)
+            if path:
+                return path
+        for end in range(len(names), 0, -1):
+            path = self._python_modules.get('.'.join(names[:end]))
+            if path:
+                return path
+        return None
+
+    def _js_file(self, path: str) -> Optional[str]:
+        if path in self.paths:
+            return path
+        for extension in _JS_EXTENSIONS:
+            if path + extension in self.paths:
+                return path + extension
+        # Compiled specifiers ("./a.js") written for a TypeScript source
+        stem, extension = posixpath.splitext(path)
+        if extension in (".js", ".jsx", ".mjs", ".cjs"):
+            for candidate in (".ts", ".tsx", ".mts", ".cts"):
+                if stem + candidate in self.paths:
+                    return stem + candidate
+        for extension in _JS_EXTENSIONS:
+            if f"{path}/index{extension}" in self.paths:
+                return f"{path}/index{extension}"
+        return None
+
+    def resolve_js(self, source: str, spec: str) -> Optional[str]:
+        if spec.startswith('.'):
+            path = posixpath.normpath(posixpath.join(_dir_of(source), spec))
+            if path.startswith('..'):
+                return None
+            return self._js_file(path)
+        # Workspace packages, possibly with a subpath ("@scope/pkg/util")
+        parts = spec.split('/')
+        count = 2 if spec.startswith('@') else 1
+        package = self._packages.get('/'.join(parts[:count]))
+        if package is None:
+            return None
+        subpath = '/'.join(parts[count:])
+        if subpath:
+            return self._js_file(f"{package}/{subpath}") or self._js_file(f"{package}/src/{subpath}") or package
+        return package
+
+    def resolve_go(self, spec: str) -> Optional[str]:
+        for module, directory in self._go_modules:
+            if spec == module or spec.startswith(module + '/'):
+                subpath = spec[len(module):].lstrip('/')
+                target = posixpath.join(directory, subpath) if directory != "." else subpath or "."
+                return target if target in self.dirs else None
+        return None
+
+    def _rust_module_path(self, source: str) -> Tuple[Optional[str], List[str]]:
+        """(crate source directory, module path) of a Rust file."""
+        crate_src = None
+        for crate_dir in self._crates.values():
+            src = "src" if crate_dir == "." else f"{crate_dir}/src"
+            if source.startswith(src + '/') and (crate_src is None or len(src) > len(crate_src)):
+                crate_src = src
+        if crate_src is None:
+            return None, []
+        parts = posixpath.splitext(source[len(crate_src) + 1:])[0].split('/')
+        if parts[-1] in ("mod", "lib", "main"):
+            parts = parts[:-1]
+        return crate_src, parts
+
+    def _rust_file(self, crate_src: str, names: List[str]) -> Optional[str]:
+        for end in range(len(names), 0, -1):
+            stem = '/'.join([crate_src] + names[:end])
+            for candidate in (f"{stem}.rs", f"{stem}/mod.rs"):
+                if candidate in self.paths:
+                    return candidate
+        return None
+
+    def resolve_rust(self, source: str, spec: str) -> Optional[str]:
+        crate_src, module = self._rust_module_path(source)
+        names = [name for name in spec.split('::') if name]
+        if not names:
+            return None
+        if names[0] == "mod" and len(names) == 2:
+            if crate_src is None:
+                directory = _dir_of(source)
+                base = directory if posixpath.basename(source) in ("mod.rs", "lib.rs", "main.rs") \
+                    else posixpath.join(directory, posixpath.splitext(posixpath.basename(source))[0])
+                for candidate in (f"{base}/{names[1]}.rs", f"{base}/{names[1]}/mod.rs"):
+                    if candidate in self.paths:
+                        return candidate
+                return None
+            return self._rust_file(crate_src, module + [names[1]])
+        first = names[0]
+        if first in ("crate", "self", "super"):
+            if crate_src is None:
+                return None
+            if first == "crate":
+                base = []
+            else:
+                base = list(module)
+                while names and names[0] == "super":
+                    base = base[:-1]
+                    names = names[1:]
+                names = [name for name in names if name != "self"]
+            if first == "crate":
+                names = names[1:]
+            return self._rust_file(crate_src, base + names) or (
+                f"{crate_src}/lib.rs" if f"{crate_src}/lib.rs" in self.paths and not base + names else None
+            )
+        crate_dir = self._crates.get(first)
+        if crate_dir is None:
+            return None
+        src = "src" if crate_dir == "." else f"{crate_dir}/src"
+        return self._rust_file(src, names[1:]) or (src if src in self.dirs else crate_dir)
+
+    def resolve_java(self, spec: str) -> List[str]:
+        if spec.endswith('.*'):
+            return sorted(self._java_packages.get(spec[:-2], ()))
+        names = spec.split('.')
+        for end in range(len(names), 0, -1):
+            path = self._java_classes.get('.'.join(names[:end]))
+            if path:
+                return [path]
+        return []
+
+    def resolve(self, source: str, language: str, spec: str) -> List[str]:
+        """Repository files or directories an import refers to (empty if external)."""
+        if language == "Python":
+            target = self.resolve_python(source, spec)
+        elif language in _JS_LANGUAGES:
+            target = self.resolve_js(source, spec)
+        elif language == "Go":
+            target = self.resolve_go(spec)
+        elif language == "Rust":
+            target = self.resolve_rust(source, spec)
+        elif language == "Java":
+            return self.resolve_java(spec)
+        elif language == "C#":
+            return sorted(self._namespaces.get(spec, ()))
+        else:
+            target = None
+        return [target] if target else []
+
+
+def resolve_import_edges(
+    root_path: str,
+    files: List[Dict[str, Any]],
+    facts: Dict[str, Dict[str, List[str]]],
+    workspaces: Optional[List[Dict[str, Any]]] = None
+) -> Tuple[Edges, Dict[str, int]]:
+    """Resolve extracted imports to directory-level edges.
+
+    Args:
+        root_path: Repository root
+        files: Scanned file records ("relative_path", "language")
+        facts: Extracted imports keyed by relative path (see build_import_index())
+        workspaces: Workspaces of the scan, for workspace package names
+
+    Returns:
+        (edges, stats) where stats counts resolved and unresolved imports
+    """
+    paths = {file_data["relative_path"].replace(os.sep, '/'): file_data for file_data in files}
+    posix_facts = {rel_path.replace(os.sep, '/'): fact for rel_path, fact in facts.items()}
+    resolver = ImportResolver(root_path, paths, posix_facts, workspaces)
+
+    edges: Edges = defaultdict(int)
+    resolved = 0
+    unresolved = 0
+    for path, fact in posix_facts.items():
+        language = paths[path].get("language") if path in paths else None
+        source_dir = _dir_of(path)
+        for spec in fact.get("imports", []):
+            targets = resolver.resolve(path, language, spec)
+            if not targets:
+                unresolved += 1
+                continue
+            resolved += 1
+            for target in targets:
+                target_dir = target if target in resolver.dirs else _dir_of(target)
+                if target_dir != source_dir:
+                    edges[(source_dir, target_dir)] += 1
+    return dict(edges), {"resolved": resolved, "unresolved": unresolved}
+
+
+def _truncate_dir(directory: str, depth: int) -> str:
+    if directory == ".":
+        return directory
+    return '/'.join(directory.split('/')[:depth])
+
+
+def collapse_edges(edges: Edges, depth: int) -> Dict[str, Dict[str, int]]:
+    """Adjacency list of the edges with directories cut to ``depth`` levels."""
+    graph: Dict[str, Dict[str, int]] = defaultdict(dict)
+    for (source, target), count in edges.items():
+        source, target = _truncate_dir(source, depth), _truncate_dir(target, depth)
+        if source != target:
+            graph[source][target] = graph[source].get(target, 0) + count
+    return {
+        source: dict(sorted(targets.items(), key=lambda item: (-item[1], item[0])))
+        for source, targets in sorted(graph.items())
+    }
+
+
+def relocate_edges(edges: Edges, directory: str) -> Edges:
+    """Edges of the files under ``directory``, with paths relative to it.
+
+    Imported directories outside it are kept as relative paths ("../core").
+    """
+    prefix = directory.rstrip('/') + '/'
+    relocated: Edges = defaultdict(int)
+    for (source, target), count in edges.items():
+        if source != directory and not source.startswith(prefix):
+            continue
+        relocated[(posixpath.relpath(source, directory), posixpath.relpath(target, directory))] += count
+    return dict(relocated)
+
+
+def import_graph_summary(edges: Edges, budget: Optional[int] = None) -> Dict[str, Any]:
+    """Render directory import edges as an adjacency list within a byte budget.
+
+    The graph is collapsed to the deepest directory level that fits (see
+    import_graph.collapse_edges()); if even top-level directories don't
+    fit, the lightest edges are dropped.
+    """
+    max_depth = max(
+        (directory.count("/") + 1 for edge in edges for directory in edge if directory != "."),
+        default=1
+    )
+    summary: Dict[str, Any] = {}
+    for depth in range(max_depth, 0, -1):
+        graph = collapse_edges(edges, depth)
+        summary = {
+            "depth": depth,
+            "edges": sum(len(targets) for targets in graph.values()),
+            "imports": sum(edges.values()),
+            "graph": graph,
+            "truncated": depth < max_depth,
+        }
+        if budget is None or json_size(summary) <= budget:
+            return summary
+
+    # Top-level graph still over budget: keep the heaviest edges that fit
+    weighted = sorted(
+        ((count, source, target) for source, targets in summary["graph"].items() for target, count in targets.items()),
+        key=lambda item: (-item[0], item[1], item[2])
+    )
+    summary["graph"] = {}
+    used = json_size(summary)
+    graph: Dict[str, Dict[str, int]] = {}
+    for count, source, target in weighted:
+        size = json_string_size(target) + 4 + json_size(count)
+        if source not in graph:
+            size += json_string_size(source) + 6
+        if used + size > budget:
+            continue
+        graph.setdefault(source, {})[target] = count
+        used += size
+    summary["graph"] = dict(sorted(graph.items()))
+    summary["edges"] = sum(len(targets) for targets in graph.values())
+    summary["truncated"] = True
+    return summary
+
+
+def check_resolution(
+    cases: Sequence[Tuple[Tuple[str, ...], str, str, Optional[str]]] = CHECK_CASES
+) -> List[Tuple[str, str, Optional[str], Optional[str]]]:
+    """Python cases that resolve to something else than expected.
+
+    Returns (importing file, specifier, resolved target, expected target) tuples.
+    """
+    mismatches = []
+    for paths, source, spec, expected in cases:
+        resolver = ImportResolver(".", paths, {})
+        targets = resolver.resolve(source, "Python", spec)
+        target = targets[0] if targets else None
+        if target != expected:
+            mismatches.append((source, spec, target, expected))
+    return mismatches
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check Python import resolution on a set of cases")
+    parser.parse_args()
+
+    mismatches = check_resolution()
+    for source, spec, target, expected in mismatches:
+        print(f"{source}: {spec!r} resolved to {target}, expected {expected}")
+    if mismatches:
+        return 1
+    print(f"All {len(CHECK_CASES)} import cases resolve as expected")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Language detection shared by the wiki scripts.
+
+A file's language is decided by, in order:
+
+1. its file name (Makefile, Dockerfile, Gemfile, ...)
+2. its extension; ``.h`` and ``.m`` are refined from content when a
+   sample is available (a ``.h`` without C++ or Objective-C markers is
+   a C header)
+3. a shebang line, or an Emacs/Vim modeline in the first five lines or,
+   when the sample holds the whole file, the last five
+
+Steps 1 and 2 only look at the name. Content is only consulted when
+``needs_sample()`` says it could change the answer, and the caller passes
+the first bytes it has already read (see file_sniffer). Repository-level
+``linguist-language`` overrides from .gitattributes are applied by the
+callers on top of this (see git_attributes).
+"""
+
+import os
+import re
+from typing import List, Optional, Tuple
+
+from file_sniffer import SAMPLE_SIZE
+
+
+# Language detection by extension
+EXTENSION_LANGUAGE_MAP = {
+    '.py': 'Python',
+    '.pyi': 'Python',
+    '.js': 'JavaScript',
+    '.mjs': 'JavaScript',
+    '.cjs': 'JavaScript',
+    '.ts': 'TypeScript',
+    '.jsx': 'JavaScript React',
+    '.tsx': 'TypeScript React',
+    '.java': 'Java',
+    '.c': 'C',
+    '.cpp': 'C++',
+    '.cc': 'C++',
+    '.cxx': 'C++',
+    '.h': 'C/C++ Header',
+    '.hpp': 'C++ Header',
+    '.hh': 'C++ Header',
+    '.hxx': 'C++ Header',
+    '.mm': 'Objective-C++',
+    '.cs': 'C#',
+    '.fs': 'F#',
+    '.vb': 'Visual Basic',
+    '.go': 'Go',
+    '.rs': 'Rust',
+    '.rb': 'Ruby',
+    '.php': 'PHP',
+    '.pl': 'Perl',
+    '.pm': 'Perl',
+    '.swift': 'Swift',
+    '.kt': 'Kotlin',
+    '.kts': 'Kotlin',
+    '.scala': 'Scala',
+    '.groovy': 'Groovy',
+    '.sh': 'Shell',
+    '.bash': 'Bash',
+    '.zsh': 'Zsh',
+    '.fish': 'Fish',
+    '.ps1': 'PowerShell',
+    '.r': 'R',
+    '.m': 'MATLAB/Objective-C',
+    '.sql': 'SQL',
+    '.md': 'Markdown',
+    '.rst': 'reStructuredText',
+    '.tex': 'LaTeX',
+    '.html': 'HTML',
+    '.htm': 'HTML',
+    '.css': 'CSS',
+    '.scss': 'SCSS',
+    '.sass': 'Sass',
+    '.less': 'Less',
+    '.json': 'JSON',
+    '.xml': 'XML',
+    '.yaml': 'YAML',
+    '.yml': 'YAML',
+    '.toml': 'TOML',
+    '.ini': 'INI',
+    '.cfg': 'Config',
+    '.conf': 'Config',
+    '.vue': 'Vue',
+    '.svelte': 'Svelte',
+    '.dart': 'Dart',
+    '.lua': 'Lua',
+    '.vim': 'VimScript',
+    '.el': 'Emacs Lisp',
+    '.clj': 'Clojure',
+    '.ex': 'Elixir',
+    '.exs': 'Elixir',
+    '.erl': 'Erlang',
+    '.hrl': 'Erlang',
+    '.hs': 'Haskell',
+    '.ml': 'OCaml',
+    '.cmake': 'CMake',
+    '.dockerfile': 'Dockerfile',
+    '.proto': 'Protocol Buffers',
+}
+
+# Exact file names (lower case) that decide the language on their own
+FILENAME_LANGUAGE_MAP = {
+    'makefile': 'Makefile',
+    'gnumakefile': 'Makefile',
+    'cmakelists.txt': 'CMake',
+    'rakefile': 'Ruby',
+    'gemfile': 'Ruby',
+    'vagrantfile': 'Ruby',
+    'podfile': 'Ruby',
+    'jenkinsfile': 'Groovy',
+}
+
+# Interpreters named in a shebang line, after stripping version suffixes
+INTERPRETER_LANGUAGE_MAP = {
+    'python': 'Python',
+    'pypy': 'Python',
+    'node': 'JavaScript',
+    'nodejs': 'JavaScript',
+    'deno': 'TypeScript',
+    'bash': 'Bash',
+    'sh': 'Shell',
+    'dash': 'Shell',
+    'ash': 'Shell',
+    'ksh': 'Shell',
+    'zsh': 'Zsh',
+    'fish': 'Fish',
+    'ruby': 'Ruby',
+    'perl': 'Perl',
+    'php': 'PHP',
+    'lua': 'Lua',
+    'rscript': 'R',
+    'pwsh': 'PowerShell',
+    'make': 'Makefile',
+    'escript': 'Erlang',
+    'runhaskell': 'Haskell',
+    'elixir': 'Elixir',
+    'groovy': 'Groovy',
+}
+
+# Emacs mode / Vim filetype names
+MODELINE_LANGUAGE_MAP = {
+    'python': 'Python',
+    'js': 'JavaScript',
+    'javascript': 'JavaScript',
+    'typescript': 'TypeScript',
+    'c': 'C',
+    'c++': 'C++',
+    'cpp': 'C++',
+    'objc': 'Objective-C',
+    'objective-c': 'Objective-C',
+    'java': 'Java',
+    'go': 'Go',
+    'rust': 'Rust',
+    'ruby': 'Ruby',
+    'perl': 'Perl',
+    'php': 'PHP',
+    'sh': 'Shell',
+    'shell-script': 'Shell',
+    'bash': 'Bash',
+    'zsh': 'Zsh',
+    'lua': 'Lua',
+    'sql': 'SQL',
+    'make': 'Makefile',
+    'makefile': 'Makefile',
+    'cmake': 'CMake',
+    'yaml': 'YAML',
+    'json': 'JSON',
+    'markdown': 'Markdown',
+    'emacs-lisp': 'Emacs Lisp',
+    'lisp': 'Lisp',
+    'haskell': 'Haskell',
+    'erlang': 'Erlang',
+    'matlab': 'MATLAB',
+    'octave': 'MATLAB',
+}
+
+# Extensions whose language is refined from content when a sample is at hand
+AMBIGUOUS_EXTENSIONS = ('.h', '.m')
+
+# How much of the sample the content checks look at
+HEAD_SIZE = 1024
+# Lines at the start and end of a file where editors look for modelines
+MODELINE_LINES = 5
+
+_SHEBANG_VERSION_RE = re.compile(r'^([a-z]+?)[\d.]*$')
+_EMACS_MODE_RE = re.compile(r'-\*-(?:.*?;)?\s*mode:\s*([\w+-]+)|-\*-\s*([\w+-]+)\s*-\*-', re.IGNORECASE)
+_VIM_MODELINE_RE = re.compile(
+    r'(?:^|\s)(?:vi|vim|ex)(?:[<=>]?\d+)?:.*?\b(?:ft|filetype|syntax)=([\w+-]+)'
+)
+_OBJC_RE = re.compile(r'^\s*(?:@interface|@implementation|@protocol|@end|#import)\b', re.MULTILINE)
+_CPP_RE = re.compile(
+    r'^\s*(?:class\s+\w+\s*[:{]|namespace\s+\w*\s*\{|template\s*<|using\s+namespace\b)'
+    r'|std::|#include\s*<(?:iostream|string|vector|memory|map)>',
+    re.MULTILINE
+)
+_MATLAB_RE = re.compile(r'^\s*(?:function\b.*=|function\s+\w+\s*\(|%)', re.MULTILINE)
+
+
+def _split_name(file_path: str) -> Tuple[str, str]:
+    name = os.path.basename(file_path).lower()
+    return name, os.path.splitext(name)[1]
+
+
+def _language_from_name(name: str, ext: str) -> Optional[str]:
+    language = FILENAME_LANGUAGE_MAP.get(name)
+    if language:
+        return language
+    if name.startswith('dockerfile'):
+        return 'Dockerfile'
+    return EXTENSION_LANGUAGE_MAP.get(ext)
+
+
+def needs_sample(file_path: str, language: Optional[str]) -> bool:
+    """Whether the first bytes of a file could change its name-based language."""
+    if language is None:
+        return True
+    return _split_name(file_path)[1] in AMBIGUOUS_EXTENSIONS
+
+
+def _head_lines(sample: bytes) -> List[str]:
+    return sample[:HEAD_SIZE].decode('utf-8', 'replace').splitlines()
+
+
+def language_from_shebang(first_line: str) -> Optional[str]:
+    """Return the language of a '#!' line's interpreter."""
+    if not first_line.startswith('#!'):
+        return None
+    words = first_line[2:].split()
+    if not words:
+        return None
+    interpreter = os.path.basename(words[0])
+    if interpreter == 'env':
+        # "#!/usr/bin/env [-S] [VAR=value ...] python3 -u"
+        args = [w for w in words[1:] if not w.startswith('-') and '=' not in w]
+        if not args:
+            return None
+        interpreter = os.path.basename(args[0])
+    match = _SHEBANG_VERSION_RE.match(interpreter.lower())
+    return INTERPRETER_LANGUAGE_MAP.get(match.group(1)) if match else None
+
+
+def language_from_modeline(lines: List[str]) -> Optional[str]:
+    """Return the language named by an Emacs or Vim modeline in the given lines."""
+    for line in lines:
+        match = _EMACS_MODE_RE.search(line)
+        if match:
+            mode = (match.group(1) or match.group(2)).lower()
+            if mode in MODELINE_LANGUAGE_MAP:
+                return MODELINE_LANGUAGE_MAP[mode]
+        match = _VIM_MODELINE_RE.search(line)
+        if match:
+            language = MODELINE_LANGUAGE_MAP.get(match.group(1).lower())
+            if language:
+                return language
+    return None
+
+
+def _refine_ambiguous(ext: str, text: str) -> Optional[str]:
+    if _OBJC_RE.search(text):
+        return 'Objective-C'
+    if ext == '.h':
+        return 'C++ Header' if _CPP_RE.search(text) else 'C Header'
+    if _MATLAB_RE.search(text):
+        return 'MATLAB'
+    return None
+
+
+def detect_language(file_path: str, sample: Optional[bytes] = None) -> Optional[str]:
+    """Detect the language of a file from its name and, optionally, its first bytes.
+
+    ``sample`` should be the first bytes of the file (any length up to
+    file_sniffer.SAMPLE_SIZE); binary samples are ignored. A sample shorter
+    than SAMPLE_SIZE is taken to be the whole file, so trailing modelines
+    are only seen in files that small.
+    """
+    name, ext = _split_name(file_path)
+    language = _language_from_name(name, ext)
+
+    if not sample or b'\x00' in sample or not needs_sample(file_path, language):
+        return language
+
+    lines = _head_lines(sample)
+    if language is not None:
+        return _refine_ambiguous(ext, '\n'.join(lines)) or language
+
+    if lines:
+        language = language_from_shebang(lines[0])
+        if language:
+            return language
+    language = language_from_modeline(lines[:MODELINE_LINES])
+    if language or len(sample) >= SAMPLE_SIZE:
+        return language
+    # Vim also reads modelines at the end of the file
+    tail = sample[-HEAD_SIZE:].decode('utf-8', 'replace').splitlines()
+    return language_from_modeline(tail[-MODELINE_LINES:])
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Size accounting for context packs.
+
+Pack sections are budgeted by their serialized JSON size. json_size()
+computes the UTF-8 byte size json.dumps(ensure_ascii=False) would produce
+without building the string, and JsonSizeTracker keeps the size of an
+object up to date as single members change. PackBudget measures and cuts
+in the unit of the budget: bytes, or tokens estimated by a TokenEstimator.
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from token_estimator import TokenEstimator
+
+
+def calculate_json_size(data: Any) -> int:
+    """Calculate the UTF-8 byte size of data when serialized to JSON."""
+    return len(json.dumps(data, ensure_ascii=False).encode('utf-8'))
+
+
+# Characters json.dumps(ensure_ascii=False) writes as two-character escapes;
+# the remaining control characters become six-character \u00XX escapes.
+_JSON_SHORT_ESCAPES = '"\\\b\f\n\r\t'
+_JSON_CONTROL_RE = re.compile('[\x00-\x07\x0b\x0e-\x1f]')
+
+
+def json_string_size(text: str) -> int:
+    """UTF-8 byte size of a string serialized as a JSON string literal."""
+    size = len(text.encode('utf-8', errors='surrogatepass')) + 2
+    for char in _JSON_SHORT_ESCAPES:
+        size += text.count(char)
+    if not text.isprintable():
+        size += 5 * len(_JSON_CONTROL_RE.findall(text))
+    return size
+
+
+def json_size(data: Any) -> int:
+    """Compute calculate_json_size(data) without serializing data."""
+    if isinstance(data, str):
+        return json_string_size(data)
+    if data is None or data is True:
+        return 4
+    if data is False:
+        return 5
+    if isinstance(data, int):
+        return len(int.__repr__(data))
+    if isinstance(data, float):
+        return len(json.dumps(data))
+    if isinstance(data, dict):
+        if not data:
+            return 2
+        return 2 * len(data) + sum(
+            json_string_size(str(key)) + 2 + json_size(value)
+            for key, value in data.items()
+        )
+    if isinstance(data, (list, tuple)):
+        if not data:
+            return 2
+        return 2 * len(data) + sum(json_size(item) for item in data)
+    return calculate_json_size(data)
+
+
+@dataclass
+class PackBudget:
+    """Size limit of a context pack, in estimated tokens or in bytes."""
+    unit: str
+    limit: int
+    # Counts tokens for token budgets and for the reported estimates
+    estimator: TokenEstimator = field(default_factory=TokenEstimator)
+
+    def to_bytes(self, share: float, sample: str) -> int:
+        """Byte budget for a share of the limit, converting tokens at the sample's rate."""
+        limit = self.limit * share
+        if self.unit == "tokens":
+            limit *= self.estimator.bytes_per_token(sample)
+        return int(limit)
+
+    def measure(self, data: Any) -> int:
+        """Size of data serialized to JSON, in the budget's unit."""
+        if self.unit == "tokens":
+            return self.estimator.count(json.dumps(data, ensure_ascii=False))
+        return json_size(data)
+
+    def measure_text(self, text: str) -> int:
+        """Size of raw JSON text, in the budget's unit."""
+        if self.unit == "tokens":
+            return self.estimator.count(text)
+        return len(text.encode('utf-8', errors='surrogatepass'))
+
+    def truncate(self, text: str, limit: int) -> str:
+        """Longest prefix of text within ``limit`` units."""
+        if self.unit == "tokens":
+            return self.estimator.truncate(text, limit)
+        return text.encode('utf-8')[:max(0, limit)].decode('utf-8', errors='ignore')
+
+
+class JsonSizeTracker:
+    """Track the serialized size of a JSON object as its members change.
+
+    In bytes, ``size`` always equals calculate_json_size() of the tracked
+    object; in tokens it is the sum of the members' estimates, which can
+    differ from an estimate of the whole by rounding. Updating one member
+    only costs measuring that member.
+    """
+
+    def __init__(self, budget: PackBudget):
+        self.budget = budget
+        self._members: Dict[str, int] = {}
+        self._separator = budget.measure_text(", ")
+        self._empty = budget.measure_text("{}")
+        self.size = self._empty
+
+    def set(self, key: str, value: Any = None, size: Optional[int] = None) -> int:
+        """Set a member's value (or its known serialized size); returns the new total."""
+        key_text = json.dumps(key, ensure_ascii=False) + ": "
+        if size is not None:
+            member = self.budget.measure_text(key_text + ", ") + size
+        elif self.budget.unit == "tokens":
+            # Key, value and separator are estimated together, rounding once
+            member = self.budget.measure_text(f"{key_text}{json.dumps(value, ensure_ascii=False)}, ")
+        else:
+            member = json_string_size(key) + 2 + json_size(value) + self._separator
+        self._members[key] = member
+        # The last member has no separator
+        self.size = self._empty + sum(self._members.values()) - self._separator
+        return self.size
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Compiled path pattern matching shared by the wiki scripts.
+
+Matching a path against a list of patterns one pattern at a time rebuilds
+Path objects and re-translates fnmatch patterns on every call. The matchers
+in this module split a pattern list once into exact-name sets, prefix/suffix
+tables and a single combined regex, and give the same answers as the
+per-pattern reference functions they replace:
+
+- PathMatcher            -> matches_pattern() (scan include/exclude rules)
+- SourcePatternMatcher   -> matches_source_pattern() (toc.yaml source_files)
+
+Run this script to check both against the reference functions:
+
+    python path_matcher.py [--pattern PATTERN ...] [PATH ...]
+"""
+
+import argparse
+import fnmatch
+import os
+import re
+import sys
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, List, Optional, Pattern, Sequence, Tuple
+
+
+GLOB_CHARS = '*?['
+
+# Defaults of the equivalence check: each pattern kind of PathMatcher, and
+# paths in the forms Path() normalizes (trailing '/' and '/.', '//', '.')
+CHECK_PATTERNS = (
+    "node_modules", "build/", ".", "*.py", "*.min.js", "foo*", "f?o", "[ab]", "*", "*/",
+    "**/x.py", "**/*.py", "**/b/**", "a/**", "a/b", "a/b/", "a/*/x.py", "a/**/x.py",
+)
+CHECK_PATHS = (
+    "a", "a/b", "a/b/x.py", "node_modules/a", "a/node_modules", "build", "build/x", "foo.txt",
+    "a/b/", "a/b/.", "a/b//", "a//b", "a/./b", "./a", ".", "./", "..", "../a/.", "x.py/",
+    "x.py/.", "a/foo/", "a/foo/.", "b/.", "node_modules/", "node_modules/.", "a/x.min.js//",
+)
+
+# fnmatch() applies os.path.normcase() to both sides. The compiled tables
+# assume it is the identity (POSIX); elsewhere every pattern is routed to
+# the reference implementation.
+_CASE_SENSITIVE = os.path.normcase('Aa/') == 'Aa/'
+
+
+def _has_glob(pattern: str) -> bool:
+    return any(c in pattern for c in GLOB_CHARS)
+
+
+def _combine_regex(patterns: List[str], prefix: str = '') -> Optional[Pattern[str]]:
+    """Combine fnmatch patterns into one alternation regex."""
+    if not patterns:
+        return None
+    return re.compile('|'.join(f'(?:{prefix}{fnmatch.translate(p)})' for p in patterns))
+
+
+def _path_name(path: str) -> str:
+    """Path(path).name, as the reference functions take it, for a '/'-separated path."""
+    name = path.rsplit('/', 1)[-1]
+    if not name or name == '.':
+        # Path() drops trailing '/' and '/.' components: 'a/b/' and 'a/b/.' name 'b'
+        return Path(path).name
+    return name
+
+
+def matches_pattern(path: str, pattern: str) -> bool:
+    """Check if a path matches a pattern."""
+    path = path.replace('\\', '/')
+    pattern = pattern.replace('\\', '/')
+
+    path_obj = Path(path)
+    path_name = path_obj.name
+
+    if pattern.endswith('/') or (not any(c in pattern for c in '*?[')):
+        folder_pattern = pattern.rstrip('/')
+        if path.startswith(folder_pattern + '/'):
+            return True
+        if '/' + folder_pattern + '/' in path or path == folder_pattern:
+            return True
+
+    if pattern.startswith('**/') and pattern.endswith('/**'):
+        dir_name = pattern[3:-3]
+        parts = path.split('/')
+        return dir_name in parts
+
+    if pattern.startswith('**/'):
+        suffix = pattern[3:]
+        if _has_glob(suffix):
+            # '**/*.test.js': the glob matches the path or any '/'-separated tail
+            parts = path.split('/')
+            return any(
+                fnmatch.fnmatch('/'.join(parts[i:]), suffix) for i in range(len(parts))
+            )
+        return path.endswith(suffix) or ('/' + suffix) in path
+
+    if pattern.endswith('/**'):
+        prefix = pattern[:-3]
+        return path.startswith(prefix + '/') or ('/' + prefix + '/') in path
+
+    if fnmatch.fnmatch(path_name, pattern):
+        return True
+    if fnmatch.fnmatch(path, pattern):
+        return True
+
+    if '**' in pattern:
+        try:
+            if path_obj.match(pattern):
+                return True
+        except ValueError:
+            pass
+
+    return False
+
+
+def matches_source_pattern(path: str, pattern: str) -> bool:
+    """Check if a repo-relative file path matches a toc.yaml source pattern."""
+    normalized_path = path.replace('\\', '/')
+    normalized_pattern = pattern.replace('\\', '/')
+
+    # Folder path matching
+    if normalized_pattern.endswith('/'):
+        folder = normalized_pattern.rstrip('/')
+        return normalized_path.startswith(folder + '/') or normalized_path.startswith(folder)
+
+    # Glob matching
+    if fnmatch.fnmatch(normalized_path, normalized_pattern):
+        return True
+
+    # Filename matching
+    if '/' not in normalized_pattern and '*' not in normalized_pattern:
+        if Path(normalized_path).name == normalized_pattern:
+            return True
+
+    return False
+
+
+class PathMatcher:
+    """Compiled form of a list of include/exclude patterns.
+
+    ``matcher.matches(path)`` is equivalent to
+    ``any(matches_pattern(path, p) for p in patterns)``.
+    """
+
+    def __init__(self, patterns: Optional[Iterable[str]] = None):
+        self.patterns: List[str] = list(patterns or [])
+
+        # Any directory component, the name or the whole path equals the
+        # string: 'node_modules'
+        self._names = set()
+        # Any path component equals the name: '**/x/**'
+        self._component_names = set()
+        # Any directory component (all but the last) equals the name: 'x/**', 'build/'
+        self._dir_names = set()
+        # Whole path equals the string: 'build/' also matches 'build' and 'build/'
+        self._exact_paths = set()
+        # Name or path starts with: 'foo*'
+        self._prefixes: List[str] = []
+        # Name or path ends with: '*.pyc'
+        self._name_suffixes: List[str] = []
+        # Path ends with: '**/foo.py'
+        self._suffixes: List[str] = []
+        # Path contains: '**/foo.py' also matches '/foo.py' anywhere
+        self._substrings: List[str] = []
+        # Remaining globs, matched against the name and the full path
+        regex_patterns: List[str] = []
+        # Globs after '**/', matched against the path or any tail of it
+        tail_patterns: List[str] = []
+        # Patterns whose semantics are not covered by the tables above
+        self._fallback: List[str] = []
+
+        for raw in self.patterns:
+            pattern = raw.replace('\\', '/')
+            if not _CASE_SENSITIVE:
+                self._fallback.append(pattern)
+            elif not _has_glob(pattern):
+                name = pattern.rstrip('/')
+                if not name or '/' in name:
+                    self._fallback.append(pattern)
+                elif pattern.endswith('/'):
+                    self._dir_names.add(name)
+                    self._exact_paths.update((name, pattern))
+                else:
+                    self._names.add(name)
+            elif pattern.endswith('/'):
+                self._fallback.append(pattern)
+            elif pattern.startswith('**/') and pattern.endswith('/**'):
+                self._component_names.add(pattern[3:-3])
+            elif pattern.startswith('**/'):
+                suffix = pattern[3:]
+                if _has_glob(suffix):
+                    tail_patterns.append(suffix)
+                else:
+                    self._suffixes.append(suffix)
+                    self._substrings.append('/' + suffix)
+            elif pattern.endswith('/**'):
+                prefix = pattern[:-3]
+                if '/' in prefix or not prefix:
+                    self._fallback.append(pattern)
+                else:
+                    self._dir_names.add(prefix)
+            elif '**' in pattern:
+                self._fallback.append(pattern)
+            elif pattern.startswith('*') and not _has_glob(pattern[1:]):
+                self._name_suffixes.append(pattern[1:])
+            elif (pattern.endswith('*') and not _has_glob(pattern[:-1])
+                    and '/' not in pattern):
+                self._prefixes.append(pattern[:-1])
+            else:
+                regex_patterns.append(pattern)
+
+        self._prefix_tuple: Tuple[str, ...] = tuple(self._prefixes)
+        self._name_suffix_tuple: Tuple[str, ...] = tuple(self._name_suffixes)
+        self._suffix_tuple: Tuple[str, ...] = tuple(self._suffixes)
+        self._regex = _combine_regex(regex_patterns)
+        self._tail_regex = _combine_regex(tail_patterns, prefix='(?:.*/)?')
+
+    def __bool__(self) -> bool:
+        return bool(self.patterns)
+
+    def matches(self, path: str) -> bool:
+        """Check if a path matches any of the compiled patterns."""
+        path = path.replace('\\', '/')
+        parts = path.split('/')
+        name = _path_name(path)
+
+        if self._names and (
+            name in self._names or path in self._names or not self._names.isdisjoint(parts[:-1])
+        ):
+            return True
+        if self._component_names and not self._component_names.isdisjoint(parts):
+            return True
+        if self._dir_names and not self._dir_names.isdisjoint(parts[:-1]):
+            return True
+        if path in self._exact_paths:
+            return True
+        if self._name_suffix_tuple and (
+            name.endswith(self._name_suffix_tuple) or path.endswith(self._name_suffix_tuple)
+        ):
+            return True
+        if self._suffix_tuple and path.endswith(self._suffix_tuple):
+            return True
+        if self._prefix_tuple and (
+            name.startswith(self._prefix_tuple) or path.startswith(self._prefix_tuple)
+        ):
+            return True
+        for substring in self._substrings:
+            if substring in path:
+                return True
+        if self._regex is not None and (self._regex.match(name) or self._regex.match(path)):
+            return True
+        if self._tail_regex is not None and self._tail_regex.match(path):
+            return True
+        for pattern in self._fallback:
+            if matches_pattern(path, pattern):
+                return True
+
+        return False
+
+
+class SourcePatternMatcher:
+    """Compiled form of a list of toc.yaml ``source_files`` patterns.
+
+    ``matcher.matches(path)`` is equivalent to
+    ``any(matches_source_pattern(path, p) for p in patterns)``.
+    """
+
+    def __init__(self, patterns: Optional[Iterable[str]] = None):
+        self.patterns: List[str] = list(patterns or [])
+
+        self._folder_prefixes: List[str] = []
+        self._exact_paths = set()
+        self._names = set()
+        regex_patterns: List[str] = []
+        self._fallback: List[str] = []
+
+        for raw in self.patterns:
+            pattern = raw.replace('\\', '/')
+            if not _CASE_SENSITIVE:
+                self._fallback.append(pattern)
+                continue
+            if pattern.endswith('/'):
+                # startswith(folder + '/') is implied by startswith(folder)
+                self._folder_prefixes.append(pattern.rstrip('/'))
+                continue
+            if _has_glob(pattern):
+                regex_patterns.append(pattern)
+            else:
+                self._exact_paths.add(pattern)
+            if '/' not in pattern and '*' not in pattern:
+                self._names.add(pattern)
+
+        self._folder_tuple: Tuple[str, ...] = tuple(self._folder_prefixes)
+        self._regex = _combine_regex(regex_patterns)
+
+    def __bool__(self) -> bool:
+        return bool(self.patterns)
+
+    def matches(self, path: str) -> bool:
+        """Check if a file path matches any of the compiled patterns."""
+        path = path.replace('\\', '/')
+
+        if self._folder_tuple and path.startswith(self._folder_tuple):
+            return True
+        if path in self._exact_paths:
+            return True
+        if self._regex is not None and self._regex.match(path):
+            return True
+        if self._names and _path_name(path) in self._names:
+            return True
+        for pattern in self._fallback:
+            if matches_source_pattern(path, pattern):
+                return True
+
+        return False
+
+
+@lru_cache(maxsize=256)
+def compile_patterns(patterns: Tuple[str, ...]) -> PathMatcher:
+    """Return a cached PathMatcher for a tuple of patterns."""
+    return PathMatcher(patterns)
+
+
+@lru_cache(maxsize=256)
+def compile_source_patterns(patterns: Tuple[str, ...]) -> SourcePatternMatcher:
+    """Return a cached SourcePatternMatcher for a tuple of patterns."""
+    return SourcePatternMatcher(patterns)
+
+
+def check_equivalence(
+    patterns: Sequence[str],
+    paths: Sequence[str]
+) -> List[Tuple[str, str, str, bool, bool]]:
+    """Cases where a compiled matcher disagrees with its reference function.
+
+    Each pattern is checked on its own and all of them together. Returns
+    (matcher, pattern(s), path, compiled answer, reference answer) tuples.
+    """
+    mismatches = []
+    for group in [[pattern] for pattern in patterns] + [list(patterns)]:
+        path_matcher = PathMatcher(group)
+        source_matcher = SourcePatternMatcher(group)
+        for path in paths:
+            expected = any(matches_pattern(path, pattern) for pattern in group)
+            if path_matcher.matches(path) != expected:
+                mismatches.append(("PathMatcher", " ".join(group), path, not expected, expected))
+            expected = any(matches_source_pattern(path, pattern) for pattern in group)
+            if source_matcher.matches(path) != expected:
+                mismatches.append(("SourcePatternMatcher", " ".join(group), path, not expected, expected))
+    return mismatches
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Check the compiled path matchers against the reference functions"
+    )
+    parser.add_argument(
+        "--pattern",
+        action="append",
+        dest="patterns",
+        help="Pattern to check (can be repeated; default: one of each kind)"
+    )
+    parser.add_argument("paths", nargs="*", help="Paths to check (default: a set of edge cases)")
+    args = parser.parse_args()
+
+    mismatches = check_equivalence(args.patterns or CHECK_PATTERNS, args.paths or CHECK_PATHS)
+    for matcher, patterns, path, compiled, reference in mismatches:
+        print(f"{matcher} {patterns!r} {path!r}: compiled {compiled}, reference {reference}")
+    if mismatches:
+        return 1
+    print("All matchers agree with the reference functions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
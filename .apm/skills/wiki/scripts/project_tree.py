@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+"""
+Rendering of the project tree of a scan.
+
+generate_tree_structure() renders every scanned file, up to a depth
+limit, as an indented tree. Generated, vendored, minified and duplicate
+files are collapsed into one labelled entry per group (see
+group_noise_files()).
+
+When the full tree does not fit a context budget, summarize_tree_structure()
+lists the top level and then expands directories greedily by score (file
+language weight times a log of size, see file_priority(), optionally
+scaled by per-directory weights such as git churn); directories that do
+not fit stay collapsed as one summary line each, e.g.
+``tests/ (120 files, 1.3 MB, mostly Python)``.
+"""
+
+import heapq
+import math
+import os
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from file_table import FileTable
+from generated_files import DUPLICATE
+from pack_budget import json_string_size
+
+
+# Relative weight of a file's language when scoring directories for the
+# budgeted tree; languages not listed weigh 1.0.
+LANGUAGE_WEIGHTS = {
+    'Markdown': 0.6,
+    'reStructuredText': 0.6,
+    'LaTeX': 0.4,
+    'JSON': 0.3,
+    'XML': 0.3,
+    'YAML': 0.3,
+    'TOML': 0.3,
+    'INI': 0.3,
+    'Config': 0.3,
+    'HTML': 0.5,
+    'CSS': 0.4,
+    'SCSS': 0.4,
+    'Sass': 0.4,
+    'Less': 0.4,
+}
+# Files without a detected language (images, data, archives, ...)
+UNKNOWN_LANGUAGE_WEIGHT = 0.05
+
+
+def format_size(size_bytes: int) -> str:
+    """Format byte size to human-readable string."""
+    size = float(size_bytes)
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+@dataclass
+class NoiseGroup:
+    """Generated/vendored/minified files shown as a single tree entry."""
+    # Relative directory the entry is listed in
+    parent: str
+    label: str
+    file_count: int = 0
+    total_size: int = 0
+    kinds: Dict[str, int] = field(default_factory=dict)
+    # Where the entry's duplicate files were copied from (None: no single place)
+    copy_sources: Set[Optional[str]] = field(default_factory=set)
+
+
+def _noise_kind_label(kinds: Dict[str, int]) -> str:
+    return "/".join(sorted(kinds))
+
+
+def group_noise_files(files: FileTable) -> Tuple[Sequence[int], List[NoiseGroup]]:
+    """Split scanned files into the rows of regular files and collapsed noise groups.
+
+    A directory whose whole subtree is noise becomes one entry in its parent,
+    e.g. 'vendor/ (120 files, 3.0 MB, vendored)'. Noise files next to regular
+    files become one entry per directory, '[12 generated files, 3.4 MB]', or
+    keep their name with a marker when there is only one of them. Entries
+    made only of duplicates of one place name it, e.g.
+    'libcopy/ (120 files, 3.0 MB, duplicate of vendor/lib)'.
+    """
+    noise_ids = files.label_columns["noise"]
+    if not any(noise_ids):
+        return range(len(files)), []
+    regular = [index for index, noise_id in enumerate(noise_ids) if not noise_id]
+
+    # Directories that have a regular file somewhere below them
+    occupied = {""}
+    for directory_id in {files.dir_ids[index] for index in regular}:
+        directory = files.directories[directory_id]
+        while directory not in occupied:
+            occupied.add(directory)
+            directory = directory.rpartition(os.sep)[0]
+
+    groups: Dict[Tuple[str, str], NoiseGroup] = {}
+    single_names: Dict[Tuple[str, str], str] = {}
+    top_noise_dirs: Dict[str, str] = {}
+    for index, noise_id in enumerate(noise_ids):
+        if not noise_id:
+            continue
+        kind = files.labels[noise_id]
+        directory = files.directories[files.dir_ids[index]]
+        name = files.names[index]
+
+        # Highest ancestor whose subtree holds nothing but noise
+        top = top_noise_dirs.get(directory)
+        if top is None:
+            top = ""
+            candidate = directory
+            while candidate not in occupied:
+                top = candidate
+                candidate = candidate.rpartition(os.sep)[0]
+            top_noise_dirs[directory] = top
+
+        if top:
+            key = (top.rpartition(os.sep)[0], top.rpartition(os.sep)[2])
+        else:
+            key = (directory, "")
+            single_names[key] = name
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = NoiseGroup(parent=key[0], label="")
+        group.file_count += 1
+        group.total_size += files.sizes[index]
+        group.kinds[kind] = group.kinds.get(kind, 0) + 1
+        if kind == DUPLICATE:
+            # The copied directory: the canonical path minus the part below the entry
+            canonical = files.extras["duplicate_of"][index]
+            rest = files.relative_path(index)[len(top) + 1:] if top else ""
+            if not rest:
+                group.copy_sources.add(canonical)
+            elif canonical.endswith(os.sep + rest):
+                group.copy_sources.add(canonical[:-len(rest) - 1])
+            else:
+                group.copy_sources.add(None)
+
+    for (parent, dir_name), group in groups.items():
+        kinds = _noise_kind_label(group.kinds)
+        if set(group.kinds) == {DUPLICATE} and len(group.copy_sources) == 1 and None not in group.copy_sources:
+            kinds = f"duplicate of {next(iter(group.copy_sources)).replace(os.sep, '/')}"
+        if dir_name:
+            noun = "file" if group.file_count == 1 else "files"
+            group.label = (
+                f"{dir_name}/ ({group.file_count:,} {noun}, "
+                f"{format_size(group.total_size)}, {kinds})"
+            )
+        elif group.file_count == 1:
+            group.label = f"{single_names[(parent, dir_name)]} [{kinds}]"
+        else:
+            group.label = (
+                f"[{group.file_count:,} {kinds} files, {format_size(group.total_size)}]"
+            )
+
+    return regular, list(groups.values())
+
+
+def build_tree_model(
+    root_path: str,
+    files: FileTable,
+    max_depth: Optional[int] = None
+) -> Dict[str, Any]:
+    """Build a trie of the project tree from scanned files.
+
+    Each directory is a dict mapping interned entry names to a child dict
+    (directory) or None (file). Files deeper than ``max_depth`` are left out.
+    Generated, vendored and minified files are collapsed into one labelled
+    entry per group (see group_noise_files()).
+    """
+    tree: Dict[str, Any] = {}
+    intern = sys.intern
+    rows, noise_groups = group_noise_files(files)
+
+    # Trie node of each directory id; None for directories past max_depth
+    dir_nodes: Dict[int, Optional[Dict[str, Any]]] = {}
+    dir_ids = files.dir_ids
+    names = files.names
+    for index in rows:
+        directory_id = dir_ids[index]
+        node = dir_nodes.get(directory_id, tree)
+        if directory_id not in dir_nodes:
+            directory = files.directories[directory_id]
+            parts = directory.split(os.sep) if directory else []
+            if max_depth and len(parts) + 1 > max_depth:
+                node = None
+            else:
+                for part in parts:
+                    child = node.get(part)
+                    if child is None:
+                        child = node[intern(part)] = {}
+                    node = child
+            dir_nodes[directory_id] = node
+        if node is not None and names[index] not in node:
+            node[names[index]] = None
+
+    for group in noise_groups:
+        parts = group.parent.split(os.sep) if group.parent else []
+        if max_depth and len(parts) + 1 > max_depth:
+            continue
+        node = tree
+        for part in parts:
+            child = node.get(part)
+            if child is None:
+                child = node[intern(part)] = {}
+            node = child
+        node[group.label] = None
+
+    return tree
+
+
+def iter_tree_lines(
+    root_name: str,
+    tree: Dict[str, Any],
+    max_depth: Optional[int] = None
+) -> Iterator[str]:
+    """Render a tree model line by line, depth-first with sorted entries."""
+    yield root_name + "/"
+
+    if max_depth and max_depth <= 1:
+        return
+
+    # Each frame: [sorted names, node, next index, prefix, depth]
+    stack: List[List[Any]] = [[sorted(tree), tree, 0, "", 1]]
+    while stack:
+        frame = stack[-1]
+        names, node, index, prefix, depth = frame
+        if index == len(names):
+            stack.pop()
+            continue
+        frame[2] = index + 1
+
+        name = names[index]
+        child = node[name]
+        if index == len(names) - 1:
+            tree_char = "└── "
+            next_prefix = prefix + "    "
+        else:
+            tree_char = "├── "
+            next_prefix = prefix + "│   "
+
+        if child is None:
+            yield prefix + tree_char + name
+        else:
+            yield prefix + tree_char + name + "/"
+            if not (max_depth and depth + 1 >= max_depth):
+                stack.append([sorted(child), child, 0, next_prefix, depth + 1])
+
+
+def generate_tree_structure(
+    root_path: str,
+    files: FileTable,
+    max_depth: Optional[int] = None
+) -> str:
+    """Generate a tree-like string representation of the project structure."""
+    tree = build_tree_model(root_path, files, max_depth)
+    return "\n".join(iter_tree_lines(Path(root_path).name, tree, max_depth))
+
+
+@dataclass
+class SummaryNode:
+    """A directory in a budgeted tree, with totals over its whole subtree."""
+    name: str
+    relative_path: str
+    depth: int
+    # Entry name -> SummaryNode (directory) or None (file)
+    children: Dict[str, Optional["SummaryNode"]] = field(default_factory=dict)
+    file_count: int = 0
+    total_size: int = 0
+    score: float = 0.0
+    kinds: Dict[str, int] = field(default_factory=dict)
+    expanded: bool = False
+
+
+def _file_kind(name: str, language: Optional[str]) -> str:
+    """Label used for the 'mostly ...' part of a collapsed directory."""
+    if language:
+        return language
+    suffix = name.rpartition('.')[2] if '.' in name.lstrip('.') else ""
+    return suffix.upper() if suffix else "other"
+
+
+def file_priority(file_data: Dict[str, Any]) -> float:
+    """Score a file for tree budgeting: language weight times a log of its size."""
+    return _priority(file_data.get("language"), file_data["size"])
+
+
+def _priority(language: Optional[str], size: int) -> float:
+    weight = LANGUAGE_WEIGHTS.get(language, 1.0) if language else UNKNOWN_LANGUAGE_WEIGHT
+    return weight * (1.0 + math.log2(1.0 + size / 1024))
+
+
+def build_summary_tree(
+    root_path: str,
+    files: FileTable,
+    dir_weights: Optional[Dict[str, float]] = None
+) -> SummaryNode:
+    """Build a directory tree with per-subtree file counts, sizes, kinds and scores.
+
+    ``dir_weights`` maps relative directory paths to score multipliers
+    (e.g. from git churn); the multiplier applies to the directory's subtree.
+    """
+    root = SummaryNode(name=Path(root_path).name, relative_path="", depth=0)
+    intern = sys.intern
+
+    def directory_node(parts: List[str]) -> SummaryNode:
+        node = root
+        for part in parts:
+            child = node.children.get(part)
+            if child is None:
+                rel = f"{node.relative_path}{os.sep}{part}" if node.relative_path else part
+                child = node.children[intern(part)] = SummaryNode(
+                    name=part, relative_path=rel, depth=node.depth + 1
+                )
+            node = child
+        return node
+
+    rows, noise_groups = group_noise_files(files)
+    for group in noise_groups:
+        # Noise counts towards totals but adds nothing to the score
+        node = directory_node(group.parent.split(os.sep) if group.parent else [])
+        node.children[group.label] = None
+        node.file_count += group.file_count
+        node.total_size += group.total_size
+        for kind, count in group.kinds.items():
+            node.kinds[kind] = node.kinds.get(kind, 0) + count
+
+    dir_nodes: Dict[int, SummaryNode] = {}
+    for index in rows:
+        directory_id = files.dir_ids[index]
+        node = dir_nodes.get(directory_id)
+        if node is None:
+            directory = files.directories[directory_id]
+            node = dir_nodes[directory_id] = directory_node(directory.split(os.sep) if directory else [])
+        name = files.names[index]
+        language = files.label(index, "language")
+        size = files.sizes[index]
+        node.children[name] = None
+        node.file_count += 1
+        node.total_size += size
+        node.score += _priority(language, size)
+        kind = _file_kind(name, language)
+        node.kinds[kind] = node.kinds.get(kind, 0) + 1
+
+    # Roll totals up from the deepest directories (post-order without recursion)
+    order: List[SummaryNode] = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        order.append(node)
+        stack.extend(child for child in node.children.values() if child is not None)
+    for node in reversed(order):
+        if dir_weights and node.relative_path in dir_weights:
+            node.score *= dir_weights[node.relative_path]
+        for child in node.children.values():
+            if child is None:
+                continue
+            node.file_count += child.file_count
+            node.total_size += child.total_size
+            node.score += child.score
+            for kind, count in child.kinds.items():
+                node.kinds[kind] = node.kinds.get(kind, 0) + count
+
+    return root
+
+
+def summary_label(node: SummaryNode) -> str:
+    """Render a collapsed directory, e.g. 'assets/ (4,213 files, 1.2 GB, mostly PNG)'."""
+    noun = "file" if node.file_count == 1 else "files"
+    details = [f"{node.file_count:,} {noun}", format_size(node.total_size)]
+    if node.kinds:
+        kind, count = max(node.kinds.items(), key=lambda item: (item[1], item[0]))
+        if count * 2 >= node.file_count:
+            details.append(f"mostly {kind}")
+    return f"{node.name}/ ({', '.join(details)})"
+
+
+def _tree_line_size(depth: int, text: str) -> int:
+    """Upper bound of the JSON bytes a tree line at ``depth`` adds to the tree string.
+
+    Each indentation level is at most '│   ' (6 bytes), the branch '├── ' is
+    10 bytes and the joining newline is escaped to two bytes.
+    """
+    return 6 * (depth - 1) + 10 + json_string_size(text)
+
+
+def _children_size(node: SummaryNode) -> int:
+    """Bytes added by listing a directory's children, subdirectories collapsed."""
+    depth = node.depth + 1
+    size = 0
+    for name, child in node.children.items():
+        if child is None:
+            size += _tree_line_size(depth, name)
+        else:
+            size += _tree_line_size(depth, summary_label(child))
+    return size
+
+
+def _expansion_cost(node: SummaryNode) -> int:
+    """Bytes added by expanding a collapsed directory; its own line loses the summary."""
+    return (
+        _children_size(node)
+        + json_string_size(node.name + "/")
+        - json_string_size(summary_label(node))
+    )
+
+
+def iter_summary_lines(root: SummaryNode) -> Iterator[str]:
+    """Render a summary tree; collapsed directories become one summary line."""
+    yield root.name + "/"
+    if not root.expanded:
+        return
+
+    stack: List[List[Any]] = [[sorted(root.children), root, 0, ""]]
+    while stack:
+        frame = stack[-1]
+        names, node, index, prefix = frame
+        if index == len(names):
+            stack.pop()
+            continue
+        frame[2] = index + 1
+
+        name = names[index]
+        child = node.children[name]
+        if index == len(names) - 1:
+            tree_char = "└── "
+            next_prefix = prefix + "    "
+        else:
+            tree_char = "├── "
+            next_prefix = prefix + "│   "
+
+        if child is None:
+            yield prefix + tree_char + name
+        elif child.expanded:
+            yield prefix + tree_char + name + "/"
+            stack.append([sorted(child.children), child, 0, next_prefix])
+        else:
+            yield prefix + tree_char + summary_label(child)
+
+
+def summarize_tree_structure(
+    root_path: str,
+    files: FileTable,
+    budget: int,
+    max_depth: Optional[int] = None,
+    dir_weights: Optional[Dict[str, float]] = None
+) -> Tuple[str, Dict[str, Any]]:
+    """Render the project tree within ``budget`` JSON bytes, expanding by priority.
+
+    The top level is always listed. After that, collapsed directories are
+    expanded greedily in order of score (see file_priority()) as long as
+    their children fit; directories that do not fit stay collapsed as
+    summary lines. ``max_depth`` has the same meaning as in
+    generate_tree_structure().
+
+    Returns:
+        (tree string, stats) where stats has the expanded/collapsed
+        directory counts and the depth of the deepest listed entry.
+    """
+    root = build_summary_tree(root_path, files, dir_weights)
+    used = json_string_size(root.name + "/")
+    heap: List[Tuple[float, str, SummaryNode]] = []
+    expanded = 0
+
+    def expand(node: SummaryNode) -> None:
+        nonlocal expanded
+        node.expanded = True
+        expanded += 1
+        for child in node.children.values():
+            if child is not None:
+                heapq.heappush(heap, (-child.score, child.relative_path, child))
+
+    if not (max_depth and max_depth <= 1):
+        used += _children_size(root)
+        expand(root)
+
+    while heap:
+        _, _, node = heapq.heappop(heap)
+        if max_depth and node.depth + 1 >= max_depth:
+            continue
+        cost = _expansion_cost(node)
+        if used + cost > budget:
+            continue
+        used += cost
+        expand(node)
+
+    collapsed = 0
+    deepest = 0
+    stack = [root] if root.expanded else []
+    while stack:
+        node = stack.pop()
+        deepest = max(deepest, node.depth + 1)
+        for child in node.children.values():
+            if child is None:
+                continue
+            if child.expanded:
+                stack.append(child)
+            else:
+                collapsed += 1
+
+    return "\n".join(iter_summary_lines(root)), {
+        "expanded_directories": expanded,
+        "collapsed_directories": collapsed,
+        "depth": deepest,
+    }
@@ -16,15 +16,32 @@ Options:
     --files JSON           JSON array of file paths or glob patterns (required)
     --line-numbers         Add line numbers (default: true)
     --max-size BYTES       Maximum file size in bytes (default: 1MB)
+    --max-tokens INT       Cut each file to this many estimated tokens, at a line boundary
+    --token-cache PATH     Token count cache file (default: none)
+    --include-generated    Read generated, vendored, minified and duplicate files in full
     --output PATH          Output file path (default: stdout)
 """
 
 import argparse
 import glob as glob_module
+import hashlib
 import json
 import sys
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Optional
+
+from file_sniffer import SAMPLE_SIZE, is_binary_sample, sniff_file
+from generated_files import DUPLICATE, classify_noise, classify_sample
+from git_attributes import GitAttributes, linguist_language
+from language_detector import detect_language
+from token_estimator import TokenEstimator
+
+
+# Generated/vendored/minified files named explicitly are cut to this many
+# lines and characters (a minified bundle is often one long line) unless
+# --include-generated is given; glob matches are skipped.
+GENERATED_PREVIEW_LINES = 50
+GENERATED_PREVIEW_CHARS = 4000
 
 
 def is_glob_pattern(path: str) -> bool:
@@ -68,85 +85,16 @@ def expand_glob_patterns(repo_path: str, file_paths: List[str]) -> List[str]:
     return sorted(expanded)
 
 
-# Language detection by extension
-EXTENSION_LANGUAGE_MAP = {
-    '.py': 'Python', '.js': 'JavaScript', '.ts': 'TypeScript',
-    '.jsx': 'JavaScript React', '.tsx': 'TypeScript React',
-    '.java': 'Java', '.c': 'C', '.cpp': 'C++', '.cc': 'C++',
-    '.h': 'C/C++ Header', '.hpp': 'C++ Header',
-    '.go': 'Go', '.rs': 'Rust', '.rb': 'Ruby', '.php': 'PHP',
-    '.swift': 'Swift', '.kt': 'Kotlin', '.scala': 'Scala',
-    '.sh': 'Shell', '.bash': 'Bash', '.zsh': 'Zsh',
-    '.cs': 'C#', '.fs': 'F#', '.vb': 'Visual Basic',
-    '.r': 'R', '.R': 'R', '.sql': 'SQL',
-    '.md': 'Markdown', '.rst': 'reStructuredText',
-    '.html': 'HTML', '.css': 'CSS', '.scss': 'SCSS',
-    '.json': 'JSON', '.xml': 'XML', '.yaml': 'YAML', '.yml': 'YAML',
-    '.toml': 'TOML', '.ini': 'INI',
-    '.vue': 'Vue', '.svelte': 'Svelte', '.dart': 'Dart', '.lua': 'Lua',
-}
-
-
-def detect_language(file_path: str) -> Optional[str]:
-    """Detect programming language from file extension."""
-    ext = Path(file_path).suffix.lower()
-    name = Path(file_path).name.lower()
-
-    if name.startswith('dockerfile'):
-        return 'Dockerfile'
-    if name in ['makefile', 'gnumakefile']:
-        return 'Makefile'
-
-    return EXTENSION_LANGUAGE_MAP.get(ext)
-
-
 def detect_encoding(file_path: Path) -> str:
     """Detect file encoding by trying multiple encodings."""
-    encodings = ['utf-8', 'utf-16', 'iso-8859-1', 'latin-1', 'ascii', 'gb2312', 'gbk']
-
-    for encoding in encodings:
-        try:
-            with open(file_path, 'r', encoding=encoding) as f:
-                f.read(1024)
-            return encoding
-        except (UnicodeDecodeError, UnicodeError):
-            continue
-        except Exception:
-            continue
+    return sniff_file(str(file_path)).encoding or 'utf-8'  # Default fallback
 
-    return 'utf-8'  # Default fallback
 
-
-def is_binary_file(file_path: Path, sample_size: int = 8192) -> bool:
+def is_binary_file(file_path: Path, sample_size: int = SAMPLE_SIZE) -> bool:
     """Check if a file is binary by examining its content."""
     try:
         with open(file_path, 'rb') as f:
-            chunk = f.read(sample_size)
-
-        if not chunk:
-            return False
-
-        # Check for null bytes
-        if b'\x00' in chunk:
-            return True
-
-        # Try to decode as UTF-8
-        try:
-            chunk.decode('utf-8')
-            return False
-        except UnicodeDecodeError:
-            pass
-
-        # Try other encodings
-        for encoding in ['latin-1', 'iso-8859-1', 'cp1252']:
-            try:
-                chunk.decode(encoding)
-                return False
-            except (UnicodeDecodeError, LookupError):
-                continue
-
-        return True
-
+            return is_binary_sample(f.read(sample_size))
     except Exception:
         return False
 
@@ -198,6 +146,9 @@ def read_file_with_line_numbers(
         "size": 0,
         "encoding": "unknown",
         "language": None,
+        "noise": None,
+        "truncated": False,
+        "tokens": 0,
         "error": None
     }
 
@@ -210,28 +161,30 @@ def read_file_with_line_numbers(
         return result
 
     try:
-        size = file_path.stat().st_size
+        # Single open: size check, binary/encoding sniff and decode share one read
+        sniff = sniff_file(str(file_path), read_content=True, max_size=max_size)
+        size = sniff.size
         result["size"] = size
 
         if size > max_size:
             result["error"] = f"File too large: {format_size(size)} (max: {format_size(max_size)})"
             return result
 
-        if is_binary_file(file_path):
-            result["error"] = "Binary file"
+        if sniff.error:
+            result["error"] = sniff.error
             return result
 
-        # Detect encoding
-        encoding = detect_encoding(file_path)
-        result["encoding"] = encoding
+        if sniff.is_binary:
+            result["error"] = "Binary file"
+            return result
 
-        # Detect language
-        result["language"] = detect_language(str(file_path))
+        result["encoding"] = sniff.encoding or "utf-8"
 
-        # Read content
-        with open(file_path, 'r', encoding=encoding, errors='replace') as f:
-            content = f.read()
+        # Detect language and generated/minified content signals
+        result["language"] = detect_language(str(file_path), sniff.sample)
+        result["noise"] = classify_sample(file_path.name, sniff.sample)
 
+        content = sniff.content or ""
         lines = content.splitlines()
 
         # Add line numbers if requested
@@ -248,20 +201,82 @@ def read_file_with_line_numbers(
     return result
 
 
+def truncate_lines(content: str, max_lines: int, max_chars: Optional[int] = None) -> str:
+    """Keep the first ``max_lines`` lines of content, and at most ``max_chars`` characters.
+
+    The character cut falls on a line break if one keeps at least half of
+    ``max_chars``, else mid-line.
+    """
+    lines = content.split("\n")
+    if len(lines) > max_lines:
+        content = "\n".join(lines[:max_lines])
+    if max_chars is not None and len(content) > max_chars:
+        cut = content.rfind("\n", 0, max_chars + 1)
+        content = content[:cut if cut >= max_chars // 2 else max_chars]
+    return content
+
+
+def truncate_tokens(content: str, max_tokens: int, estimator: TokenEstimator) -> str:
+    """Keep the whole lines of content that fit in ``max_tokens`` estimated tokens."""
+    truncated = estimator.truncate(content, max_tokens)
+    if len(truncated) == len(content):
+        return content
+    cut = truncated.rfind("\n")
+    return truncated[:cut] if cut > 0 else truncated
+
+
+def _skipped_result(path: str, noise: str) -> Dict[str, Any]:
+    return {
+        "path": path,
+        "content": None,
+        "size": 0,
+        "encoding": "unknown",
+        "language": None,
+        "noise": noise,
+        "truncated": False,
+        "tokens": 0,
+        "error": f"Skipped {noise} file (use --include-generated to read it)"
+    }
+
+
+def _duplicate_result(path: str, duplicate_of: str) -> Dict[str, Any]:
+    result = _skipped_result(path, DUPLICATE)
+    result["duplicate_of"] = duplicate_of
+    result["error"] = f"Skipped duplicate of {duplicate_of} (use --include-generated to read it)"
+    return result
+
+
 def read_files(
     repo_path: str,
     file_paths: List[str],
     include_line_numbers: bool = True,
-    max_size: int = 1024 * 1024
+    max_size: int = 1024 * 1024,
+    include_generated: bool = False,
+    explicit_paths: Optional[Iterable[str]] = None,
+    max_tokens: Optional[int] = None,
+    estimator: Optional[TokenEstimator] = None
 ) -> Dict[str, Any]:
     """
     Read multiple files from a repository.
 
+    Generated, vendored and minified files (see generated_files) are skipped
+    when they were only matched by a glob, and cut to GENERATED_PREVIEW_LINES
+    lines and GENERATED_PREVIEW_CHARS characters when named explicitly,
+    unless ``include_generated`` is set. Glob matches with the same content
+    as a file read earlier are skipped too, naming that file in
+    ``duplicate_of``.
+    Each file's content is estimated in tokens (see token_estimator) and,
+    with ``max_tokens``, cut to that many at a line boundary.
+
     Args:
         repo_path: Repository root path
         file_paths: List of file paths (relative or absolute)
         include_line_numbers: Whether to add line numbers
         max_size: Maximum file size in bytes
+        include_generated: Read generated/vendored/minified files in full
+        explicit_paths: Paths the caller named directly (default: all of file_paths)
+        max_tokens: Maximum estimated tokens per file (default: no limit)
+        estimator: Token estimator (default: TokenEstimator.from_env())
 
     Returns:
         Dictionary with file contents and metadata
@@ -269,11 +284,19 @@ def read_files(
     # Find git root
     git_root = find_git_root(repo_path)
     root = Path(git_root)
+    gitattributes = GitAttributes(git_root)
+
+    explicit = set(file_paths if explicit_paths is None else explicit_paths)
+    if estimator is None:
+        estimator = TokenEstimator.from_env()
 
     results = []
     total_size = 0
+    total_tokens = 0
     files_read = 0
     files_failed = 0
+    files_skipped = 0
+    seen_content: Dict[str, str] = {}
 
     for file_path in file_paths:
         # Resolve path
@@ -282,6 +305,21 @@ def read_files(
         if not path.is_absolute():
             path = root / file_path
 
+        try:
+            rel_path = path.resolve().relative_to(root.resolve()).as_posix()
+        except ValueError:
+            rel_path = None
+        attributes = gitattributes.attributes_for(rel_path) if rel_path else {}
+        is_explicit = file_path in explicit
+
+        # Glob matches that are noise by path alone are skipped without reading
+        if not include_generated and not is_explicit:
+            noise = classify_noise(rel_path or path.name, attributes)
+            if noise:
+                results.append(_skipped_result(original_path, noise))
+                files_skipped += 1
+                continue
+
         # Read file
         result = read_file_with_line_numbers(
             path,
@@ -292,11 +330,44 @@ def read_files(
         # Store relative path (original) instead of absolute path
         result["path"] = original_path
 
+        if not result["error"]:
+            # Repository-level linguist-language overrides
+            language = linguist_language(attributes)
+            if language:
+                result["language"] = language
+
+            result["noise"] = classify_noise(rel_path or path.name, attributes, result["noise"])
+            if result["noise"] and not include_generated:
+                if not is_explicit:
+                    results.append(_skipped_result(original_path, result["noise"]))
+                    files_skipped += 1
+                    continue
+                truncated = truncate_lines(result["content"], GENERATED_PREVIEW_LINES, GENERATED_PREVIEW_CHARS)
+                if truncated != result["content"]:
+                    result["content"] = truncated
+                    result["truncated"] = True
+
+            if result["size"] and not include_generated:
+                digest = hashlib.blake2b(result["content"].encode("utf-8"), digest_size=16).hexdigest()
+                duplicate_of = seen_content.setdefault(digest, original_path)
+                if duplicate_of != original_path and not is_explicit:
+                    results.append(_duplicate_result(original_path, duplicate_of))
+                    files_skipped += 1
+                    continue
+
+            if max_tokens is not None:
+                truncated = truncate_tokens(result["content"], max_tokens, estimator)
+                if truncated != result["content"]:
+                    result["content"] = truncated
+                    result["truncated"] = True
+            result["tokens"] = estimator.count(result["content"])
+
         if result["error"]:
             files_failed += 1
         else:
             files_read += 1
             total_size += result["size"]
+            total_tokens += result["tokens"]
 
         results.append(result)
 
@@ -304,8 +375,11 @@ def read_files(
         "files": results,
         "total_size": total_size,
         "total_size_formatted": format_size(total_size),
+        "total_tokens": total_tokens,
+        "token_estimator": estimator.name,
         "files_read": files_read,
-        "files_failed": files_failed
+        "files_failed": files_failed,
+        "files_skipped": files_skipped
     }
 
 
@@ -341,12 +415,28 @@ def main():
         default=1024 * 1024,
         help="Maximum file size in bytes (default: 1MB)"
     )
+    parser.add_argument(
+        "--max-tokens",
+        type=int,
+        help="Cut each file to this many estimated tokens, at a line boundary (default: no limit)"
+    )
+    parser.add_argument(
+        "--token-cache",
+        help="Token count cache file, reused across runs (default: none)"
+    )
     parser.add_argument(
         "--output",
         help="Output file path (default: stdout)"
     )
+    parser.add_argument(
+        "--include-generated",
+        action="store_true",
+        help="Read generated, vendored, minified and duplicate files in full"
+    )
 
     args = parser.parse_args()
+    if args.max_tokens is not None and args.max_tokens < 1:
+        parser.error("--max-tokens must be at least 1")
 
     try:
         # Parse file paths
@@ -359,12 +449,18 @@ def main():
         if not expanded_paths:
             print(f"Warning: No files matched the patterns: {file_paths}", file=sys.stderr)
 
+        estimator = TokenEstimator.from_env(args.token_cache)
         result = read_files(
             repo_path=args.repo_path,
             file_paths=expanded_paths,
             include_line_numbers=args.line_numbers,
-            max_size=args.max_size
+            max_size=args.max_size,
+            include_generated=args.include_generated,
+            explicit_paths=[p for p in file_paths if not is_glob_pattern(p)],
+            max_tokens=args.max_tokens,
+            estimator=estimator
         )
+        estimator.save()
 
         output = json.dumps(result, ensure_ascii=False, indent=2)
 
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Persistent incremental cache for repository scans.
+
+The cache lives next to the context pack (``{output_dir}/_context/``) and
+remembers, per repo-relative path:
+
+- files: (inode, size, mtime_ns) plus the attributes derived from them
+  (language, and the content-tier binary flag / encoding / line count /
+  generated-content signal once they have been sniffed, and the content
+  hash once the file has been fingerprinted for deduplication)
+- directories: (inode, mtime_ns) plus the raw child listing, so an
+  unchanged directory does not need to be listed again
+
+Entries whose fingerprint no longer matches are recomputed; entries not
+visited during a scan are evicted when the cache is saved.
+"""
+
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Bumped whenever cached attributes change (2: content-aware languages,
+# 3: generated/minified content signal, 4: content hash, 5: stricter
+# generated header check, 6: C headers and trailing modelines)
+CACHE_VERSION = 6
+CACHE_FILENAME = "scan_cache.json"
+
+# Entries modified this close to the time they are cached could change
+# again within the same mtime tick, so they are not trusted on the next run.
+RACY_WINDOW_NS = 2 * 1_000_000_000
+
+FILE_ATTRIBUTES = ("language", "is_binary", "encoding", "line_count", "content_noise", "content_hash")
+# Attributes computed together by sniffing a file (see ensure_content_attributes())
+CONTENT_TIER_ATTRIBUTES = ("is_binary", "encoding", "line_count", "content_noise")
+
+
+class ScanCache:
+    """Fingerprint-keyed cache of file attributes and directory listings."""
+
+    def __init__(self, cache_path: str, root_path: str):
+        self.cache_path = cache_path
+        self.root_path = root_path
+        self._files: Dict[str, List[Any]] = {}
+        self._dirs: Dict[str, List[Any]] = {}
+        self._seen_files = set()
+        self._seen_dirs = set()
+        self._now_ns = time.time_ns()
+        self.file_hits = 0
+        self.file_misses = 0
+        self.dir_hits = 0
+        self.dir_misses = 0
+        self.evicted = 0
+
+    @classmethod
+    def load(cls, cache_path: str, root_path: str) -> "ScanCache":
+        """Load a cache file, starting empty if it is missing or unusable."""
+        cache = cls(cache_path, root_path)
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cache
+
+        if (
+            isinstance(data, dict)
+            and data.get("version") == CACHE_VERSION
+            and data.get("root") == root_path
+        ):
+            cache._files = data.get("files", {})
+            cache._dirs = data.get("dirs", {})
+        return cache
+
+    def _is_racy(self, mtime_ns: int) -> bool:
+        return self._now_ns - mtime_ns < RACY_WINDOW_NS
+
+    def listing_fingerprint(self, rel_dir: str) -> Optional[Tuple[int, int]]:
+        """Return the cached (inode, mtime_ns) of a directory without counting a lookup."""
+        entry = self._dirs.get(rel_dir)
+        return (entry[0], entry[1]) if entry else None
+
+    def get_listing(
+        self,
+        rel_dir: str,
+        stat: os.stat_result
+    ) -> Optional[Tuple[List[str], List[str], List[str]]]:
+        """Return the cached (dirs, files, symlinked dirs) of an unchanged directory."""
+        self._seen_dirs.add(rel_dir)
+        entry = self._dirs.get(rel_dir)
+        if entry and entry[0] == stat.st_ino and entry[1] == stat.st_mtime_ns:
+            self.dir_hits += 1
+            return entry[2], entry[3], entry[4]
+        self.dir_misses += 1
+        return None
+
+    def put_listing(
+        self,
+        rel_dir: str,
+        stat: os.stat_result,
+        dirs: List[str],
+        files: List[str],
+        symlinked_dirs: List[str]
+    ) -> None:
+        """Remember the raw child listing of a directory."""
+        if self._is_racy(stat.st_mtime_ns):
+            self._dirs.pop(rel_dir, None)
+            return
+        self._dirs[rel_dir] = [stat.st_ino, stat.st_mtime_ns, dirs, files, symlinked_dirs]
+
+    def get_file(self, rel_path: str, stat: os.stat_result) -> Optional[Dict[str, Any]]:
+        """Return cached attributes of an unchanged file."""
+        self._seen_files.add(rel_path)
+        entry = self._files.get(rel_path)
+        if (
+            entry
+            and entry[0] == stat.st_ino
+            and entry[1] == stat.st_size
+            and entry[2] == stat.st_mtime_ns
+        ):
+            self.file_hits += 1
+            attributes = dict(zip(FILE_ATTRIBUTES, entry[3:]))
+            if attributes.get("is_binary") is None:
+                # Content tier was never computed for this file
+                for key in CONTENT_TIER_ATTRIBUTES:
+                    attributes.pop(key, None)
+            if attributes.get("content_hash") is None:
+                attributes.pop("content_hash", None)
+            return attributes
+        self.file_misses += 1
+        return None
+
+    def put_file(self, rel_path: str, stat: os.stat_result, file_data: Dict[str, Any]) -> None:
+        """Remember the attributes of a scanned file."""
+        if self._is_racy(stat.st_mtime_ns):
+            self._files.pop(rel_path, None)
+            return
+        self._files[rel_path] = [stat.st_ino, stat.st_size, stat.st_mtime_ns] + [
+            file_data.get(key) for key in FILE_ATTRIBUTES
+        ]
+
+    def update_file(self, rel_path: str, file_data: Dict[str, Any]) -> None:
+        """Refresh the attributes of a file cached earlier in this scan."""
+        entry = self._files.get(rel_path)
+        if entry is not None and rel_path in self._seen_files:
+            entry[3:] = [file_data.get(key) for key in FILE_ATTRIBUTES]
+
+    def partition(self, roots: List[str]) -> Dict[str, "ScanCache"]:
+        """Split the entries among subtrees, e.g. for scanning them in other processes.
+
+        ``roots`` are relative directories ("" for the repository root);
+        each entry goes to the deepest root it lies under. Entries under no
+        root are left out. Merge the caches back with absorb().
+        """
+        parts = {root: ScanCache(self.cache_path, self.root_path) for root in roots}
+        owners: Dict[str, Optional[str]] = {}
+
+        def owner(rel_dir: str) -> Optional[str]:
+            found = owners.get(rel_dir, False)
+            if found is False:
+                if rel_dir in parts:
+                    found = rel_dir
+                elif rel_dir:
+                    found = owner(os.path.dirname(rel_dir))
+                else:
+                    found = None
+                owners[rel_dir] = found
+            return found
+
+        for rel_path, entry in self._files.items():
+            root = owner(os.path.dirname(rel_path))
+            if root is not None:
+                parts[root]._files[rel_path] = entry
+        for rel_dir, entry in self._dirs.items():
+            root = owner("" if rel_dir == "." else rel_dir)
+            if root is not None:
+                parts[root]._dirs[rel_dir] = entry
+        return parts
+
+    def absorb(self, other: "ScanCache") -> None:
+        """Take over the entries, visits and counters of a partition after its scan."""
+        # Entries the partition dropped (racy timestamps) must not survive here
+        for rel_path in other._seen_files.difference(other._files):
+            self._files.pop(rel_path, None)
+        for rel_dir in other._seen_dirs.difference(other._dirs):
+            self._dirs.pop(rel_dir, None)
+        self._files.update(other._files)
+        self._dirs.update(other._dirs)
+        self._seen_files.update(other._seen_files)
+        self._seen_dirs.update(other._seen_dirs)
+        self.file_hits += other.file_hits
+        self.file_misses += other.file_misses
+        self.dir_hits += other.dir_hits
+        self.dir_misses += other.dir_misses
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters for reporting in output metadata."""
+        file_lookups = self.file_hits + self.file_misses
+        dir_lookups = self.dir_hits + self.dir_misses
+        return {
+            "path": self.cache_path,
+            "file_hits": self.file_hits,
+            "file_misses": self.file_misses,
+            "file_hit_rate": round(self.file_hits / file_lookups, 4) if file_lookups else 0.0,
+            "directory_hits": self.dir_hits,
+            "directory_misses": self.dir_misses,
+            "directory_hit_rate": round(self.dir_hits / dir_lookups, 4) if dir_lookups else 0.0,
+            "evicted": self.evicted,
+        }
+
+    def save(self) -> None:
+        """Evict entries not seen in this scan and write the cache atomically."""
+        stale_files = [key for key in self._files if key not in self._seen_files]
+        stale_dirs = [key for key in self._dirs if key not in self._seen_dirs]
+        for key in stale_files:
+            del self._files[key]
+        for key in stale_dirs:
+            del self._dirs[key]
+        self.evicted = len(stale_files) + len(stale_dirs)
+
+        data = {
+            "version": CACHE_VERSION,
+            "root": self.root_path,
+            "files": self._files,
+            "dirs": self._dirs,
+        }
+        directory = os.path.dirname(self.cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, self.cache_path)
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Top-level symbol index of a repository.
+
+Lists the classes, functions and other top-level declarations of each
+source file with their line spans, so later phases can pick the lines to
+read instead of reading whole files:
+
+- Python: parsed with ``ast`` (classes, functions)
+- JavaScript/TypeScript, Go, Rust, Java, C#: regular expressions for the
+  declarations, with the body found by matching braces (strings and
+  comments are skipped); declarations nested in another declaration's
+  body are left out, except inside namespaces and modules
+
+The index is stored as ``symbol_index.json`` next to the context pack and
+doubles as its own cache (see file_index): a file whose (inode, size,
+mtime_ns) is unchanged keeps its entry. Files that need extracting are
+spread over a process pool. symbol_summary() renders the index for the
+context pack within a byte budget.
+
+Usage:
+    python symbol_index.py --repo-path /path/to/repo FILE [FILE ...]
+"""
+
+import argparse
+import ast
+import functools
+import json
+import os
+import re
+import sys
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from file_index import build_file_index, extract_file
+from pack_budget import json_size, json_string_size
+from project_tree import file_priority
+
+
+# Bumped whenever extracted symbols change for the same file contents
+SYMBOL_INDEX_VERSION = 1
+SYMBOL_INDEX_FILENAME = "symbol_index.json"
+# Symbols listed per file in the summary; the rest are counted
+SYMBOL_SUMMARY_PER_FILE = 40
+
+# Symbol entries are [name, kind, start line, end line]
+Symbol = List[Any]
+
+# Declaration patterns per language, matched at the start of a line after
+# any indentation; earlier patterns win over later ones on the same line.
+_JS_KEYWORDS = r'(?:export|declare|abstract|async|class|function|const|let|var|interface|type|enum|namespace|module)\b'
+_JS_PATTERNS = [
+    (r'(?:export[ \t]+(?:default[ \t]+)?)?(?:declare[ \t]+)?(?:abstract[ \t]+)?class[ \t]+([A-Za-z_$][\w$]*)', "class"),
+    (r'(?:export[ \t]+(?:default[ \t]+)?)?(?:declare[ \t]+)?(?:async[ \t]+)?function\b[ \t]*\*?[ \t]*([A-Za-z_$][\w$]*)', "function"),
+    (r'(?:export[ \t]+)?(?:const|let|var)[ \t]+([A-Za-z_$][\w$]*)[ \t]*(?::[^=\n]+)?=[ \t]*(?:async[ \t]+)?(?:function\b|\([^)\n]*\)[^=\n]*=>|[A-Za-z_$][\w$]*[ \t]*=>)', "function"),
+    (r'(?:export[ \t]+)?(?:declare[ \t]+)?interface[ \t]+([A-Za-z_$][\w$]*)', "interface"),
+    (r'(?:export[ \t]+)?(?:declare[ \t]+)?type[ \t]+([A-Za-z_$][\w$]*)[^=\n]*=', "type"),
+    (r'(?:export[ \t]+)?(?:declare[ \t]+)?(?:const[ \t]+)?enum[ \t]+([A-Za-z_$][\w$]*)', "enum"),
+    (r'(?:export[ \t]+)?(?:declare[ \t]+)?(?:namespace|module)[ \t]+([A-Za-z_$][\w$.]*)[ \t]*\{', "namespace"),
+]
+
+_GO_KEYWORDS = r'(?:func|type)\b'
+_GO_PATTERNS = [
+    (r'func[ \t]+\([^)]*?\*?[ \t]*([A-Za-z_]\w*)(?:\[[^\]]*\])?\)[ \t]*([A-Za-z_]\w*)', "method"),
+    (r'func[ \t]+([A-Za-z_]\w*)', "function"),
+    (r'type[ \t]+([A-Za-z_]\w*)(?:\[[^\]]*\])?[ \t]+struct\b', "struct"),
+    (r'type[ \t]+([A-Za-z_]\w*)(?:\[[^\]]*\])?[ \t]+interface\b', "interface"),
+    (r'type[ \t]+([A-Za-z_]\w*)', "type"),
+]
+
+_RUST_VISIBILITY = r'(?:pub(?:\([^)]*\))?[ \t]+)?'
+_RUST_KEYWORDS = r'(?:pub|const|async|unsafe|extern|fn|struct|enum|union|trait|impl|type|mod|macro_rules)\b'
+_RUST_PATTERNS = [
+    (rf'{_RUST_VISIBILITY}(?:const[ \t]+)?(?:async[ \t]+)?(?:unsafe[ \t]+)?(?:extern[ \t]+"[^"]*"[ \t]+)?fn[ \t]+([A-Za-z_]\w*)', "function"),
+    (rf'{_RUST_VISIBILITY}struct[ \t]+([A-Za-z_]\w*)', "struct"),
+    (rf'{_RUST_VISIBILITY}enum[ \t]+([A-Za-z_]\w*)', "enum"),
+    (rf'{_RUST_VISIBILITY}union[ \t]+([A-Za-z_]\w*)', "struct"),
+    (rf'{_RUST_VISIBILITY}(?:unsafe[ \t]+)?trait[ \t]+([A-Za-z_]\w*)', "trait"),
+    (r'(?:unsafe[ \t]+)?impl\b(?:[ \t]*<[^{\n]*?>)?[ \t]+([^{\n]+?)[ \t]*(?=\{|\bwhere\b|$)', "impl"),
+    (rf'{_RUST_VISIBILITY}type[ \t]+([A-Za-z_]\w*)', "type"),
+    (rf'{_RUST_VISIBILITY}mod[ \t]+([A-Za-z_]\w*)[ \t]*\{{', "module"),
+    (r'macro_rules![ \t]*([A-Za-z_]\w*)', "macro"),
+]
+
+_JVM_MODIFIER_WORDS = r'public|protected|private|internal|static|abstract|final|sealed|partial|readonly|unsafe|new|file|strictfp|non-sealed'
+_JAVA_KEYWORDS = rf'@|(?:{_JVM_MODIFIER_WORDS}|class|interface|enum|record)\b'
+_JVM_MODIFIERS = rf'(?:(?:{_JVM_MODIFIER_WORDS})[ \t]+)*'
+_JAVA_PATTERNS = [
+    (r'(?:@[\w.]+(?:\([^)\n]*\))?[ \t]*)*' + _JVM_MODIFIERS + r'(class|interface|enum|record|@interface)[ \t]+([A-Za-z_]\w*)', None),
+]
+_CSHARP_KEYWORDS = rf'\[|(?:{_JVM_MODIFIER_WORDS}|namespace|class|interface|enum|struct|record|delegate)\b'
+_CSHARP_PATTERNS = [
+    (r'namespace[ \t]+([\w.]+)', "namespace"),
+    (r'(?:\[[^\]\n]*\][ \t]*)*' + _JVM_MODIFIERS + r'(class|interface|enum|struct|record(?:[ \t]+(?:class|struct))?)[ \t]+([A-Za-z_]\w*)', None),
+    (r'(?:\[[^\]\n]*\][ \t]*)*' + _JVM_MODIFIERS + r'delegate[ \t]+[\w<>\[\]?, ]+?[ \t]+([A-Za-z_]\w*)[ \t]*[<(]', "delegate"),
+]
+
+# Kinds whose bodies are searched for further top-level symbols
+CONTAINER_KINDS = ("namespace", "module")
+
+
+def _compile(
+    keywords: str,
+    patterns: Sequence[Tuple[str, Optional[str]]]
+) -> Tuple[re.Pattern, Dict[int, Tuple[Optional[str], int, int]]]:
+    """Combine declaration patterns into one regular expression.
+
+    ``keywords`` matches the words a declaration can start with; lines
+    starting otherwise are rejected before any pattern is tried. Each
+    alternative is wrapped in a group; the returned mapping gives, per
+    wrapping group, the kind and the range of the alternative's own
+    groups. One pass over the text then finds all declarations.
+    """
+    alternatives = []
+    kinds = {}
+    group = 1
+    for pattern, kind in patterns:
+        groups = re.compile(pattern).groups
+        alternatives.append(f'({pattern})')
+        kinds[group] = (kind, group + 1, group + 1 + groups)
+        group += 1 + groups
+    expression = rf'^[ \t]*(?={keywords})(?:' + '|'.join(alternatives) + ')'
+    return re.compile(expression, re.MULTILINE), kinds
+
+
+_REGEX_EXTRACTORS: Dict[str, Tuple[re.Pattern, Dict[int, Tuple[Optional[str], int, int]]]] = {
+    "JavaScript": _compile(_JS_KEYWORDS, _JS_PATTERNS),
+    "JavaScript React": _compile(_JS_KEYWORDS, _JS_PATTERNS),
+    "TypeScript": _compile(_JS_KEYWORDS, _JS_PATTERNS),
+    "TypeScript React": _compile(_JS_KEYWORDS, _JS_PATTERNS),
+    "Go": _compile(_GO_KEYWORDS, _GO_PATTERNS),
+    "Rust": _compile(_RUST_KEYWORDS, _RUST_PATTERNS),
+    "Java": _compile(_JAVA_KEYWORDS, _JAVA_PATTERNS),
+    "C#": _compile(_CSHARP_KEYWORDS, _CSHARP_PATTERNS),
+}
+
+# Languages with an extractor
+INDEXED_LANGUAGES = ("Python",) + tuple(_REGEX_EXTRACTORS)
+
+# Quote characters that open a string literal, per language (Rust's
+# single quote also starts lifetimes, so only double quotes count there)
+_STRING_QUOTES = {
+    "Go": '"\'`',
+    "JavaScript": '"\'`',
+    "JavaScript React": '"\'`',
+    "TypeScript": '"\'`',
+    "TypeScript React": '"\'`',
+    "Java": '"\'',
+    "C#": '"\'',
+}
+
+# Lines that continue a declaration before its body opens, although they
+# start at the declaration's indentation
+_CONTINUATION_RE = re.compile(r'[ \t]*(?:[{(\[)\]<>|&.,:=]|where\b|extends\b|implements\b|throws\b|\n)')
+
+
+def extract_python(text: str) -> List[Symbol]:
+    """Top-level classes and functions of Python source; empty if it does not parse."""
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError, RecursionError):
+        return []
+    symbols: List[Symbol] = []
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            kind = "class"
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            kind = "function"
+        else:
+            continue
+        start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+        symbols.append([node.name, kind, start, node.end_lineno or node.lineno])
+    return symbols
+
+
+@functools.lru_cache(maxsize=None)
+def _block_scanners(quotes: str) -> Tuple[re.Pattern, re.Pattern]:
+    """Token patterns for _body_end(), outside and inside a block.
+
+    Comments and string literals are matched whole so their braces are
+    skipped; a single quote that is not a string quote is only skipped as
+    a character literal (Rust lifetimes stay unmatched).
+    """
+    skipped = [r'//[^\n]*', r'/\*.*?(?:\*/|\Z)']
+    for quote in quotes:
+        line_end = '' if quote == '`' else '\\n'
+        skipped.append(f'{quote}(?:\\\\.|[^{quote}\\\\{line_end}])*{quote}?')
+    if "'" not in quotes:
+        skipped.append(r"'(?:\\.[^']*|[^\\'\n])'")
+    pattern = '|'.join(skipped)
+    return (
+        re.compile(f'{pattern}|[{{}};\\n]', re.DOTALL),
+        re.compile(f'{pattern}|[{{}}]', re.DOTALL),
+    )
+
+
+def _body_end(text: str, start: int, quotes: str) -> Optional[int]:
+    """Offset of the brace closing the first block opened at or after ``start``.
+
+    Returns None when the declaration ends before a block opens (at a ';'
+    or a line that starts another statement at the same indentation), or
+    the block is not closed.
+    """
+    line_start = text.rfind('\n', 0, start) + 1
+    line_end = text.find('\n', line_start)
+    line = text[line_start:line_end if line_end >= 0 else len(text)]
+    indent = len(line) - len(line.lstrip(' \t'))
+    outside, inside = _block_scanners(quotes)
+    depth = 0
+    i = start
+    while True:
+        match = (inside if depth else outside).search(text, i)
+        if match is None:
+            return None
+        token = match.group()
+        i = match.end()
+        if token == '{':
+            depth += 1
+        elif token == '}':
+            depth -= 1
+            if depth <= 0:
+                return match.start() if depth == 0 else None
+        elif token == ';':
+            return None
+        elif token == '\n':
+            next_line = text[i:i + indent + 1]
+            if (
+                not next_line[indent:].isspace()
+                and len(next_line) - len(next_line.lstrip(' \t')) <= indent
+                and not _CONTINUATION_RE.match(text, i)
+            ):
+                return None
+
+
+def extract_with_patterns(text: str, language: str) -> List[Symbol]:
+    """Top-level declarations of brace-delimited source, by regular expression."""
+    extractor = _REGEX_EXTRACTORS.get(language)
+    if not extractor:
+        return []
+    pattern, kinds = extractor
+
+    matches: List[Tuple[int, str, str]] = []
+    for match in pattern.finditer(text):
+        # The wrapping group closes last, so it is the last index
+        pattern_kind, first, last = kinds[match.lastindex]
+        groups = match.groups()[first - 1:last - 1]
+        if pattern_kind is None:
+            # Keyword and name captured: "class Foo", "record struct Bar"
+            keyword = groups[0]
+            kind = "annotation" if keyword == "@interface" else keyword.split()[0]
+            name = groups[-1]
+        elif pattern_kind == "method":
+            kind, name = pattern_kind, f"{groups[0]}.{groups[1]}"
+        else:
+            kind, name = pattern_kind, groups[0].strip()
+        matches.append((match.start(), name, kind))
+
+    quotes = _STRING_QUOTES.get(language, '"')
+    symbols: List[Symbol] = []
+    covered_until = -1
+    last_start = -1
+    line, offset = 1, 0
+
+    for start, name, kind in matches:
+        if start == last_start or start < covered_until:
+            continue
+        last_start = start
+        end = _body_end(text, start, quotes)
+        # Matches come in text order; count lines from the previous one
+        line += text.count('\n', offset, start)
+        offset = start
+        end_line = line + text.count('\n', start, end) if end is not None else line
+        symbols.append([name, kind, line, end_line])
+        if end is not None and kind not in CONTAINER_KINDS:
+            covered_until = end
+    return symbols
+
+
+def extract_symbols(text: str, language: Optional[str]) -> List[Symbol]:
+    """Top-level symbols of source text in a supported language."""
+    if language == "Python":
+        return extract_python(text)
+    return extract_with_patterns(text, language or "")
+
+
+def build_symbol_index(
+    root_path: str,
+    files: List[Dict[str, Any]],
+    index_path: Optional[str] = None,
+    processes: int = 1
+) -> Tuple[Dict[str, List[Symbol]], Dict[str, Any]]:
+    """Index the symbols of scanned files, reusing unchanged entries of a saved index.
+
+    See file_index.build_file_index() for the arguments. Returns the
+    symbols keyed by os.sep-separated relative path, and stats with the
+    indexed file and symbol counts and cache hits/misses.
+    """
+    symbols, stats = build_file_index(
+        root_path, files, extract_symbols, INDEXED_LANGUAGES, SYMBOL_INDEX_VERSION,
+        index_path=index_path, processes=processes,
+    )
+    stats["symbols"] = sum(len(file_symbols) for file_symbols in symbols.values())
+    return symbols, stats
+
+
+def format_symbol(symbol: Symbol) -> str:
+    """Compact one-line form of a symbol: 'class Foo 12-80'."""
+    name, kind, start, end = symbol
+    return f"{kind} {name} {start}-{end}" if end != start else f"{kind} {name} {start}"
+
+
+def symbol_summary(
+    symbols: Dict[str, List[List[Any]]],
+    files: List[Dict[str, Any]],
+    budget: Optional[int] = None
+) -> Dict[str, Any]:
+    """Render the symbol index as compact lines per file, e.g. "class Foo 12-80".
+
+    Files with more than SYMBOL_SUMMARY_PER_FILE symbols list that many and
+    a count of the rest. With a byte ``budget``, the files are taken by
+    priority (see file_priority()) as long as they fit.
+    """
+    priorities = {
+        file_data["relative_path"]: file_priority(file_data) for file_data in files
+    }
+    candidates = sorted(
+        (rel_path for rel_path, file_symbols in symbols.items() if file_symbols),
+        key=lambda rel_path: (-priorities.get(rel_path, 0.0), rel_path)
+    )
+
+    total = sum(len(file_symbols) for file_symbols in symbols.values())
+    listed: Dict[str, List[str]] = {}
+    used = json_size({"files": {}, "indexed_files": len(symbols), "symbols": total, "truncated": False})
+    truncated = False
+    for rel_path in candidates:
+        file_symbols = symbols[rel_path]
+        lines = [format_symbol(symbol) for symbol in file_symbols[:SYMBOL_SUMMARY_PER_FILE]]
+        if len(file_symbols) > SYMBOL_SUMMARY_PER_FILE:
+            lines.append(f"... {len(file_symbols) - SYMBOL_SUMMARY_PER_FILE} more")
+        key = rel_path.replace(os.sep, "/")
+        size = json_string_size(key) + 2 + json_size(lines) + 2
+        if budget is not None and used + size > budget:
+            truncated = True
+            continue
+        listed[key] = lines
+        used += size
+
+    return {
+        "files": dict(sorted(listed.items())),
+        "indexed_files": len(symbols),
+        "symbols": total,
+        "truncated": truncated,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="List the top-level symbols of source files")
+    parser.add_argument("--repo-path", default=".", help="Repository path (default: current directory)")
+    parser.add_argument("files", nargs="+", help="Files to index, relative to --repo-path")
+    args = parser.parse_args()
+
+    from language_detector import detect_language
+
+    result = {}
+    for rel_path in args.files:
+        path = os.path.join(args.repo_path, rel_path)
+        symbols = extract_file(path, detect_language(path) or "", extract_symbols)
+        result[rel_path] = [format_symbol(s) for s in symbols or []]
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
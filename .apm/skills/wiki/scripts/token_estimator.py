@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+Fast local token estimation for context budgets.
+
+Byte counts are a poor proxy for tokens: CJK text takes about one token
+per character (three UTF-8 bytes), while English prose packs four or
+more bytes into a token. The default estimator counts character classes
+(ASCII words and letters, digits, punctuation, line breaks and
+indentation, CJK, other scripts, symbols) and weighs each class by its
+typical token cost in BPE tokenizers. fit_weights() re-fits the weights
+against a real tokenizer; run this script with --calibrate to do so, save
+its output and point DOC_GEN_TOKEN_WEIGHTS at the file to use them.
+
+A real tokenizer is used instead when one is installed, chosen by
+DOC_GEN_TOKENIZER:
+
+- ``auto`` (default): ``tokenizers`` if DOC_GEN_TOKENIZER_FILE names a
+  tokenizer.json, else ``tiktoken`` if importable, else ``heuristic``
+- ``heuristic``: the character-class model, with DOC_GEN_TOKEN_WEIGHTS
+  (a --calibrate JSON file) if set
+- ``tiktoken``: tiktoken with DOC_GEN_TIKTOKEN_ENCODING (cl100k_base)
+- ``tokenizers``: Hugging Face tokenizers with DOC_GEN_TOKENIZER_FILE
+
+More backends can be added with register_tokenizer(). Counts are cached
+per content hash, in memory and optionally in a JSON file.
+
+Usage:
+    python token_estimator.py FILE [FILE ...]
+    python token_estimator.py --calibrate FILE [FILE ...] > weights.json
+    DOC_GEN_TOKEN_WEIGHTS=weights.json python token_estimator.py FILE
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+TokenCounter = Callable[[str], int]
+
+HEURISTIC = "heuristic"
+
+# Bumped whenever cached counts would change for the same estimator name
+TOKEN_CACHE_VERSION = 1
+TOKEN_CACHE_FILENAME = "token_cache.json"
+# Entries kept in memory and on disk; the oldest are dropped first
+MAX_CACHE_ENTRIES = 50000
+# Texts shorter than this are counted directly instead of hashed
+MIN_CACHED_LENGTH = 256
+
+_CJK_RANGES = (
+    '\u3000-\u303f'   # CJK symbols and punctuation
+    '\u3040-\u30ff'   # Hiragana, Katakana
+    '\u3400-\u4dbf'   # CJK extension A
+    '\u4e00-\u9fff'   # CJK unified ideographs
+    '\uac00-\ud7af'   # Hangul syllables
+    '\uf900-\ufaff'   # CJK compatibility ideographs
+    '\uff00-\uffef'   # Half-width and full-width forms
+)
+
+FEATURES = (
+    "words", "letters", "digits", "punctuation", "newlines", "indents",
+    "cjk", "other_letters", "symbols",
+)
+
+_LETTERS = bytes(range(ord('A'), ord('Z') + 1)) + bytes(range(ord('a'), ord('z') + 1))
+_DIGITS = b'0123456789'
+_PUNCTUATION = bytes(c for c in range(0x21, 0x7f) if not chr(c).isalnum())
+_NON_ASCII_BYTES = bytes(range(0x80, 0x100))
+
+# ASCII letter runs: a common word is one token, long identifiers split further
+_WORD_RE = re.compile(rb'[A-Za-z]+')
+# Runs of two or more spaces/tabs; single spaces merge into the next word
+_INDENT_RE = re.compile(rb'[ \t]{2,}')
+_CJK_RE = re.compile(f'[{_CJK_RANGES}]')
+# Non-ASCII word characters outside the CJK ranges (accents, Cyrillic, Greek, ...)
+_OTHER_LETTER_RE = re.compile(f'[^\\W\\x00-\\x7f{_CJK_RANGES}]')
+
+# Approximate tokens per feature unit for BPE tokenizers of the cl100k /
+# Claude family; see fit_weights() to re-fit them.
+DEFAULT_WEIGHTS = {
+    "words": 0.75,
+    "letters": 0.09,
+    "digits": 0.34,
+    "punctuation": 0.55,
+    "newlines": 0.4,
+    "indents": 0.3,
+    "cjk": 1.2,
+    "other_letters": 0.45,
+    "symbols": 1.0,
+}
+
+
+def _count_bytes(data: bytes, members: bytes) -> int:
+    return len(data) - len(data.translate(None, members))
+
+
+def character_features(text: str) -> Dict[str, int]:
+    """Count the character classes the heuristic estimate is based on."""
+    # ASCII classes are counted on the UTF-8 bytes, where multi-byte
+    # characters never collide with them
+    data = text.encode('utf-8', 'surrogatepass')
+    features = {
+        "words": len(_WORD_RE.findall(data)),
+        "letters": _count_bytes(data, _LETTERS),
+        "digits": _count_bytes(data, _DIGITS),
+        "punctuation": _count_bytes(data, _PUNCTUATION),
+        "newlines": data.count(b'\n'),
+        "indents": len(_INDENT_RE.findall(data)),
+        "cjk": 0,
+        "other_letters": 0,
+        "symbols": 0,
+    }
+    if len(data) == len(text):
+        return features
+
+    non_ascii = len(text) - len(data.translate(None, _NON_ASCII_BYTES))
+    cjk = len(_CJK_RE.findall(text))
+    other_letters = len(_OTHER_LETTER_RE.findall(text))
+    features.update(cjk=cjk, other_letters=other_letters, symbols=non_ascii - cjk - other_letters)
+    return features
+
+
+def heuristic_token_count(text: str, weights: Optional[Dict[str, float]] = None) -> int:
+    """Estimate the token count of text from its character classes."""
+    if not text:
+        return 0
+    weights = weights or DEFAULT_WEIGHTS
+    features = character_features(text)
+    estimate = sum(weights[name] * count for name, count in features.items())
+    return max(1, int(round(estimate)))
+
+
+def load_weights(path: str) -> Dict[str, float]:
+    """Read heuristic weights from a --calibrate JSON file.
+
+    Features missing from the file keep their default weight.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict) and isinstance(data.get("weights"), dict):
+        data = data["weights"]
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: expected a JSON object of weights")
+    weights = dict(DEFAULT_WEIGHTS)
+    for name in FEATURES:
+        if name in data:
+            weights[name] = float(data[name])
+    return weights
+
+
+def _heuristic_counter() -> Tuple[str, TokenCounter]:
+    """The heuristic counter, with DOC_GEN_TOKEN_WEIGHTS applied if set.
+
+    Calibrated weights get their own name, so cached counts made with
+    other weights are not reused.
+    """
+    weights_path = os.getenv("DOC_GEN_TOKEN_WEIGHTS")
+    if not weights_path:
+        return HEURISTIC, heuristic_token_count
+    try:
+        weights = load_weights(weights_path)
+    except (OSError, ValueError) as e:
+        print(f"Warning: could not load token weights: {e}", file=sys.stderr)
+        return HEURISTIC, heuristic_token_count
+    if weights == DEFAULT_WEIGHTS:
+        return HEURISTIC, heuristic_token_count
+    digest = hashlib.blake2b(json.dumps(weights, sort_keys=True).encode('utf-8'), digest_size=4).hexdigest()
+    return f"{HEURISTIC}-{digest}", lambda text: heuristic_token_count(text, weights)
+
+
+def _load_tiktoken() -> Optional[TokenCounter]:
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding(os.getenv("DOC_GEN_TIKTOKEN_ENCODING", "cl100k_base"))
+    except Exception:
+        return None
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def _load_hf_tokenizers() -> Optional[TokenCounter]:
+    tokenizer_file = os.getenv("DOC_GEN_TOKENIZER_FILE")
+    if not tokenizer_file:
+        return None
+    try:
+        from tokenizers import Tokenizer
+        tokenizer = Tokenizer.from_file(tokenizer_file)
+    except Exception:
+        return None
+    return lambda text: len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+# Tokenizer name -> loader returning a counter, or None if unavailable
+_TOKENIZER_LOADERS: Dict[str, Callable[[], Optional[TokenCounter]]] = {
+    "tokenizers": _load_hf_tokenizers,
+    "tiktoken": _load_tiktoken,
+}
+
+
+def register_tokenizer(name: str, loader: Callable[[], Optional[TokenCounter]]) -> None:
+    """Make a tokenizer selectable by name; the loader returns None when unavailable."""
+    _TOKENIZER_LOADERS[name] = loader
+
+
+def load_counter(name: str = "auto") -> Tuple[str, TokenCounter]:
+    """Resolve a tokenizer name to (resolved name, counter).
+
+    Unknown or unavailable tokenizers fall back to the heuristic model.
+    The heuristic's name carries a suffix when calibrated weights are used.
+    """
+    if name == "auto":
+        candidates: List[str] = list(_TOKENIZER_LOADERS)
+    elif name == HEURISTIC:
+        candidates = []
+    else:
+        candidates = [name]
+
+    for candidate in candidates:
+        loader = _TOKENIZER_LOADERS.get(candidate)
+        counter = loader() if loader is not None else None
+        if counter is not None:
+            return candidate, counter
+    return _heuristic_counter()
+
+
+def _content_hash(text: str) -> str:
+    data = text.encode('utf-8', 'surrogatepass')
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class TokenEstimator:
+    """Token counter with a per-content-hash cache."""
+
+    def __init__(
+        self,
+        counter: Optional[TokenCounter] = None,
+        name: str = HEURISTIC,
+        cache_path: Optional[str] = None
+    ):
+        self.counter = counter or heuristic_token_count
+        self.name = name
+        self.cache_path = cache_path
+        self._counts: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls, cache_path: Optional[str] = None) -> "TokenEstimator":
+        """Create an estimator for the DOC_GEN_TOKENIZER choice, loading its cache file."""
+        name, counter = load_counter(os.getenv("DOC_GEN_TOKENIZER", "auto"))
+        estimator = cls(counter, name, cache_path)
+        if cache_path:
+            estimator._load()
+        return estimator
+
+    def _load(self) -> None:
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if (
+            isinstance(data, dict)
+            and data.get("version") == TOKEN_CACHE_VERSION
+            and data.get("estimator") == self.name
+            and isinstance(data.get("counts"), dict)
+        ):
+            self._counts = data["counts"]
+
+    def save(self) -> None:
+        """Write the cache file atomically, if the estimator has one."""
+        if not self.cache_path:
+            return
+        while len(self._counts) > MAX_CACHE_ENTRIES:
+            del self._counts[next(iter(self._counts))]
+        data = {
+            "version": TOKEN_CACHE_VERSION,
+            "estimator": self.name,
+            "counts": self._counts,
+        }
+        directory = os.path.dirname(self.cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, self.cache_path)
+
+    def count(self, text: str) -> int:
+        """Return the (estimated) token count of text."""
+        if len(text) < MIN_CACHED_LENGTH:
+            return self.counter(text)
+        key = _content_hash(text)
+        cached = self._counts.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        tokens = self.counter(text)
+        if len(self._counts) >= MAX_CACHE_ENTRIES:
+            del self._counts[next(iter(self._counts))]
+        self._counts[key] = tokens
+        return tokens
+
+    def bytes_per_token(self, sample: str) -> float:
+        """UTF-8 bytes per token of a sample, for converting token budgets to bytes."""
+        tokens = self.count(sample)
+        return len(sample.encode('utf-8', 'surrogatepass')) / tokens if tokens else 1.0
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Return the longest prefix of text that fits in ``max_tokens``."""
+        if max_tokens <= 0:
+            return ""
+        if self.count(text) <= max_tokens:
+            return text
+        # Token counts grow with the prefix; search the cut point
+        low, high = 0, len(text)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.counter(text[:middle]) <= max_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        return text[:low]
+
+    def stats(self) -> Dict[str, object]:
+        return {"estimator": self.name, "cache_hits": self.hits, "cache_misses": self.misses}
+
+
+def fit_weights(
+    samples: Iterable[str],
+    counter: TokenCounter,
+    features: Sequence[str] = FEATURES
+) -> Dict[str, float]:
+    """Least-squares fit of the heuristic weights to a real tokenizer's counts.
+
+    Negative weights are clamped to zero; features that never occur in the
+    samples keep their default weight.
+    """
+    rows: List[List[float]] = []
+    targets: List[float] = []
+    for text in samples:
+        if not text:
+            continue
+        counts = character_features(text)
+        rows.append([float(counts[name]) for name in features])
+        targets.append(float(counter(text)))
+
+    used = [i for i in range(len(features)) if any(row[i] for row in rows)]
+    n = len(used)
+    if not n:
+        return dict(DEFAULT_WEIGHTS)
+
+    # Normal equations (X^T X) w = X^T y with a small ridge term, by Gaussian elimination
+    matrix = [[0.0] * (n + 1) for _ in range(n)]
+    for row, target in zip(rows, targets):
+        values = [row[i] for i in used]
+        for a in range(n):
+            for b in range(n):
+                matrix[a][b] += values[a] * values[b]
+            matrix[a][n] += values[a] * target
+    for a in range(n):
+        matrix[a][a] += 1e-6 * (matrix[a][a] or 1.0)
+
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(matrix[r][col]))
+        matrix[col], matrix[pivot] = matrix[pivot], matrix[col]
+        if matrix[col][col] == 0:
+            continue
+        for r in range(n):
+            if r != col:
+                factor = matrix[r][col] / matrix[col][col]
+                for c in range(col, n + 1):
+                    matrix[r][c] -= factor * matrix[col][c]
+
+    weights = dict(DEFAULT_WEIGHTS)
+    for a, i in enumerate(used):
+        value = matrix[a][n] / matrix[a][a] if matrix[a][a] else 0.0
+        weights[features[i]] = round(max(0.0, value), 4)
+    return weights
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Estimate token counts of files")
+    parser.add_argument("files", nargs="+", help="Files to estimate")
+    parser.add_argument(
+        "--calibrate",
+        action="store_true",
+        help="Fit the heuristic weights to the installed tokenizer on the given files (one sample per paragraph)"
+    )
+    args = parser.parse_args()
+
+    texts = []
+    for path in args.files:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            texts.append((path, f.read()))
+
+    name, counter = load_counter(os.getenv("DOC_GEN_TOKENIZER", "auto"))
+    heuristic = name.startswith(HEURISTIC)
+    if args.calibrate:
+        if heuristic:
+            print("Error: no tokenizer installed to calibrate against", file=sys.stderr)
+            return 1
+        samples = [part for _, text in texts for part in re.split(r'\n\s*\n', text) if part.strip()]
+        print(json.dumps({"tokenizer": name, "weights": fit_weights(samples, counter)}, indent=2))
+        return 0
+
+    for path, text in texts:
+        line = f"{path}: {len(text.encode('utf-8'))} bytes, ~{heuristic_token_count(text)} tokens (heuristic)"
+        if name != HEURISTIC:
+            line += f", {counter(text)} tokens ({name})"
+        print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
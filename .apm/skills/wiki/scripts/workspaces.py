@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Workspace detection for monorepos.
+
+Workspace roots are read from the manifests that declare them at the
+repository root:
+
+- pnpm: ``pnpm-workspace.yaml`` (``packages``, "!" entries exclude)
+- npm/Yarn: ``package.json`` (``workspaces`` list or ``workspaces.packages``)
+- Lerna: ``lerna.json`` (``packages``)
+- Cargo: ``Cargo.toml`` (``[workspace] members`` / ``exclude``)
+- Go: ``go.work`` (``use`` directives)
+
+Member globs are expanded against the file system, and a match only
+counts as a workspace when it holds the ecosystem's own manifest
+(package.json, Cargo.toml or go.mod). Paths under excluded directories
+such as node_modules are ignored.
+
+With --workspace-packs, collect_context also builds one context pack per
+workspace; write_workspace_packs() stores them next to the main pack.
+"""
+
+import glob
+import json
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from path_matcher import PathMatcher
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+try:
+    import tomllib
+except ImportError:
+    tomllib = None
+
+
+@dataclass
+class Workspace:
+    """A workspace root inside a repository."""
+    # Relative to the repository root, os.sep-separated
+    path: str
+    # Package/crate/module name from the workspace manifest, else the directory name
+    name: str
+    # Manifest that declared it: pnpm, npm, lerna, cargo or go
+    kind: str
+
+
+# Directory, next to the main context pack, that holds per-workspace packs
+WORKSPACE_PACK_DIR = "workspaces"
+
+# Manifest a member directory must contain, per workspace kind
+MEMBER_MANIFESTS = {
+    "pnpm": "package.json",
+    "npm": "package.json",
+    "lerna": "package.json",
+    "cargo": "Cargo.toml",
+    "go": "go.mod",
+}
+
+_YAML_LIST_ITEM_RE = re.compile(r'^\s*-\s*[\'"]?([^\'"#]+?)[\'"]?\s*(?:#.*)?$')
+_TOML_ARRAY_RE = r'^\s*{key}\s*=\s*\[(.*?)\]'
+_TOML_STRING_RE = re.compile(r'"([^"]*)"|\'([^\']*)\'')
+_CARGO_NAME_RE = re.compile(r'^\[package\][^\[]*?^\s*name\s*=\s*"([^"]+)"', re.MULTILINE | re.DOTALL)
+_GO_USE_BLOCK_RE = re.compile(r'^use\s*\((.*?)\)', re.MULTILINE | re.DOTALL)
+_GO_USE_LINE_RE = re.compile(r'^use\s+(\S+)', re.MULTILINE)
+_GO_MODULE_RE = re.compile(r'^module\s+(\S+)', re.MULTILINE)
+
+
+def _read_text(path: str) -> Optional[str]:
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _read_json(path: str) -> Any:
+    text = _read_text(path)
+    if text is None:
+        return None
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+
+def _pnpm_patterns(text: str) -> List[str]:
+    if yaml is not None:
+        try:
+            data = yaml.safe_load(text)
+        except yaml.YAMLError:
+            data = None
+        packages = data.get("packages") if isinstance(data, dict) else None
+        return [p for p in packages or [] if isinstance(p, str)]
+
+    # Without PyYAML: the block list under "packages:"
+    patterns: List[str] = []
+    in_packages = False
+    for line in text.splitlines():
+        if not line.strip() or line.lstrip().startswith('#'):
+            continue
+        if not line[0].isspace() and not line.startswith('-'):
+            in_packages = line.split(':', 1)[0].strip() == "packages"
+            continue
+        match = _YAML_LIST_ITEM_RE.match(line) if in_packages else None
+        if match:
+            patterns.append(match.group(1))
+    return patterns
+
+
+def _npm_patterns(data: Any) -> List[str]:
+    workspaces = data.get("workspaces") if isinstance(data, dict) else None
+    if isinstance(workspaces, dict):
+        workspaces = workspaces.get("packages")
+    return [p for p in workspaces or [] if isinstance(p, str)]
+
+
+def _toml_strings(text: str, key: str) -> List[str]:
+    match = re.search(_TOML_ARRAY_RE.format(key=key), text, re.MULTILINE | re.DOTALL)
+    if not match:
+        return []
+    return [a or b for a, b in _TOML_STRING_RE.findall(match.group(1))]
+
+
+def _cargo_patterns(text: str) -> Tuple[List[str], List[str]]:
+    if tomllib is not None:
+        try:
+            workspace = tomllib.loads(text).get("workspace") or {}
+        except tomllib.TOMLDecodeError:
+            workspace = {}
+        return list(workspace.get("members") or []), list(workspace.get("exclude") or [])
+
+    # Without tomllib: the arrays of the [workspace] table
+    match = re.search(r'^\[workspace\]\s*$(.*?)(?=^\[|\Z)', text, re.MULTILINE | re.DOTALL)
+    if not match:
+        return [], []
+    table = match.group(1)
+    return _toml_strings(table, "members"), _toml_strings(table, "exclude")
+
+
+def _go_patterns(text: str) -> List[str]:
+    uses: List[str] = []
+    for block in _GO_USE_BLOCK_RE.findall(text):
+        for line in block.splitlines():
+            line = line.split('//', 1)[0].strip()
+            if line:
+                uses.append(line.split()[0])
+    uses.extend(u for u in _GO_USE_LINE_RE.findall(text) if u != '(')
+    return uses
+
+
+def _member_name(directory: str, kind: str) -> str:
+    manifest = os.path.join(directory, MEMBER_MANIFESTS[kind])
+    name = None
+    if kind in ("pnpm", "npm", "lerna"):
+        data = _read_json(manifest)
+        name = data.get("name") if isinstance(data, dict) else None
+    else:
+        text = _read_text(manifest) or ""
+        match = (_CARGO_NAME_RE if kind == "cargo" else _GO_MODULE_RE).search(text)
+        name = match.group(1) if match else None
+    return name if isinstance(name, str) and name else os.path.basename(directory)
+
+
+def _expand(root_path: str, patterns: List[str]) -> List[str]:
+    """Expand member globs to relative directory paths; '!' patterns remove matches."""
+    included: Dict[str, None] = {}
+    excluded = set()
+    for pattern in patterns:
+        negate = pattern.startswith('!')
+        pattern = pattern[1:] if negate else pattern
+        pattern = pattern.strip().rstrip('/')
+        if pattern.startswith('./'):
+            pattern = pattern[2:]
+        if not pattern or pattern == '.' or os.path.isabs(pattern) or '..' in pattern.split('/'):
+            continue
+        matches = glob.glob(os.path.join(glob.escape(root_path), pattern), recursive=True)
+        for match in sorted(matches):
+            if not os.path.isdir(match):
+                continue
+            rel = os.path.relpath(match, root_path)
+            if negate:
+                excluded.add(rel)
+            else:
+                included[rel] = None
+    return [rel for rel in included if rel not in excluded]
+
+
+def detect_workspaces(
+    root_path: str,
+    skip: Optional[PathMatcher] = None
+) -> List[Workspace]:
+    """Find the workspace roots declared by the repository's root manifests.
+
+    Args:
+        root_path: Repository root
+        skip: Matcher for relative paths that are never workspaces
+            (typically the scan's exclude patterns)
+
+    Returns:
+        Workspaces sorted by path; the first manifest to declare a
+        directory decides its kind
+    """
+    declared: List[Tuple[str, List[str], List[str]]] = []
+
+    text = _read_text(os.path.join(root_path, "pnpm-workspace.yaml"))
+    if text is not None:
+        declared.append(("pnpm", _pnpm_patterns(text), []))
+    package_json = _read_json(os.path.join(root_path, "package.json"))
+    if package_json is not None:
+        declared.append(("npm", _npm_patterns(package_json), []))
+    lerna = _read_json(os.path.join(root_path, "lerna.json"))
+    if isinstance(lerna, dict):
+        declared.append(("lerna", [p for p in lerna.get("packages") or [] if isinstance(p, str)], []))
+    text = _read_text(os.path.join(root_path, "Cargo.toml"))
+    if text is not None:
+        members, exclude = _cargo_patterns(text)
+        declared.append(("cargo", members, exclude))
+    text = _read_text(os.path.join(root_path, "go.work"))
+    if text is not None:
+        declared.append(("go", _go_patterns(text), []))
+
+    workspaces: Dict[str, Workspace] = {}
+    for kind, patterns, exclude in declared:
+        patterns = patterns + ['!' + p for p in exclude]
+        for rel in _expand(root_path, patterns):
+            if rel in workspaces or (skip is not None and skip.matches(rel)):
+                continue
+            directory = os.path.join(root_path, rel)
+            if not os.path.isfile(os.path.join(directory, MEMBER_MANIFESTS[kind])):
+                continue
+            workspaces[rel] = Workspace(path=rel, name=_member_name(directory, kind), kind=kind)
+
+    return [workspaces[rel] for rel in sorted(workspaces)]
+
+
+def workspace_pack_name(workspace_path: str) -> str:
+    """File name of a workspace's context pack, relative to the main pack's directory."""
+    slug = re.sub(r'[^\w.-]+', '_', workspace_path.replace("/", "__"))
+    return f"{WORKSPACE_PACK_DIR}/{slug}.json"
+
+
+def write_workspace_packs(pack_dir: str, packs: Dict[str, Dict[str, Any]]) -> None:
+    """Write per-workspace context packs, keyed by workspace path, under ``pack_dir``.
+
+    ``pack_dir`` is the directory of the main pack; each pack goes to
+    workspace_pack_name() relative to it.
+    """
+    for workspace_path, pack in packs.items():
+        pack_path = Path(pack_dir) / workspace_pack_name(workspace_path)
+        pack_path.parent.mkdir(parents=True, exist_ok=True)
+        pack_path.write_text(json.dumps(pack, ensure_ascii=False, indent=2), encoding='utf-8')